@@ -0,0 +1,146 @@
+"""
+Offline checks for keyword extraction (throughput/agreement), using articles.csv.
+
+Usage:
+  python bench_keywords.py batch --csv articles.csv --batch-size 64
+  python bench_keywords.py engines --csv articles.csv --top-k 3
+
+Subcommands:
+  batch   : per-article KeyBERT calls vs extract_keywords_batch (float32 default, then the opt-in
+            float16 phrase store cold and warm)
+  engines : KeyBERT vs TF-IDF keyword engine: keyword-stage latency, top-k overlap, resulting queries
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from qdd2 import config
+from qdd2.entities import extract_ner_entities
+from qdd2.keywords import extract_keywords_batch, group_entities_by_type, rerank_with_ner_boost
+from qdd2.models import get_keyword_model
+from qdd2.query_builder import generate_search_query
+from qdd2.tfidf_keywords import DocumentFrequencyTable, extract_keywords_tfidf
+
+
+def load_articles(csv_path: str, limit: int | None = None) -> list[str]:
+    df = pd.read_csv(csv_path)
+    df = df[df["content"].notna()]
+    if limit:
+        df = df.head(limit)
+    return df["content"].astype(str).tolist()
+
+
+def bench_batch(args: argparse.Namespace) -> None:
+    texts = load_articles(args.csv, args.limit)
+    kw_model = get_keyword_model()
+    print(f"{len(texts)} articles, top_n={args.top_n}, batch_size={args.batch_size}, store={config.EMBEDDING_STORE_DIR}")
+    phrase_store = config.KEYWORD_PHRASE_STORE
+
+    start = time.perf_counter()
+    reference = [
+        kw_model.extract_keywords(t, keyphrase_ngram_range=(1, 3), top_n=args.top_n, use_mmr=True, diversity=0.7)
+        for t in texts
+    ]
+    per_doc = time.perf_counter() - start
+    print(f"[per-article] {per_doc:.2f}s ({1000 * per_doc / len(texts):.1f} ms/article)")
+
+    # 기본(float32, store 없음) 다음, phrase store를 켜고 첫 실행은 새 phrase를 store에 채우고
+    # 두 번째 실행은 문서 임베딩만 새로 계산한다
+    for run in ("float32", "cold", "warm"):
+        config.KEYWORD_PHRASE_STORE = run != "float32" and bool(config.EMBEDDING_STORE_DIR)
+        start = time.perf_counter()
+        batched = extract_keywords_batch(texts, top_n=args.top_n, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        same = sum([p for p, _ in a] == [p for p, _ in b] for a, b in zip(reference, batched))
+        print(
+            f"[batch/{run}] {elapsed:.2f}s ({1000 * elapsed / len(texts):.1f} ms/article), "
+            f"same keyword list {same}/{len(texts)}"
+        )
+    config.KEYWORD_PHRASE_STORE = phrase_store
+
+
+def bench_engines(args: argparse.Namespace) -> None:
+    texts = load_articles(args.csv, args.limit)
+    n_base = args.top_n * 3
+    entities = [extract_ner_entities(t) for t in texts]  # 두 engine이 같은 NER 결과를 쓴다
+
+    start = time.perf_counter()
+    keybert_base = extract_keywords_batch(texts, top_n=n_base)
+    keybert_time = time.perf_counter() - start
+
+    # 크롤링 누적 상태를 흉내 내려고 DF 테이블을 전체 기사로 먼저 채운다 (CLI와 같이 log 기록 + compact 포함)
+    with tempfile.TemporaryDirectory() as tmp:
+        table = DocumentFrequencyTable(os.path.join(tmp, "keyword_df"))
+        start = time.perf_counter()
+        for t in texts:
+            table.add(t)
+        table.compact()
+        seed_time = time.perf_counter() - start
+    start = time.perf_counter()
+    tfidf_base = [extract_keywords_tfidf(t, top_n=n_base, table=table) for t in texts]
+    tfidf_time = time.perf_counter() - start
+
+    used = int(np.count_nonzero(table.df[0]))
+    print(f"{len(texts)} articles, DF table {table.n_docs} docs / {used} of {table.n_buckets} buckets used per row")
+    print(f"[df seed] {1000 * seed_time / len(texts):.3f} ms/article (add + log append + compact)")
+    print(f"[keybert] {1000 * keybert_time / len(texts):.3f} ms/article (keyword stage)")
+    print(f"[tfidf]   {1000 * tfidf_time / len(texts):.3f} ms/article (keyword stage, table read-only)")
+
+    overlap = 0.0
+    same_ko = same_en = with_query = 0
+    for ents, kb, tf in zip(entities, keybert_base, tfidf_base):
+        by_type = group_entities_by_type(ents)
+        kb_top = rerank_with_ner_boost(kb, ents)[: args.top_n]
+        tf_top = rerank_with_ner_boost(tf, ents)[: args.top_n]
+        a = {p for p, _ in kb_top[: args.top_k]}
+        b = {p for p, _ in tf_top[: args.top_k]}
+        overlap += len(a & b) / max(1, len(a | b))
+
+        q_kb = generate_search_query(by_type, kb_top, top_k=args.top_k, use_wikidata=False)
+        q_tf = generate_search_query(by_type, tf_top, top_k=args.top_k, use_wikidata=False)
+        if q_kb["ko"] is None:
+            continue
+        with_query += 1
+        same_ko += q_kb["ko"] == q_tf["ko"]
+        same_en += q_kb["en"] == q_tf["en"]
+        if args.show:
+            print(f"  KO keybert: {q_kb['ko']}\n     tfidf  : {q_tf['ko']}")
+
+    print(f"top-{args.top_k} keyword Jaccard (after NER boost): {overlap / max(1, len(texts)):.3f}")
+    print(f"queries (articles with PER={with_query}): same KO {same_ko}, same EN {same_en}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Keyword extraction benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="per-article KeyBERT vs batched extraction, with and without the phrase store")
+    batch.add_argument("--csv", default="articles.csv")
+    batch.add_argument("--limit", type=int, default=None)
+    batch.add_argument("--top-n", type=int, default=45)
+    batch.add_argument("--batch-size", type=int, default=config.KEYWORD_BATCH_SIZE)
+    batch.set_defaults(func=bench_batch)
+
+    engines = sub.add_parser("engines", help="KeyBERT vs TF-IDF keyword engine and the queries they produce")
+    engines.add_argument("--csv", default="articles.csv")
+    engines.add_argument("--limit", type=int, default=None)
+    engines.add_argument("--top-n", type=int, default=15)
+    engines.add_argument("--top-k", type=int, default=3, help="keywords used in the search query")
+    engines.add_argument("--show", action="store_true", help="print both KO queries per article")
+    engines.set_defaults(func=bench_engines)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
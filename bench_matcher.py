@@ -0,0 +1,449 @@
+"""
+Offline checks for the snippet matcher (quality/latency), using out_dataset.csv.
+
+Usage:
+  python bench_matcher.py modes --csv out_dataset.csv --rerank-top-n 5
+  python bench_matcher.py prefilter --csv out_dataset.csv --top-n 200
+  python bench_matcher.py memory --chars 500000 --chunks 128 512 100000000
+  python bench_matcher.py many --csv out_dataset.csv --quotes 10 --k 3
+  python bench_matcher.py crosslingual --csv out_dataset.csv --limit 100
+  python bench_matcher.py windows --csv out_dataset.csv --configs 0:0 1:1 2:1 2:2 --mode pooled
+  python bench_matcher.py results --quotes 10000
+
+Subcommands:
+  modes     : exact vs pooled(+rerank) span matching agreement and latency
+  prefilter : BM25 prefilter recall (best span unchanged) and latency vs transcript length
+  memory    : peak RSS / latency of chunked window encoding on one very long synthetic transcript
+  many      : Q separate matching passes vs one many-to-many pass over a shared candidate pool
+  crosslingual : translate(Marian)+English encoder vs Korean quote + multilingual encoder
+  windows   : num_before/num_after sweep, one run per setting vs one multi-window call
+  results   : memory held by span results (plain dicts vs SpanMatch, shared and detached units) per N quotes,
+              no encoder needed
+"""
+
+import argparse
+import gc
+import multiprocessing as mp
+import random
+import resource
+import time
+import tracemalloc
+
+import pandas as pd
+
+from qdd2.match_types import SpanMatch
+from qdd2.snippet_matcher import (
+    find_best_spans_batched,
+    find_top_spans_batched,
+    match_window_configs,
+    split_into_sentences,
+    top_spans_for_quotes,
+)
+
+
+def load_pairs(csv_path: str, limit: int | None = None) -> list[tuple[str, str]]:
+    """
+    out_dataset.csv의 (quote_en, 원문 span) 쌍. 쌍 단위로 중복을 제거하므로 quote와 span의 대응이 유지된다
+    (quote/span을 따로 중복 제거한 뒤 zip하면 한쪽만 중복된 행에서 어긋난다).
+    """
+    df = pd.read_csv(csv_path)
+    df = df[df["original_en"].notna() & df["article_text"].notna()]
+    if limit:
+        df = df.head(limit)
+    pairs = df[["original_en", "article_text"]].astype(str).drop_duplicates()
+    return list(pairs.itertuples(index=False, name=None))
+
+
+def load_pool(csv_path: str, limit: int | None = None) -> tuple[list[str], list[dict]]:
+    """
+    out_dataset.csv에서 (quote_en 리스트, 후보 풀)을 만든다.
+    후보 풀은 데이터셋에 저장된 원문 span(article_text) 전체이며, 모든 quote가 같은 풀을 상대로 매칭된다.
+    """
+    df = pd.read_csv(csv_path)
+    df = df[df["original_en"].notna() & df["article_text"].notna()]
+    if limit:
+        df = df.head(limit)
+
+    quotes = df["original_en"].astype(str).drop_duplicates().tolist()
+    texts = df["article_text"].astype(str).drop_duplicates().tolist()
+    candidates = [{"url": f"row:{i}", "snippet": t} for i, t in enumerate(texts)]
+    return quotes, candidates
+
+
+def _best(results: list[dict | None]) -> dict | None:
+    results = [r for r in results if r]
+    return max(results, key=lambda r: r["best_score"]) if results else None
+
+
+def bench_modes(args: argparse.Namespace) -> None:
+    quotes, candidates = load_pool(args.csv, args.limit)
+    print(f"quotes={len(quotes)} candidates={len(candidates)}")
+
+    configs = [
+        ("exact", {"mode": "exact"}),
+        ("pooled", {"mode": "pooled"}),
+        (f"pooled+rerank{args.rerank_top_n}", {"mode": "pooled", "rerank_top_n": args.rerank_top_n}),
+    ]
+    best_by_config: dict[str, list] = {}
+    for name, kwargs in configs:
+        t0 = time.perf_counter()
+        best_by_config[name] = [_best(find_best_spans_batched(q, candidates, **kwargs)) for q in quotes]
+        elapsed = time.perf_counter() - t0
+        print(f"[{name}] {elapsed:.2f}s total, {1000 * elapsed / max(1, len(quotes)):.1f} ms/quote")
+
+    reference = best_by_config["exact"]
+    for name, best in best_by_config.items():
+        if name == "exact":
+            continue
+        same = sum(
+            1
+            for a, b in zip(reference, best)
+            if a and b and (a["url"], a["span_start_idx"], a["span_end_idx"]) == (b["url"], b["span_start_idx"], b["span_end_idx"])
+        )
+        print(f"[{name}] agreement with exact: {same}/{len(quotes)}")
+
+
+def synthetic_transcript(target_span: str, filler: list[str], n_sentences: int, seed: int = 0) -> str:
+    """filler 문장으로 n_sentences 길이의 transcript를 만들고 중간 어딘가에 target_span을 심는다."""
+    rng = random.Random(seed)
+    body = [rng.choice(filler) for _ in range(n_sentences)]
+    body.insert(rng.randrange(len(body) + 1), target_span)
+    return " ".join(body)
+
+
+def bench_prefilter(args: argparse.Namespace) -> None:
+    pairs = load_pairs(args.csv, args.limit)
+    sentences = [split_into_sentences(text, is_ko=False) for _, text in pairs]
+    print(f"pairs={len(pairs)} prefilter top_n={args.top_n}")
+
+    for n_sentences in args.lengths:
+        timings = {"full": 0.0, "prefilter": 0.0}
+        same = 0
+        score_gap = 0.0
+        for i, (quote, text) in enumerate(pairs):
+            # 정답 span의 문장과 같은 문장은 filler에서 빼서 동일 텍스트 중복으로 인한 동점을 막는다
+            planted = set(sentences[i])
+            filler = [s for sents in sentences for s in sents if s not in planted]
+            doc = [{"url": "synthetic", "snippet": synthetic_transcript(text, filler, n_sentences, seed=i)}]
+
+            t0 = time.perf_counter()
+            full = find_best_spans_batched(quote, doc, prefilter_top_n=None)[0]
+            timings["full"] += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            fast = find_best_spans_batched(quote, doc, prefilter_top_n=args.top_n)[0]
+            timings["prefilter"] += time.perf_counter() - t0
+
+            if full and fast:
+                same += full["span_text"] == fast["span_text"]
+                score_gap += full["best_score"] - fast["best_score"]
+
+        n = max(1, len(pairs))
+        print(
+            f"[{n_sentences} sentences] best span unchanged {same}/{len(pairs)}, "
+            f"mean score loss {score_gap / n:.4f} | "
+            f"full {1000 * timings['full'] / n:.1f} ms/quote, "
+            f"prefilter(top {args.top_n}) {1000 * timings['prefilter'] / n:.1f} ms/quote"
+        )
+
+
+def long_transcript(n_chars: int, seed: int = 0) -> str:
+    """
+    n_chars 길이의 synthetic transcript. 중간중간 구두점 없는 긴 구간(자동 자막 형태)을 섞어서
+    토큰 예산 분할 경로도 타게 한다.
+    """
+    rng = random.Random(seed)
+    vocab = [
+        "we", "are", "going", "to", "make", "the", "country", "great", "again", "tariffs", "china",
+        "border", "jobs", "economy", "people", "very", "tremendous", "deal", "folks", "believe", "me",
+    ]
+    parts: list[str] = []
+    size = 0
+    while size < n_chars:
+        if rng.random() < 0.05:
+            piece = " ".join(rng.choice(vocab) for _ in range(rng.randint(300, 1500)))
+        else:
+            piece = " ".join(rng.choice(vocab) for _ in range(rng.randint(6, 25))).capitalize() + "."
+        parts.append(piece)
+        size += len(piece) + 1
+    return " ".join(parts)[:n_chars]
+
+
+def _memory_worker(n_chars: int, chunk_windows: int, mode: str, queue) -> None:
+    doc = [{"url": "synthetic", "snippet": long_transcript(n_chars)}]
+    quote = "We are going to put tariffs on China and bring the jobs back to our great country."
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    t0 = time.perf_counter()
+    result = find_best_spans_batched(quote, doc, mode=mode, prefilter_top_n=None, chunk_windows=chunk_windows)[0]
+    elapsed = time.perf_counter() - t0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, baseline, peak, result["span_text"] if result else None))
+
+
+def bench_memory(args: argparse.Namespace) -> None:
+    # 설정마다 새 프로세스(spawn)에서 돌려야 ru_maxrss가 이전 설정의 peak에 오염되지 않는다
+    ctx = mp.get_context("spawn")
+    spans = {}
+    for chunk_windows in args.chunks:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_memory_worker, args=(args.chars, chunk_windows, args.mode, queue))
+        proc.start()
+        elapsed, baseline, peak, span_text = queue.get()
+        proc.join()
+        spans[chunk_windows] = span_text
+        # Linux ru_maxrss 단위는 KB
+        print(
+            f"[chunk={chunk_windows}] {elapsed:.2f}s, peak RSS {peak / 1024:.0f} MB "
+            f"(+{(peak - baseline) / 1024:.0f} MB during matching)"
+        )
+    print(f"same best span across chunk sizes: {len(set(spans.values())) == 1}")
+
+
+def bench_many(args: argparse.Namespace) -> None:
+    quotes, candidates = load_pool(args.csv, args.limit)
+    rng = random.Random(0)
+    # 한 기사의 인용문 묶음처럼 quote 몇 개를 골라 같은 후보 풀에 매칭
+    quotes = rng.sample(quotes, min(args.quotes, len(quotes)))
+    print(f"quotes={len(quotes)} candidates={len(candidates)}")
+
+    t0 = time.perf_counter()
+    separate = []
+    for q in quotes:
+        spans = [s for per_doc in find_top_spans_batched(q, candidates, per_doc_k=args.k) for s in per_doc]
+        separate.append(sorted(spans, key=lambda r: r["best_score"], reverse=True)[: args.k])
+    t_separate = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    shared = top_spans_for_quotes(quotes, candidates, k=args.k)
+    t_shared = time.perf_counter() - t0
+
+    def keys(spans):
+        return [(r["url"], r["span_start_idx"], r["span_end_idx"]) for r in spans]
+
+    same = sum(keys(a) == keys(b) for a, b in zip(separate, shared))
+    print(f"[separate] {t_separate:.2f}s ({len(quotes)} passes)")
+    print(f"[many-to-many] {t_shared:.2f}s (1 pass), speedup x{t_separate / max(t_shared, 1e-9):.1f}")
+    # 점수는 quote 행마다 따로 계산하므로 (snippet_matcher._quote_similarities) prefilter가 꺼져 있으면 같아야 한다.
+    # 다르면 점수를 같이 찍는다: 차이가 1e-6 이하면 동점 처리 문제, 크면 후보 구성 차이 (prefilter 합집합 등)
+    print(f"identical top-{args.k} spans: {same}/{len(quotes)}")
+    for q, a, b in zip(quotes, separate, shared):
+        if keys(a) != keys(b):
+            print(f"  differs: {q[:50]!r}")
+            print(f"    separate: {[(r['url'], r['span_start_idx'], round(r['best_score'], 7)) for r in a]}")
+            print(f"    shared  : {[(r['url'], r['span_start_idx'], round(r['best_score'], 7)) for r in b]}")
+
+
+def bench_crosslingual(args: argparse.Namespace) -> None:
+    from qdd2.translation import translate_ko_to_en
+
+    df = pd.read_csv(args.csv)
+    df = df[df["original"].notna() & df["article_text"].notna()]
+    if args.limit:
+        df = df.head(args.limit)
+    quotes_ko = df["original"].astype(str).drop_duplicates().tolist()
+    _, candidates = load_pool(args.csv, args.limit)
+    print(f"quotes={len(quotes_ko)} candidates={len(candidates)}")
+
+    # 모델 로딩 시간은 빼고 잰다
+    translate_ko_to_en("워밍업")
+    find_best_spans_batched("warm up", candidates[:1], cross_lingual=False)
+    find_best_spans_batched("워밍업", candidates[:1], cross_lingual=True)
+
+    t_translate = t_match_en = t_match_xl = 0.0
+    same = 0
+    for quote_ko in quotes_ko:
+        t0 = time.perf_counter()
+        quote_en = translate_ko_to_en(quote_ko)
+        t1 = time.perf_counter()
+        translated = _best(find_best_spans_batched(quote_en, candidates, cross_lingual=False))
+        t2 = time.perf_counter()
+        direct = _best(find_best_spans_batched(quote_ko, candidates, cross_lingual=True))
+        t3 = time.perf_counter()
+        t_translate += t1 - t0
+        t_match_en += t2 - t1
+        t_match_xl += t3 - t2
+        if translated and direct:
+            same += (translated["url"], translated["span_start_idx"]) == (direct["url"], direct["span_start_idx"])
+
+    n = max(1, len(quotes_ko))
+    print(
+        f"[translate+en] {1000 * (t_translate + t_match_en) / n:.1f} ms/quote "
+        f"(translation {1000 * t_translate / n:.1f}, matching {1000 * t_match_en / n:.1f})"
+    )
+    print(f"[cross-lingual] {1000 * t_match_xl / n:.1f} ms/quote")
+    print(f"best span agreement: {same}/{len(quotes_ko)}")
+
+
+def bench_windows(args: argparse.Namespace) -> None:
+    quotes, candidates = load_pool(args.csv, args.limit)
+    configs = [tuple(int(x) for x in c.split(":")) for c in args.configs]
+    print(f"quotes={len(quotes)} candidates={len(candidates)} configs={configs} mode={args.mode}")
+
+    t0 = time.perf_counter()
+    sweep = {
+        wc: [_best(find_best_spans_batched(q, candidates, num_before=wc[0], num_after=wc[1], mode=args.mode)) for q in quotes]
+        for wc in configs
+    }
+    t_sweep = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    multi = {wc: [] for wc in configs}
+    for q in quotes:
+        for wc, results in match_window_configs(q, candidates, configs, mode=args.mode).items():
+            multi[wc].append(_best(results))
+    t_multi = time.perf_counter() - t0
+
+    print(f"[one run per setting] {t_sweep:.2f}s")
+    print(f"[multi-window] {t_multi:.2f}s, speedup x{t_sweep / max(t_multi, 1e-9):.1f}")
+    for wc in configs:
+        same = sum(
+            1
+            for a, b in zip(sweep[wc], multi[wc])
+            if a and b and (a["url"], a["span_start_idx"], a["span_end_idx"]) == (b["url"], b["span_start_idx"], b["span_end_idx"])
+        )
+        print(f"  {wc}: same best span {same}/{len(quotes)}")
+
+
+def _legacy_span_dict(url: str, units: list, center: int, start: int, end: int, score: float) -> dict:
+    """SpanMatch 도입 전 _span_result가 만들던 dict (span_text/best_sentence를 복사해서 들고 있음)."""
+    return {
+        "url": url,
+        "best_sentence": units[center][0],
+        "best_score": score,
+        "span_text": " ".join(u[0] for u in units[start : end + 1]),
+        "span_start_idx": start,
+        "span_end_idx": end,
+        "span_char_start": units[start][1],
+        "span_char_end": units[end][2],
+        "match_type": "semantic",
+    }
+
+
+def bench_results(args: argparse.Namespace) -> None:
+    vocab = ["tariffs", "china", "border", "jobs", "economy", "people", "deal", "great", "country", "believe"]
+
+    def make_plans():
+        """후보 문서 풀 + quote마다 (문서, window, 점수) 후보 목록 (같은 seed로 두 표현에 같은 입력)."""
+        rng = random.Random(0)
+        docs = []
+        for d in range(args.docs):
+            units, pos = [], 0
+            for _ in range(args.sentences):
+                sent = " ".join(rng.choice(vocab) for _ in range(rng.randint(8, 25))) + "."
+                units.append((sent, pos, pos + len(sent)))
+                pos += len(sent) + 1
+            docs.append((f"https://example.com/doc/{d}", units))
+
+        plans = []
+        for _ in range(args.quotes):
+            spans = []
+            for url, units in rng.sample(docs, args.per_quote):
+                center = rng.randrange(1, len(units) - 1)
+                spans.append((url, units, center, center - 1, center + 1, rng.random()))
+            spans.sort(key=lambda x: x[-1], reverse=True)
+            plans.append(spans)
+        return plans
+
+    def build_dicts(plans):
+        out = []
+        for spans in plans:
+            ranked = [_legacy_span_dict(*sp) for sp in spans]
+            ranked[0]["top_k_candidates"] = ranked  # 예전 debug 결과: best가 자기 자신을 포함한 리스트를 참조
+            out.append(ranked[0])
+        return out
+
+    def build_slots(plans):
+        out = []
+        for spans in plans:
+            ranked = [
+                SpanMatch(url=url, units=units, center_idx=c, span_start_idx=s, span_end_idx=e, best_score=score)
+                for url, units, c, s, e, score in spans
+            ]
+            ranked[0].alternatives = tuple(ranked[1:])
+            out.append(ranked[0])
+        return out
+
+    def build_detached(plans):
+        # matcher 밖으로 나갈 때처럼 detached(): 각 span이 자기 window 문장만 들고 있다
+        return [span.detached() for span in build_slots(plans)]
+
+    # 문서도 traced 구간 안에서 만든다: dict는 span 텍스트를 복사하므로 결과만 남기면 문서가 해제되지만,
+    # detach하지 않은 SpanMatch는 문서의 문장 리스트를 참조로 붙잡고 있어서 그 문서들까지 결과의 비용이다
+    for name, build in (("dict", build_dicts), ("SpanMatch", build_slots), ("SpanMatch/detached", build_detached)):
+        gc.collect()
+        tracemalloc.start()
+        plans = make_plans()
+        results = build(plans)
+        del plans
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        per_10k = current * 10_000 / max(1, args.quotes)
+        print(
+            f"[{name}] {current / 2**20:.1f} MB held incl. referenced documents "
+            f"({per_10k / 2**20:.1f} MB per 10k quotes), peak {peak / 2**20:.1f} MB"
+        )
+        del results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Snippet matcher benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    modes = sub.add_parser("modes", help="exact vs pooled matching on out_dataset.csv quotes")
+    modes.add_argument("--csv", default="out_dataset.csv")
+    modes.add_argument("--limit", type=int, default=None)
+    modes.add_argument("--rerank-top-n", type=int, default=5)
+    modes.set_defaults(func=bench_modes)
+
+    prefilter = sub.add_parser("prefilter", help="BM25 prefilter recall/latency on synthetic transcripts")
+    prefilter.add_argument("--csv", default="out_dataset.csv")
+    prefilter.add_argument("--limit", type=int, default=50)
+    prefilter.add_argument("--top-n", type=int, default=200)
+    prefilter.add_argument("--lengths", type=int, nargs="+", default=[200, 1000, 5000])
+    prefilter.set_defaults(func=bench_prefilter)
+
+    memory = sub.add_parser("memory", help="peak memory of chunked encoding on one long synthetic transcript")
+    memory.add_argument("--chars", type=int, default=500_000)
+    memory.add_argument("--chunks", type=int, nargs="+", default=[128, 512, 100_000_000])
+    memory.add_argument("--mode", choices=["exact", "pooled"], default="exact")
+    memory.set_defaults(func=bench_memory)
+
+    many = sub.add_parser("many", help="separate vs many-to-many matching of several quotes on one pool")
+    many.add_argument("--csv", default="out_dataset.csv")
+    many.add_argument("--limit", type=int, default=None)
+    many.add_argument("--quotes", type=int, default=10)
+    many.add_argument("--k", type=int, default=3)
+    many.set_defaults(func=bench_many)
+
+    crosslingual = sub.add_parser("crosslingual", help="Marian translation path vs multilingual encoder path")
+    crosslingual.add_argument("--csv", default="out_dataset.csv")
+    crosslingual.add_argument("--limit", type=int, default=100)
+    crosslingual.set_defaults(func=bench_crosslingual)
+
+    windows = sub.add_parser("windows", help="window-size sweep: separate runs vs one multi-window call")
+    windows.add_argument("--csv", default="out_dataset.csv")
+    windows.add_argument("--limit", type=int, default=50)
+    windows.add_argument("--configs", nargs="+", default=["0:0", "1:1", "2:1", "2:2"], help="num_before:num_after")
+    windows.add_argument("--mode", choices=["exact", "pooled"], default="pooled")
+    windows.set_defaults(func=bench_windows)
+
+    results = sub.add_parser("results", help="memory of span result objects (dict vs SpanMatch)")
+    results.add_argument("--quotes", type=int, default=10_000)
+    results.add_argument("--per-quote", type=int, default=10, help="span candidates kept per quote")
+    results.add_argument("--docs", type=int, default=200)
+    results.add_argument("--sentences", type=int, default=150)
+    results.set_defaults(func=bench_results)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Offline checks for the NER decoding path, using articles.csv.
+
+Usage:
+  python bench_ner.py decode --csv articles.csv --repeat 20
+  python bench_ner.py windows --csv articles.csv --window 128 --stride 32
+
+Subcommands:
+  decode  : real pipeline("ner") output through merge_ner_entities vs extract_ner_entities, compared
+            exactly (identical / whitespace-only / different), plus decode latency of both decoders.
+            Whitespace-only differences are expected: multi-word entities keep the article's spacing
+            ("도널드 트럼프", not the old "도널드트럼프"). Sentences longer than NER_WINDOW_TOKENS are
+            counted separately: they are tagged in overlapping windows, so labels near window edges can differ
+  windows : entity recall/latency on run-on sentences (each article joined into one sentence):
+            truncation at model_max_length (pipeline behaviour) vs overlapping token windows
+"""
+
+import argparse
+import time
+from collections import Counter
+
+import pandas as pd
+import torch
+
+from qdd2 import config
+from qdd2.entities import (
+    decode_bio_entities,
+    extract_ner_entities,
+    iter_ner_label_ids,
+    merge_ner_entities,
+    model_bio_tables,
+)
+from qdd2.models import get_ner_pipeline
+from qdd2.text_utils import as_document
+
+
+def load_sentences(csv_path: str, limit: int | None = None) -> list[str]:
+    df = pd.read_csv(csv_path)
+    df = df[df["content"].notna()]
+    if limit:
+        df = df.head(limit)
+    return [s for t in df["content"].astype(str) for s in as_document(t).sentences()]
+
+
+def _compare(old: list[dict], new: list[dict]) -> str:
+    """entity 리스트 비교: "same" / "spacing"(공백만 다름) / "diff". 공백 정규화 없이 먼저 그대로 비교한다."""
+    if old == new:
+        return "same"
+
+    def squash(ents: list[dict]) -> list[tuple[str, str]]:
+        return [(e["label"], "".join(e["word"].split())) for e in ents]
+
+    return "spacing" if squash(old) == squash(new) else "diff"
+
+
+def bench_decode(args: argparse.Namespace) -> None:
+    sentences = load_sentences(args.csv, args.limit)
+    ner = get_ner_pipeline(device=args.device)
+    tables = model_bio_tables(ner.model)
+
+    # 예전 경로: pipeline("ner") 출력 그대로 → merge_ner_entities. 새 경로: extract_ner_entities (공개 함수 그대로)
+    raw = [ner(sentence) for sentence in sentences]
+    old = [merge_ner_entities(r) for r in raw]
+    new = [extract_ner_entities(sentence, device=args.device) for sentence in sentences]
+
+    # NER_WINDOW_TOKENS보다 긴 문장은 새 경로가 window로 나눠 태깅하므로 window 경계 근처 label이 달라질 수 있다
+    window = min(config.NER_WINDOW_TOKENS or ner.tokenizer.model_max_length, ner.tokenizer.model_max_length)
+    lengths = [len(ids) for ids in ner.tokenizer(sentences)["input_ids"]]
+
+    counts = Counter()
+    shown = Counter()
+    spaced = Counter()
+    for sentence, n_tokens, a, b in zip(sentences, lengths, old, new):
+        kind = _compare(a, b)
+        if kind == "diff" and n_tokens > window:
+            kind = "windowed"
+        counts[kind] += 1
+        if kind == "spacing":
+            spaced.update((x["word"], y["word"]) for x, y in zip(a, b) if x["word"] != y["word"])
+        if kind != "same" and shown[kind] < args.show:
+            shown[kind] += 1
+            print(f"  [{kind}] {sentence[:60]!r}\n    old={a}\n    new={b}")
+    n_entities = sum(len(x) for x in new)
+    print(
+        f"{len(sentences)} sentences, {n_entities} entities: identical {counts['same']}, "
+        f"whitespace-only {counts['spacing']}, different {counts['diff']}, "
+        f"different in windowed sentences (>{window} tokens) {counts['windowed']}"
+    )
+    for (a, b), n in spaced.most_common(args.show):
+        print(f"  spacing: {a!r} -> {b!r} ({n}x)")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for r in raw:
+            merge_ner_entities(r)
+    old_time = (time.perf_counter() - start) / args.repeat
+
+    ids_offsets = list(iter_ner_label_ids(sentences, device=args.device))
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for sentence, (ids, offs) in zip(sentences, ids_offsets):
+            decode_bio_entities(sentence, ids, offs, tables)
+    new_time = (time.perf_counter() - start) / args.repeat
+
+    per = 1e6 / max(1, len(sentences))
+    print(f"[merge_ner_entities]  {old_time * per:.1f} us/sentence (decode only)")
+    print(f"[decode_bio_entities] {new_time * per:.1f} us/sentence (decode only)")
+
+
+def _truncated_entities(run_on: str, device: int) -> list[dict]:
+    """예전 pipeline 방식: model_max_length에서 잘라 한 번만 태깅."""
+    ner = get_ner_pipeline(device=device)
+    tokenizer, model = ner.tokenizer, ner.model
+    enc = tokenizer(run_on, truncation=True, return_offsets_mapping=True, return_tensors="pt")
+    offsets = enc.pop("offset_mapping")[0].numpy()
+    with torch.inference_mode():
+        logits = model(**{k: v.to(model.device) for k, v in enc.items()}).logits
+    return decode_bio_entities(run_on, logits.argmax(dim=-1)[0].cpu().numpy(), offsets, model_bio_tables(model))
+
+
+def _recall(reference: list[dict], found: list[dict]) -> tuple[int, int]:
+    ref = Counter((e["label"], e["word"]) for e in reference)
+    got = Counter((e["label"], e["word"]) for e in found)
+    return sum((ref & got).values()), sum(ref.values())
+
+
+def bench_windows(args: argparse.Namespace) -> None:
+    df = pd.read_csv(args.csv)
+    texts = df[df["content"].notna()]["content"].astype(str).tolist()[: args.limit]
+    # 기사 하나를 문장부호 없이 이어 붙여 분리되지 않는 긴 문장을 만든다
+    run_ons = [" ".join(s.rstrip(".!?") for s in as_document(t).sentences()) for t in texts]
+    reference = [extract_ner_entities(t, device=args.device) for t in texts]  # 문장 단위 결과를 기준으로 본다
+
+    totals = {"truncate": [0, 0, 0.0], "windows": [0, 0, 0.0]}
+    for run_on, ref in zip(run_ons, reference):
+        start = time.perf_counter()
+        found = _truncated_entities(run_on, args.device)
+        totals["truncate"][2] += time.perf_counter() - start
+        hit, n = _recall(ref, found)
+        totals["truncate"][0] += hit
+        totals["truncate"][1] += n
+
+    # window 쪽은 모든 run-on 문장의 window를 한 번에 배치로 돌린다
+    start = time.perf_counter()
+    ids_offsets = list(
+        iter_ner_label_ids(run_ons, device=args.device, max_tokens=args.window, stride=args.stride)
+    )
+    tables = model_bio_tables(get_ner_pipeline(device=args.device).model)
+    for run_on, ref, (label_ids, offsets) in zip(run_ons, reference, ids_offsets):
+        hit, n = _recall(ref, decode_bio_entities(run_on, label_ids, offsets, tables))
+        totals["windows"][0] += hit
+        totals["windows"][1] += n
+    totals["windows"][2] = time.perf_counter() - start
+
+    print(f"{len(run_ons)} run-on sentences, avg {sum(map(len, run_ons)) / max(1, len(run_ons)):.0f} chars")
+    for name, (hit, n, elapsed) in totals.items():
+        print(f"[{name}] entity recall vs per-sentence NER {hit}/{n} ({hit / max(1, n):.3f}), {elapsed:.2f}s")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="NER decoding benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    decode = sub.add_parser("decode", help="pipeline(\"ner\") + merge_ner_entities vs extract_ner_entities, and latency")
+    decode.add_argument("--csv", default="articles.csv")
+    decode.add_argument("--limit", type=int, default=None)
+    decode.add_argument("--device", type=int, default=-1)
+    decode.add_argument("--repeat", type=int, default=20)
+    decode.add_argument("--show", type=int, default=5, help="print the first N sentences of each mismatch kind")
+    decode.set_defaults(func=bench_decode)
+
+    windows = sub.add_parser("windows", help="truncation vs sliding-window NER on run-on sentences")
+    windows.add_argument("--csv", default="articles.csv")
+    windows.add_argument("--limit", type=int, default=None)
+    windows.add_argument("--device", type=int, default=-1)
+    windows.add_argument("--window", type=int, default=128, help="tokens per window")
+    windows.add_argument("--stride", type=int, default=32, help="tokens shared by adjacent windows")
+    windows.set_defaults(func=bench_windows)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,60 @@
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from typing import Iterator
+
 import pandas as pd
+import torch
 from tqdm import tqdm
 
-from main import run_qdd2
+from main import (
+    Qdd2Task,
+    get_cpu_executor,
+    run_in_executor,
+    run_qdd2,
+    step_extract,
+    step_extract_async,
+    step_fetch,
+    step_fetch_async,
+    step_match,
+    step_match_batch,
+    step_prepare_match,
+    step_search,
+    step_search_async,
+    task_extraction,
+)
+from qdd2 import config
+from qdd2.embedding_store import text_hash
+from qdd2.keywords import extract_keywords_with_ner_batch
+from qdd2.name_resolution import get_wikidata_english_name, translate_person_name
+from qdd2.stages import OrderedTurns, Stage, StageFailure, run_stages
+from qdd2.tfidf_keywords import use_memory_only_df_tables
 from qdd2.translation import translate_ko_to_en
-from qdd2.text_utils import extract_quotes
+from qdd2.text_utils import DOUBLE_QUOTE_STYLES, scan_quotes
 
 
-def build_dataset_from_articles(
-    input_csv: str,
+def iter_quote_jobs(
+    df_articles: pd.DataFrame,
     text_col: str = "content",
-    date_col: str = "date",          # 날짜 컬럼명
-    output_csv: str | None = None,
-    rollcall: bool = True,           # ← "트럼프일 때 rollcall 허용" 플래그
-    span_top_k: int = 3,             # ← 인용문마다 원문 후보 TOP K개 추출
-    min_score: float | None = None,  # ← 최소 similarity threshold (예: 0.2)
-) -> pd.DataFrame:
-    df_articles = pd.read_csv(input_csv)
-    print("기사 컬럼:", df_articles.columns.tolist())
-
-    records = []
+    date_col: str = "date",
+    rollcall: bool = True,
+) -> Iterator[dict]:
+    """
+    기사 DataFrame에서 인용문 단위 작업을 원래 순서대로 만든다.
+    각 작업: {"id", "article_text", "title", "date", "quote_ko", "quote_span", "use_rollcall"}
+    (id는 인용문 단위 global id, quote_span은 article_text 안의 인용문 offset — quote-local 추출에 쓴다)
+    """
     gid = 0  # quote 단위 global id
 
-    for _, row in tqdm(df_articles.iterrows(), total=len(df_articles)):
+    for _, row in df_articles.iterrows():
         article_text = row.get(text_col, "")
         if not isinstance(article_text, str) or not article_text.strip():
             continue
@@ -29,19 +62,21 @@ def build_dataset_from_articles(
         # 날짜
         article_date = row.get(date_col, None)
 
-        # 인용문 추출: 헤드라인(title) + 본문(content) 둘 다에서 따옴표 추출
+        # 인용문 추출: 헤드라인(title) + 본문(content) 둘 다에서 큰따옴표 계열(" “” « » 「」 『』) 추출
         quotes_ko: list[str] = []
 
         # 1) 헤드라인 인용문
         title_text = row.get("title", "")
         if isinstance(title_text, str) and title_text.strip():
-            title_quotes = extract_quotes(title_text) or []
-            quotes_ko.extend(title_quotes)
+            title_quotes = scan_quotes(title_text, styles=DOUBLE_QUOTE_STYLES, min_length=config.QUOTE_MIN_LENGTH)
+            quotes_ko.extend(q.text for q in title_quotes)
 
-        # 2) 본문 인용문 (기존 로직)
+        # 2) 본문 인용문 (기존 로직) + 원문 offset (같은 인용문이 여러 번 나오면 첫 위치)
+        quote_spans: dict[str, tuple[int, int]] = {}
         if isinstance(article_text, str) and article_text.strip():
-            body_quotes = extract_quotes(article_text) or []
-            quotes_ko.extend(body_quotes)
+            for span in scan_quotes(article_text, styles=DOUBLE_QUOTE_STYLES, min_length=config.QUOTE_MIN_LENGTH):
+                quotes_ko.append(span.text)
+                quote_spans.setdefault(span.text, (span.start, span.end))
 
         # 3) 중복 제거
         quotes_ko = list(dict.fromkeys(q for q in quotes_ko if q))
@@ -74,122 +109,778 @@ def build_dataset_from_articles(
             # 그리고 진짜 트럼프 문맥일 때만 rollcall 사용
             use_rollcall = rollcall and (is_trump_article or is_trump_quote)
 
-            try:
-                original_en = translate_ko_to_en(quote_ko)
-            except Exception:
-                original_en = None
+            yield {
+                "id": gid,
+                "article_text": article_text,
+                "title": title_text if isinstance(title_text, str) else None,
+                "date": article_date,
+                "quote_ko": quote_ko,
+                "quote_span": quote_spans.get(quote_ko),  # 본문에 없는 헤드라인 인용문은 None
+                "use_rollcall": use_rollcall,
+            }
+
+
+def translate_original(quote_ko: str, translate_quotes: bool) -> str | None:
+    if not translate_quotes:
+        return None
+    try:
+        return translate_ko_to_en(quote_ko)
+    except Exception:
+        return None
+
+
+def make_task(job: dict, span_top_k: int) -> Qdd2Task:
+    """build_dataset이 run_qdd2에 넘기는 인자 그대로의 Qdd2Task."""
+    return Qdd2Task(
+        text=job["article_text"],
+        quote=job["quote_ko"],
+        date=job["date"],
+        top_n=15,
+        top_k=3,              # (키워드 관련 top_k; 기존 그대로 유지)
+        rollcall=job["use_rollcall"],
+        debug=False,
+        search=True,
+        top_matches=span_top_k,  # SBERT top-k 설정 (문서당 겹치지 않는 span 포함)
+        title=job["title"],
+        quote_span=job["quote_span"],
+    )
 
+
+def error_record(job: dict, original_en: str | None, error: BaseException) -> dict:
+    return {
+        "id": job["id"],          # 인용문 ID
+        "rank": None,             # 후보 순위
+        "original": job["quote_ko"],
+        "original_en": original_en,
+        "source_quote_en": None,
+        "article_text": None,
+        "similarity": None,
+        "match_type": None,
+        "source_url": None,
+        "error": str(error),
+    }
+
+
+def quote_records(
+    job: dict,
+    out: dict,
+    original_en: str | None,
+    span_top_k: int,
+    min_score: float | None,
+) -> list[dict]:
+    """run_qdd2 결과 하나를 데이터셋 row들(후보 순위별)로 변환."""
+    gid = job["id"]
+    quote_ko = job["quote_ko"]
+    records = []
+
+    # 1) run_qdd2에서 span 후보 리스트를 돌려준다고 가정
+    #    예: out["span_candidates"] = [
+    #         {"best_sentence": ..., "span_text": ..., "best_score": ..., "url": ...},
+    #         {"best_sentence": ..., "span_text": ..., "best_score": ..., "url": ...},
+    #         ...
+    #       ]
+    span_candidates = out.get("span_candidates") or []
+
+    print("span_candidates 개수:", len(span_candidates), " / quote:", quote_ko[:30])
+
+    # 후보 리스트가 없다면, 기존 best_span 하나만 쓰는 fallback
+    if not span_candidates:
+        best_span = out.get("best_span") or {}
+
+        source_quote_en = (
+            best_span.get("best_sentence")
+            or best_span.get("sentence")
+            or best_span.get("span_text")
+        )
+        article_span_en = (
+            best_span.get("span_text")
+            or best_span.get("sentence")
+        )
+        sim_score = (
+            best_span.get("best_score")
+            or best_span.get("score")
+        )
+        source_url = best_span.get("url")
+
+        # ===== 여기서 min_score 필터링 =====
+        if (min_score is not None) and (sim_score is not None) and (sim_score < min_score):
+            return records
+
+        records.append(
+            {
+                "id": gid,
+                "rank": 1,  # 유일한 후보
+                "original": quote_ko,
+                "original_en": original_en,
+                "source_quote_en": source_quote_en,
+                "article_text": article_span_en,
+                "similarity": sim_score,
+                "match_type": best_span.get("match_type"),  # "semantic" / "lexical" (similarity는 둘 다 SBERT cosine)
+                "source_url": source_url,
+                "error": None,
+            }
+        )
+        return records
+
+    # 2) span_candidates가 있으면, TOP K개까지 여러 row로 저장
+    for rank, cand in enumerate(span_candidates[:span_top_k], start=1):
+        source_quote_en = (
+            cand.get("best_sentence")
+            or cand.get("sentence")
+            or cand.get("span_text")
+        )
+        article_span_en = (
+            cand.get("span_text")
+            or cand.get("sentence")
+        )
+        sim_score = (
+            cand.get("best_score")
+            or cand.get("score")
+        )
+        source_url = cand.get("url")
+
+        # ===== 여기서 min_score 필터링 =====
+        if (min_score is not None) and (sim_score is not None) and (sim_score < min_score):
+            continue
+
+        records.append(
+            {
+                "id": gid,                 # 인용문 ID (같음)
+                "rank": rank,              # 후보 순위 (1~K)
+                "original": quote_ko,
+                "original_en": original_en,
+                "source_quote_en": source_quote_en,
+                "article_text": article_span_en,
+                "similarity": sim_score,
+                "match_type": cand.get("match_type"),
+                "source_url": source_url,
+                "error": None,
+            }
+        )
+    return records
+
+
+def iter_serial_records(
+    jobs: Iterator[dict],
+    span_top_k: int,
+    min_score: float | None,
+    translate_quotes: bool,
+) -> Iterator[list[dict]]:
+    """인용문 하나씩 run_qdd2를 끝까지 돌린다 (인용문마다 row 리스트를 yield)."""
+    for job in jobs:
+        original_en = translate_original(job["quote_ko"], translate_quotes)
+        task = make_task(job, span_top_k)
+        try:
+            out = run_qdd2(
+                text=task.text,
+                file_path=None,
+                quote=task.quote,
+                date=task.date,
+                top_n=task.top_n,
+                top_k=task.top_k,
+                rollcall=task.rollcall,
+                debug=task.debug,
+                search=task.search,
+                top_matches=task.top_matches,
+                title=task.title,
+                quote_span=task.quote_span,
+            )
+        except Exception as e:
+            yield [error_record(job, original_en, e)]
+            continue
+        yield quote_records(job, out, original_en, span_top_k, min_score)
+
+
+def iter_staged_records(
+    jobs: Iterator[dict],
+    span_top_k: int,
+    min_score: float | None,
+    translate_quotes: bool,
+    cpu_batch: int = config.PIPELINE_CPU_BATCH,
+    io_workers: int = config.PIPELINE_IO_WORKERS,
+) -> Iterator[list[dict]]:
+    """
+    run_qdd2의 단계들을 qdd2.stages 엔진으로 돌린다 (인용문 순서대로 row 리스트를 yield, serial과 같은 결과).
+
+      extract   (CPU, 배치, 순서 유지) : original_en 번역 + 키워드/NER. 배치 안의 서로 다른 기사는
+                                         extract_keywords_with_ner_batch 한 번으로 (같은 기사의 인용문은 공유)
+      speaker   (I/O, io_workers개)    : 발화자(PER 첫 번째)의 Wikidata 영어 이름 조회
+      query     (CPU, 배치)            : 이름 번역 fallback + 쿼리 생성 + 트럼프 문맥 감지
+      search    (I/O, io_workers개)    : Rollcall / Google CSE
+      translate (CPU, 배치)            : 매칭용 인용문 번역
+      fetch     (I/O, io_workers개)    : transcript 본문
+      match     (CPU, 배치, 순서 유지) : 배치의 인용문 전체를 SBERT 한 번으로 매칭 (step_match_batch,
+                                         archive 인덱스 추가 순서가 serial과 같도록)
+    """
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    # quote-local 추출이 꺼져 있으면 추출 결과는 기사 텍스트에만 의존한다
+    share_extraction = config.QUERY_CONTEXT_SENTENCES is None
+    last_extraction: dict = {}  # 직전 배치 마지막 기사의 article_text -> extraction (extract stage는 worker 1개)
+
+    def run_step(state: dict, step) -> None:
+        if state["error"] is None:
             try:
-                out = run_qdd2(
-                    text=article_text,
-                    file_path=None,
-                    quote=quote_ko,
-                    date=article_date,
-                    top_n=15,
-                    top_k=3,              # (키워드 관련 top_k; 기존 그대로 유지)
-                    rollcall=use_rollcall,
-                    debug=False,
-                    search=True,
-                    top_matches=2,  # SBERT top-k 설정
-                )
+                step(state["task"])
             except Exception as e:
-                records.append(
-                    {
-                        "id": gid,               # 인용문 ID
-                        "rank": None,            # 후보 순위
-                        "original": quote_ko,
-                        "original_en": original_en,
-                        "source_quote_en": None,
-                        "article_text": None,
-                        "similarity": None,
-                        "source_url": None,
-                        "error": str(e),
-                    }
+                state["error"] = e
+
+    def per_item(step):
+        def fn(states: list[dict]) -> list[dict]:
+            for state in states:
+                run_step(state, step)
+            return states
+        return fn
+
+    def extract_articles(texts: list[str], task: Qdd2Task) -> dict:
+        """기사 전체 추출 {article_text: extraction | Exception}. 배치가 실패하면 기사별로 다시 돌려 실패를 가둔다."""
+        def batch(chunk: list[str]) -> list[dict]:
+            return extract_keywords_with_ner_batch(chunk, top_n=task.top_n, device=0, debug=task.debug)  # CPU
+
+        try:
+            return dict(zip(texts, batch(texts)))
+        except Exception:
+            out = {}
+            for text in texts:
+                try:
+                    out[text] = batch([text])[0]
+                except Exception as e:
+                    out[text] = e
+            return out
+
+    def extract(states: list[dict]) -> list[dict]:
+        for state in states:
+            state["original_en"] = translate_original(state["task"].quote, translate_quotes)
+        if not share_extraction:
+            for state in states:
+                try:
+                    state["extraction"] = task_extraction(state["task"])
+                except Exception as e:
+                    state["error"] = e
+            return states
+
+        texts = list(dict.fromkeys(state["task"].text for state in states))
+        extracted = dict(last_extraction)
+        missing = [t for t in texts if t not in extracted]
+        if missing:
+            extracted.update(extract_articles(missing, states[0]["task"]))
+        for state in states:
+            result = extracted[state["task"].text]
+            if isinstance(result, Exception):
+                state["error"] = result
+            else:
+                state["extraction"] = result
+        last_extraction.clear()
+        if not isinstance(extracted[texts[-1]], Exception):
+            last_extraction[texts[-1]] = extracted[texts[-1]]
+        return states
+
+    def speaker_name(state: dict) -> str | None:
+        per_list = state["extraction"]["entities_by_type"].get("PER") or []
+        return per_list[0] if per_list else None
+
+    def lookup_speaker(states: list[dict]) -> list[dict]:
+        for state in states:
+            name_ko = speaker_name(state) if state["error"] is None else None
+            if name_ko:
+                state["speaker_en"] = get_wikidata_english_name(name_ko).get("en")
+        return states
+
+    def build_query(states: list[dict]) -> list[dict]:
+        for state in states:
+            if state["error"] is not None:
+                continue
+            name_ko = speaker_name(state)
+            speaker_en = state["speaker_en"] or (translate_person_name(name_ko) if name_ko else None)
+            extraction = state["extraction"]
+            run_step(state, lambda t: step_extract(t, extraction=extraction, speaker_en=speaker_en))
+        return states
+
+    def match(states: list[dict]) -> list[dict]:
+        step_match_batch([state["task"] for state in states if state["error"] is None])
+        return states
+
+    stages = [
+        Stage("extract", extract, batch_size=cpu_batch, ordered=True),
+        Stage("speaker", lookup_speaker, workers=io_workers),
+        Stage("query", build_query, batch_size=cpu_batch),
+        Stage("search", per_item(step_search), workers=io_workers),
+        Stage("translate", per_item(step_prepare_match), batch_size=cpu_batch),
+        Stage("fetch", per_item(step_fetch), workers=io_workers),
+        Stage("match", match, batch_size=cpu_batch, ordered=True),
+    ]
+    states = (
+        {
+            "job": job,
+            "task": make_task(job, span_top_k),
+            "original_en": None,
+            "extraction": None,
+            "speaker_en": None,
+            "error": None,
+        }
+        for job in jobs
+    )
+    for state in run_stages(states, stages):
+        if isinstance(state, StageFailure):
+            state.item["error"] = state.error
+            state = state.item
+        if state["error"] is not None:
+            yield [error_record(state["job"], state["original_en"], state["error"])]
+        else:
+            yield quote_records(state["job"], state["task"].output(), state["original_en"], span_top_k, min_score)
+
+
+def iter_async_records(
+    jobs: Iterator[dict],
+    span_top_k: int,
+    min_score: float | None,
+    translate_quotes: bool,
+    max_in_flight: int = config.ASYNC_MAX_IN_FLIGHT,
+) -> Iterator[list[dict]]:
+    """
+    인용문 max_in_flight개를 한 이벤트 루프에서 동시에 돌린다 (main.run_qdd2_async와 같은 async step들).
+    네트워크는 httpx.AsyncClient 하나를 공유하고, 모델 호출은 get_cpu_executor() 한 thread에 줄을 선다.
+    추출(DF 테이블)과 매칭(archive 인덱스)은 OrderedTurns로 인용문 순서대로 지나가게 해서 serial과 같은 결과를 낸다.
+    이벤트 루프는 background thread에서 돌고 결과를 queue로 넘긴다. 결과는 인용문 순서대로 yield하고,
+    아직 소비되지 않은 결과까지 포함해 max_in_flight개까지만 인용문을 시작한다.
+    generator를 닫으면 남은 인용문을 취소하고 loop thread를 join한다.
+    """
+    from qdd2.async_client import create_client  # httpx는 async engine에서만 필요
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    share_extraction = config.QUERY_CONTEXT_SENTENCES is None
+    last_extraction: dict = {}  # article_text -> extraction (extract turn 안에서만 건드린다)
+    executor = get_cpu_executor()
+    loop = asyncio.new_event_loop()
+
+    async def run_job(seq: int, job: dict, client, extract_turns: OrderedTurns, match_turns: OrderedTurns):
+        task = make_task(job, span_top_k)
+        original_en = await run_in_executor(executor, translate_original, task.quote, translate_quotes)
+        error = None
+        extraction = None
+        async with extract_turns.turn(seq):
+            try:
+                extraction = last_extraction.get(task.text) if share_extraction else None
+                if extraction is None:
+                    extraction = await run_in_executor(executor, task_extraction, task)
+                if share_extraction:
+                    last_extraction.clear()
+                    last_extraction[task.text] = extraction
+            except Exception as e:
+                error = e
+        if error is None:
+            try:
+                await step_extract_async(task, client, executor, extraction=extraction)
+                await step_search_async(task, client)
+                await run_in_executor(executor, step_prepare_match, task)
+                await step_fetch_async(task, client)
+            except Exception as e:
+                error = e
+        async with match_turns.turn(seq):
+            if error is None:
+                try:
+                    await run_in_executor(executor, step_match, task)
+                except Exception as e:
+                    error = e
+        if error is not None:
+            return [error_record(job, original_en, error)]
+        return quote_records(job, task.output(), original_en, span_top_k, min_score)
+
+    async def feed(client, slots: asyncio.Semaphore, started: asyncio.Queue) -> None:
+        extract_turns, match_turns = OrderedTurns(), OrderedTurns()
+        try:
+            for seq, job in enumerate(jobs):
+                await slots.acquire()
+                await started.put(asyncio.ensure_future(run_job(seq, job, client, extract_turns, match_turns)))
+        finally:
+            started.put_nowait(None)  # jobs가 예외를 내도 produce가 기다리지 않고 feeder의 예외를 받게
+
+    async def produce() -> None:
+        """loop thread: 인용문을 시작하고 끝난 순서와 무관하게 입력 순서대로 results에 넣는다."""
+        nonlocal slots
+        slots = asyncio.Semaphore(max_in_flight)
+        started: asyncio.Queue = asyncio.Queue()
+        client = create_client()
+        feeder = asyncio.ensure_future(feed(client, slots, started))
+        try:
+            while True:
+                job_future = await started.get()
+                if job_future is None:
+                    break
+                results.put((False, await job_future))
+            await feeder
+        finally:
+            pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task() and not t.done()]
+            for t in pending:
+                t.cancel()
+            if pending:
+                await asyncio.wait(pending)
+            await client.aclose()
+
+    def run_loop() -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(producer)
+            results.put((True, None))
+        except BaseException as e:
+            results.put((True, e))
+
+    # 이벤트 루프는 별도 thread에서 계속 돈다: generator가 소비자 쪽에 멈춰 있는 동안에도 in-flight 인용문의
+    # 네트워크 I/O가 진행되고, 소비자는 results queue에서 꺼낼 때마다 slot 하나를 돌려준다
+    results: queue.Queue = queue.Queue()
+    slots: asyncio.Semaphore | None = None
+    producer = loop.create_task(produce())
+    thread = threading.Thread(target=run_loop, name="qdd2-async-records", daemon=True)
+    thread.start()
+    try:
+        while True:
+            done, item = results.get()
+            if done:
+                if item is not None:
+                    raise item
+                break
+            loop.call_soon_threadsafe(slots.release)
+            yield item
+    finally:
+        if thread.is_alive():
+            loop.call_soon_threadsafe(producer.cancel)
+        thread.join()
+        loop.close()
+
+
+def _preload_models() -> None:
+    """
+    fork 전에 부모에서 파이프라인 모델을 올려 둔다. worker는 weight 메모리를 copy-on-write로 공유하므로
+    worker 수만큼 모델이 복사되지 않는다 (추론은 하지 않고 로딩만 → fork 뒤 thread pool 문제 없음).
+    호출 인자는 실제 호출부와 같아야 lru_cache가 같은 객체를 돌려준다.
+    """
+    from qdd2.models import get_keyword_model, get_ner_pipeline, get_sentence_model, get_translation_models
+    from qdd2.snippet_matcher import matcher_model_name
+
+    get_ner_pipeline(device=0)  # main의 step_extract와 같은 device 인자
+    if config.KEYWORD_ENGINE == "keybert":
+        get_keyword_model()
+    get_translation_models()
+    get_sentence_model(matcher_model_name())
+
+
+def _init_process_worker(threads: int) -> None:
+    torch.set_num_threads(threads)
+    # worker마다 DF 테이블 파일을 덮어쓰면 마지막 worker의 것만 남으므로 worker에서는 저장하지 않는다
+    use_memory_only_df_tables()
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+
+def _run_article_shard(
+    jobs: list[dict],
+    span_top_k: int,
+    min_score: float | None,
+    translate_quotes: bool,
+    worker_engine: str,
+) -> list[list[dict]]:
+    """worker process: 기사 몇 개의 인용문 job을 worker_engine으로 돌려 인용문별 row 리스트를 순서대로 반환."""
+    return list(RECORD_ENGINES[worker_engine](iter(jobs), span_top_k, min_score, translate_quotes))
+
+
+def iter_process_records(
+    jobs: Iterator[dict],
+    span_top_k: int,
+    min_score: float | None,
+    translate_quotes: bool,
+    workers: int | None = config.PROCESS_WORKERS,
+    threads_per_worker: int = config.PROCESS_THREADS_PER_WORKER,
+    articles_per_task: int = config.PROCESS_ARTICLES_PER_TASK,
+    worker_engine: str = "serial",
+) -> Iterator[list[dict]]:
+    """
+    기사 단위로 나눈 job 묶음(shard)을 worker process들에 나눠 돌린다.
+    id는 부모의 iter_quote_jobs가 이미 매겼고, 결과는 제출 순서(= 기사 순서)대로 꺼내므로
+    id/rank/행 순서가 serial과 같다. 한 기사의 인용문은 항상 같은 shard에 들어간다.
+    worker_engine: worker 안에서 쓸 engine ("serial" / "staged" / "async").
+
+    주의: archive 인덱스(config.SENTENCE_INDEX_DIR)와 TF-IDF DF 테이블은 process마다 따로라
+    이 둘을 갱신하면 serial과 결과가 달라질 수 있다 (DF 테이블은 KEYWORD_DF_UPDATE일 때만 갱신).
+    worker의 DF 테이블은 시작할 때 파일을 읽기만 하는 메모리 전용이라 (_init_process_worker)
+    worker에서 센 기사는 파일에 남지 않는다.
+    DF 테이블은 미리 python -m qdd2.tfidf_keywords로 채워 둔다.
+    """
+    if worker_engine not in RECORD_ENGINES or worker_engine == "processes":
+        raise ValueError(f"unknown worker engine: {worker_engine!r}")
+    if config.SENTENCE_INDEX_DIR or (config.KEYWORD_ENGINE == "tfidf" and config.KEYWORD_DF_UPDATE):
+        print("[WARN] engine='processes': archive index / DF table state is per worker; results may differ from serial")
+    threads_per_worker = max(1, threads_per_worker)
+
+    # fork면 부모에서 모델을 한 번 올리고 worker들이 copy-on-write로 공유한다.
+    # fork가 없는 플랫폼(spawn)은 worker마다 모델 전체(~2GB)를 따로 올리므로 기본 worker 수를 제한한다.
+    methods = multiprocessing.get_all_start_methods()
+    fork = "fork" in methods
+    context = multiprocessing.get_context("fork" if fork else None)
+    if not workers:
+        workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+        if not fork:
+            workers = min(workers, config.PROCESS_MAX_SPAWN_WORKERS)
+    if fork:
+        _preload_models()
+
+    articles = (list(group) for _, group in groupby(jobs, key=lambda job: job["article_text"]))
+
+    def shards() -> Iterator[list[dict]]:
+        shard: list[dict] = []
+        n_articles = 0
+        for article_jobs in articles:
+            shard.extend(article_jobs)
+            n_articles += 1
+            if n_articles >= articles_per_task:
+                yield shard
+                shard, n_articles = [], 0
+        if shard:
+            yield shard
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_process_worker,
+        initargs=(threads_per_worker,),
+    ) as pool:
+        pending: deque = deque()
+        for shard in shards():
+            pending.append(
+                pool.submit(_run_article_shard, shard, span_top_k, min_score, translate_quotes, worker_engine)
+            )
+            # 앞쪽 shard가 끝나는 대로 내보내고, 제출은 worker 수의 몇 배까지만 앞서 나간다
+            while len(pending) > 2 * workers or (pending and pending[0].done()):
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+RECORD_ENGINES = {
+    "serial": iter_serial_records,
+    "staged": iter_staged_records,
+    "async": iter_async_records,
+    "processes": iter_process_records,
+}
+
+
+DATASET_COLUMNS = [
+    "id",
+    "rank",
+    "original",
+    "original_en",
+    "source_quote_en",
+    "article_text",
+    "similarity",
+    "match_type",
+    "source_url",
+    "error",
+]
+
+
+# 결과를 바꾸는 config 값 (checkpoint header에 넣어서 설정이 바뀐 실행이 예전 row에 이어 쓰지 않게 한다)
+CHECKPOINT_CONFIG_KEYS = (
+    "QUOTE_MIN_LENGTH",
+    "NER_MODEL_NAME",
+    "NER_LABELS",
+    "NER_WINDOW_TOKENS",
+    "NER_WINDOW_STRIDE",
+    "KEYBERT_MODEL_NAME",
+    "KEYWORD_ENGINE",
+    "QUERY_CONTEXT_SENTENCES",
+    "TRANSLATION_MODEL_NAME",
+    "SENTENCE_MODEL_NAME",
+    "MULTILINGUAL_SENTENCE_MODEL_NAME",
+    "MATCH_CROSS_LINGUAL",
+    "TRANSCRIPT_TARGET_SPEAKER",
+    "TRANSCRIPT_SPEAKER_ALIASES",
+    "MATCH_MODE",
+    "MATCH_RERANK_TOP_N",
+    "MATCH_PREFILTER_TOP_N",
+    "MATCH_PER_DOC_TOP_K",
+    "MATCH_NMS_IOU",
+    "LEXICAL_MATCH_THRESHOLD",
+    "SENTENCE_INDEX_DIR",
+)
+
+
+def checkpoint_config() -> dict:
+    """CHECKPOINT_CONFIG_KEYS의 현재 값 (set은 JSON으로 쓰도록 정렬된 list로)."""
+    out = {}
+    for name in CHECKPOINT_CONFIG_KEYS:
+        value = getattr(config, name)
+        out[name] = sorted(value) if isinstance(value, (set, frozenset)) else value
+    return out
+
+
+def quote_key(job: dict, occurrence: int = 0) -> str:
+    """
+    checkpoint key: (기사 본문, 인용문, 같은 쌍의 몇 번째 등장인지). id는 입력 CSV가 바뀌면 달라지므로 쓰지 않는다.
+    같은 기사가 CSV에 두 번 있으면 두 번째 job은 occurrence=1이라 resume 때 건너뛰지 않는다.
+    """
+    return text_hash(f"{job['article_text']}\0{job['quote_ko']}\0{occurrence}")
+
+
+class QuoteCheckpoint:
+    """
+    인용문 하나가 끝날 때마다 그 row들을 output_csv에 append하고 (flush + fsync),
+    이어서 "key<TAB>CSV 크기" 한 줄을 checkpoint 파일에 append한다.
+
+    재시작(resume=True)하면 checkpoint의 key들은 건너뛰고 (id는 그대로 증가), CSV는 마지막 checkpoint
+    offset으로 잘라서 row를 쓰다 끊긴 인용문을 지운 뒤 이어 쓴다. 그래서 중단되면 처리 중이던 인용문만 잃는다
+    (동시에 여러 인용문을 돌리는 engine에서는 아직 내보내지 않은 인용문들).
+
+    실패한 인용문(error row: 검색 quota/429, 모델 예외 등)은 CSV에도 checkpoint에도 남기지 않는다.
+    다음 실행에서 다시 시도되고, 이번 실행의 실패 수는 failed에 센다.
+
+    checkpoint 첫 줄은 실행 파라미터(run_params: 입력 파일, 인자, 결과를 바꾸는 config 값) header다.
+    파라미터가 다른 실행은 이어 쓰지 않고 RuntimeError를 낸다 (resume=False면 새 header로 처음부터).
+    """
+
+    HEADER_PREFIX = "#run\t"
+
+    def __init__(self, output_csv: str, checkpoint_path: str, resume: bool = True, run_params: dict | None = None):
+        self.output_csv = output_csv
+        self.checkpoint_path = checkpoint_path
+        self._fed: deque = deque()  # engine에 넘긴 job의 key (engine은 입력 순서대로 결과를 낸다)
+        self.failed = 0
+        header = self.HEADER_PREFIX + json.dumps(run_params or {}, sort_keys=True, ensure_ascii=False) + "\n"
+
+        lines: list[str] = []
+        if resume and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                lines = [line for line in f if line.endswith("\n")]  # 쓰다 끊긴 마지막 줄은 버린다
+        if lines:
+            if lines[0] != header:
+                raise RuntimeError(
+                    f"{checkpoint_path} was written with different run parameters "
+                    f"({lines[0].removeprefix(self.HEADER_PREFIX).strip()} != {header.removeprefix(self.HEADER_PREFIX).strip()}); "
+                    "use resume=False to start over"
                 )
+            lines = lines[1:]
+        offset = int(lines[-1].rstrip("\n").rpartition("\t")[2]) if lines else 0
+        self.done: set[str] = {line.rpartition("\t")[0] for line in lines}
+
+        size = os.path.getsize(output_csv) if os.path.exists(output_csv) else 0
+        if size < offset:
+            raise RuntimeError(f"{output_csv} is shorter than its checkpoint ({size} < {offset} bytes)")
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_csv)), exist_ok=True)
+        self._csv = open(output_csv, "ab")
+        self._csv.truncate(offset)
+        self._csv.seek(offset)
+
+        # header + 끊긴 줄 없이 다시 쓰고 append 모드로 연다
+        tmp_path = checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(header)
+            f.writelines(lines)
+        os.replace(tmp_path, checkpoint_path)
+        self._checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+
+    def pending(self, jobs: Iterator[dict]) -> Iterator[dict]:
+        """이미 끝난 인용문을 뺀 job들 (id는 iter_quote_jobs가 매긴 그대로)."""
+        seen: Counter = Counter()
+        for job in jobs:
+            pair = (job["article_text"], job["quote_ko"])
+            key = quote_key(job, seen[pair])
+            seen[pair] += 1
+            if key in self.done:
                 continue
+            self._fed.append(key)
+            yield job
+
+    def append(self, quote_rows: list[dict]) -> None:
+        """다음 인용문의 row들을 기록 (row가 없어도 checkpoint에는 남긴다, error row면 아무것도 남기지 않는다)."""
+        key = self._fed.popleft()
+        errors = [row["error"] for row in quote_rows if row.get("error") is not None]
+        if errors:
+            self.failed += 1
+            print(f"[WARN] quote id={quote_rows[0]['id']} failed, not checkpointed (retried on resume): {errors[0]}")
+            return
+        if quote_rows:
+            buf = io.StringIO()
+            pd.DataFrame(quote_rows, columns=DATASET_COLUMNS).to_csv(buf, header=self._csv.tell() == 0, index=False)
+            self._csv.write(buf.getvalue().encode("utf-8"))
+            self._csv.flush()
+            os.fsync(self._csv.fileno())
+        self._checkpoint.write(f"{key}\t{self._csv.tell()}\n")
+        self._checkpoint.flush()
+        os.fsync(self._checkpoint.fileno())
+        self.done.add(key)
+
+    def close(self) -> None:
+        self._csv.close()
+        self._checkpoint.close()
 
-            # 1) run_qdd2에서 span 후보 리스트를 돌려준다고 가정
-            #    예: out["span_candidates"] = [
-            #         {"best_sentence": ..., "span_text": ..., "best_score": ..., "url": ...},
-            #         {"best_sentence": ..., "span_text": ..., "best_score": ..., "url": ...},
-            #         ...
-            #       ]
-            span_candidates = out.get("span_candidates") or []
 
-            print("span_candidates 개수:", len(span_candidates), " / quote:", quote_ko[:30])
+def build_dataset_from_articles(
+    input_csv: str,
+    text_col: str = "content",
+    date_col: str = "date",          # 날짜 컬럼명
+    output_csv: str | None = None,
+    rollcall: bool = True,           # ← "트럼프일 때 rollcall 허용" 플래그
+    span_top_k: int = 3,             # ← 인용문마다 원문 후보 TOP K개 추출
+    min_score: float | None = None,  # ← 최소 similarity threshold (예: 0.2)
+    translate_quotes: bool = True,   # ← original_en(인용문 영어 번역) 컬럼 채우기. cross-lingual 모드에서도 기본은 번역;
+                                     #    번역 시간을 아끼려면 False로 명시 (original_en이 비어 있게 된다)
+    engine: str = "serial",          # ← "serial": 인용문 하나씩 / "staged": 단계별 worker 파이프라인 / "async": asyncio
+                                     #    / "processes": 기사 shard를 worker process로 (결과 동일)
+    engine_options: dict | None = None,  # ← engine별 옵션 (예: {"workers": 8, "threads_per_worker": 4})
+    checkpoint: bool = True,         # ← output_csv에 인용문마다 바로 append + checkpoint (중단 후 이어서 실행)
+    resume: bool = True,             # ← checkpoint가 있으면 끝난 인용문은 건너뛴다 (False: 처음부터 다시)
+) -> pd.DataFrame:
+    """
+    기사 CSV → 인용문별 원문 후보 데이터셋.
+    output_csv가 있고 checkpoint=True면 row를 인용문 단위로 바로 기록하고, 반환값은 (이전 실행분을 포함한)
+    output_csv 전체를 다시 읽은 DataFrame이다. checkpoint 파일은 output_csv + config.DATASET_CHECKPOINT_SUFFIX.
+    """
+    df_articles = pd.read_csv(input_csv)
+    print("기사 컬럼:", df_articles.columns.tolist())
 
-            # 후보 리스트가 없다면, 기존 best_span 하나만 쓰는 fallback
-            if not span_candidates:
-                best_span = out.get("best_span") or {}
+    jobs = iter_quote_jobs(df_articles, text_col=text_col, date_col=date_col, rollcall=rollcall)
+    if engine not in RECORD_ENGINES:
+        raise ValueError(f"unknown engine: {engine!r}")
+    if output_csv is not None and checkpoint:
+        run_params = {
+            "input_csv": os.path.abspath(input_csv),
+            "input_size": os.path.getsize(input_csv),
+            "text_col": text_col,
+            "date_col": date_col,
+            "rollcall": rollcall,
+            "span_top_k": span_top_k,
+            "min_score": min_score,
+            "translate_quotes": translate_quotes,
+            "config": checkpoint_config(),  # engine은 결과가 같으므로 넣지 않는다 (다른 engine으로 이어 쓰기 가능)
+        }
+        writer = QuoteCheckpoint(
+            output_csv, output_csv + config.DATASET_CHECKPOINT_SUFFIX, resume=resume, run_params=run_params
+        )
+        if writer.done:
+            print(f"[INFO] resuming {output_csv}: {len(writer.done)} quotes already done")
+        per_quote = RECORD_ENGINES[engine](
+            writer.pending(jobs), span_top_k, min_score, translate_quotes, **(engine_options or {})
+        )
+        resumed = len(writer.done)
+        try:
+            for quote_rows in tqdm(per_quote, desc="quotes", unit="quote"):
+                writer.append(quote_rows)
+        finally:
+            writer.close()
+        if resumed and len(writer.done) == resumed and not writer.failed:
+            print(
+                f"[INFO] {output_csv} was already complete (checkpoint {writer.checkpoint_path}); "
+                "returning the existing rows. Pass resume=False to rebuild it."
+            )
+        if writer.failed:
+            print(f"[WARN] {writer.failed} quotes failed and were left out of {output_csv}; run again to retry them")
+        if os.path.getsize(output_csv) == 0:
+            return pd.DataFrame(columns=DATASET_COLUMNS)
+        return pd.read_csv(output_csv)
 
-                source_quote_en = (
-                    best_span.get("best_sentence")
-                    or best_span.get("sentence")
-                    or best_span.get("span_text")
-                )
-                article_span_en = (
-                    best_span.get("span_text")
-                    or best_span.get("sentence")
-                )
-                sim_score = (
-                    best_span.get("best_score")
-                    or best_span.get("score")
-                )
-                source_url = best_span.get("url")
-
-                # ===== 여기서 min_score 필터링 =====
-                if (min_score is not None) and (sim_score is not None) and (sim_score < min_score):
-                    continue
-
-                records.append(
-                    {
-                        "id": gid,
-                        "rank": 1,  # 유일한 후보
-                        "original": quote_ko,
-                        "original_en": original_en,
-                        "source_quote_en": source_quote_en,
-                        "article_text": article_span_en,
-                        "similarity": sim_score,
-                        "source_url": source_url,
-                        "error": None,
-                    }
-                )
-                continue
+    per_quote = RECORD_ENGINES[engine](jobs, span_top_k, min_score, translate_quotes, **(engine_options or {}))
 
-            # 2) span_candidates가 있으면, TOP K개까지 여러 row로 저장
-            for rank, cand in enumerate(span_candidates[:span_top_k], start=1):
-                source_quote_en = (
-                    cand.get("best_sentence")
-                    or cand.get("sentence")
-                    or cand.get("span_text")
-                )
-                article_span_en = (
-                    cand.get("span_text")
-                    or cand.get("sentence")
-                )
-                sim_score = (
-                    cand.get("best_score")
-                    or cand.get("score")
-                )
-                source_url = cand.get("url")
-
-                # ===== 여기서 min_score 필터링 =====
-                if (min_score is not None) and (sim_score is not None) and (sim_score < min_score):
-                    continue
-
-                records.append(
-                    {
-                        "id": gid,                 # 인용문 ID (같음)
-                        "rank": rank,              # 후보 순위 (1~K)
-                        "original": quote_ko,
-                        "original_en": original_en,
-                        "source_quote_en": source_quote_en,
-                        "article_text": article_span_en,
-                        "similarity": sim_score,
-                        "source_url": source_url,
-                        "error": None,
-                    }
-                )
+    records = []
+    # 진행률은 engine이 끝낸 인용문 기준 (job을 만든 수로 세면 engine의 in-flight만큼 앞서 나간다)
+    for quote_rows in tqdm(per_quote, desc="quotes", unit="quote"):
+        records.extend(quote_rows)
 
     df_out = pd.DataFrame(records)
 
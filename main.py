@@ -16,17 +16,28 @@ Flags:
 """
 
 import argparse
+import asyncio
+import heapq
 import logging
 import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING
 
+from qdd2 import config
+from qdd2.match_types import Candidate, SpanMatch
 from qdd2.snippet_matcher import find_best_span_from_candidates_debug
 from qdd2.translation import translate_ko_to_en
-from qdd2.pipeline import build_queries_from_text
-from qdd2.search_client import google_cse_search
+from qdd2.pipeline import build_queries_from_text, extract_for_queries
+from qdd2.search_client import SearchUnavailable, google_cse_search
 from qdd2.trump_utils import detect_trump_context
-from qdd2.rollcall_search import get_search_results, fetch_transcript_text
+from qdd2.rollcall_search import get_search_results, fetch_transcript
 from datetime import datetime
 
+if TYPE_CHECKING:
+    import httpx
+
 
 # def run_qdd2(
 #     text: str | None = None,
@@ -362,6 +373,552 @@ from datetime import datetime
     #             logger.warning("No English text available for similarity matching.")
     #
 
+logger = logging.getLogger("qdd2.cli")
+
+
+@dataclass(slots=True, eq=False)
+class Qdd2Task:
+    """
+    run_qdd2 한 번의 입력과 단계별 중간 결과.
+    step_* 함수들이 순서대로 채운다 (run_qdd2는 한 task에 대해 차례로 부르고,
+    qdd2.stages 엔진은 여러 task를 단계별 worker로 흘려보낸다).
+    """
+
+    text: str
+    quote: str | None = None
+    date: str | None = None
+    top_n: int = 15
+    top_k: int = 3
+    rollcall: bool = False
+    debug: bool = False
+    search: bool = False
+    top_matches: int = 1
+    title: str | None = None
+    quote_span: tuple[int, int] | None = None
+
+    result: dict | None = None
+    is_trump_context: bool = False
+    search_items: list[dict] = field(default_factory=list)
+    quote_for_match_en: str | None = None
+    candidates: list[Candidate] = field(default_factory=list)
+    best_span: SpanMatch | None = None
+    span_candidates: list[SpanMatch] = field(default_factory=list)
+
+    def output(self) -> dict:
+        return {
+            "pipeline_result": self.result,
+            "search_items": self.search_items,
+            "best_span": self.best_span,
+            "span_candidates": self.span_candidates,
+        }
+
+
+def get_top_k_spans(
+    quote_en: str,
+    candidates: list[Candidate],
+    k: int,
+    num_before: int = 1,
+    num_after: int = 1,
+    min_score: float = 0.1,   # 필요하면 0.15, 0.2 로 조정
+    keywords: list[str] | None = None,
+) -> list[SpanMatch]:
+    """
+    snippet_matcher.find_top_spans_batched 로 전체 후보를 한 번에 매칭해서
+    top-k span(SpanMatch, dict처럼 .get/[] 사용 가능) 리스트를 반환. 한 문서에서도 겹치지 않는 span을 최대 k개까지 가져온다.
+    """
+    from qdd2.snippet_matcher import find_top_spans_batched
+
+    results = [
+        span
+        for spans in find_top_spans_batched(
+            quote_en,
+            candidates,
+            num_before=num_before,
+            num_after=num_after,
+            keywords=keywords,
+            per_doc_k=k,
+        )
+        for span in spans
+    ]
+    return merge_archive_spans(quote_en, candidates, results, k, num_before=num_before, num_after=num_after)
+
+
+def match_span_candidates_batch(
+    quotes_en: list[str],
+    candidate_lists: list[list[Candidate]],
+    ks: list[int],
+    num_before: int = 1,
+    num_after: int = 1,
+    keywords_list: list[list[str] | None] | None = None,
+) -> list[list[SpanMatch]]:
+    """
+    여러 quote(각자 자기 후보 목록)를 match_quotes_batched 한 번으로 매칭한다.
+    quote별 반환값은 get_top_k_spans가 archive 단계 전에 모으는 span 리스트와 같다 (후보 순서, 문서당 최대 k개).
+    (url, 본문)이 같은 후보는 풀에 한 번만 넣어서 문장 분리/인코딩을 공유하고, quote는 자기 후보만 본다.
+    """
+    from qdd2.snippet_matcher import match_quotes_batched
+
+    pool: list[Candidate] = []
+    pool_pos: dict[tuple, int] = {}
+    quote_candidates: list[list[int]] = []
+    for candidates in candidate_lists:
+        idxs = []
+        for cand in candidates:
+            key = (cand.get("url"), cand.get("snippet"))
+            if key not in pool_pos:
+                pool_pos[key] = len(pool)
+                pool.append(cand)
+            idxs.append(pool_pos[key])
+        quote_candidates.append(idxs)
+
+    # NMS는 점수순 greedy라 per_doc_k=max(ks)로 고른 앞쪽 k개는 per_doc_k=k로 고른 결과와 같다
+    per_quote = match_quotes_batched(
+        quotes_en,
+        pool,
+        num_before=num_before,
+        num_after=num_after,
+        per_doc_k=max(ks, default=1),
+        quote_candidates=quote_candidates,
+        quote_keywords=keywords_list,
+    )
+    return [
+        [span for idx in idxs for span in per_cand[idx][:k]]
+        for idxs, k, per_cand in zip(quote_candidates, ks, per_quote)
+    ]
+
+
+def merge_archive_spans(
+    quote_en: str,
+    candidates: list[Candidate],
+    results: list[SpanMatch],
+    k: int,
+    num_before: int = 1,
+    num_after: int = 1,
+) -> list[SpanMatch]:
+    """검색 후보 span(results)에 archive 인덱스 조회 결과를 더해 top-k를 고른다 (인덱스가 꺼져 있으면 results에서만)."""
+    from qdd2.snippet_matcher import find_spans_in_index, index_candidates
+
+    # archive 인덱스가 설정되어 있으면: 이번 후보를 저장하고, 과거 문서 전체에서도 span 조회
+    # (인덱스는 SENTENCE_MODEL_NAME 기준이라 cross-lingual 모드의 한국어 quote로는 조회하지 않는다)
+    if config.MATCH_CROSS_LINGUAL:
+        return heapq.nlargest(k, results, key=lambda x: x.get("best_score", 0.0))
+    if index_candidates(candidates):
+        logger.info("[Archive] indexed new candidate documents")
+    seen = {(r["url"], r["span_start_idx"], r["span_end_idx"]) for r in results}
+    for span in find_spans_in_index(quote_en, top_k=k, num_before=num_before, num_after=num_after):
+        key = (span["url"], span["span_start_idx"], span["span_end_idx"])
+        if key not in seen:
+            seen.add(key)
+            results.append(span)
+
+    return heapq.nlargest(k, results, key=lambda x: x.get("best_score", 0.0))
+
+
+def task_extraction(task: Qdd2Task) -> dict:
+    """step_extract가 build_queries_from_text 안에서 하는 추출만 따로 (비동기 경로에서 쿼리 생성과 나눠 돌릴 때)."""
+    return extract_for_queries(
+        task.text,
+        top_n_keywords=task.top_n,
+        quote_sentence=task.quote,
+        device=0,  # CPU
+        debug=task.debug,
+        headline=task.title,
+        quote_span=task.quote_span,
+    )
+
+
+def step_extract(task: Qdd2Task, extraction: dict | None = None, speaker_en: str | None = None) -> None:
+    """
+    [Step 2-3] 키워드/NER 추출 + 쿼리 생성, 트럼프 문맥 감지.
+    extraction: 같은 기사에서 이미 구한 추출 결과. speaker_en: 이미 조회한 발화자 영어 이름.
+    """
+    logger.info("[Step 2] Calling pipeline.build_queries_from_text()")
+    task.result = build_queries_from_text(
+        text=task.text,
+        top_n_keywords=task.top_n,
+        top_k_for_query=task.top_k,
+        quote_sentence=task.quote,
+        article_date=task.date,
+        rollcall_mode=task.rollcall,
+        device=0,  # CPU
+        debug=task.debug,
+        headline=task.title,
+        quote_span=task.quote_span,
+        extraction=extraction,
+        speaker_en=speaker_en,
+    )
+    result = task.result
+    logger.info("[Step 3] Pipeline completed")
+    logger.info(
+        "Summary: entities=%d, keywords=%d, queries(ko=%s / en=%s)",
+        len(result.get("entities", [])),
+        len(result.get("keywords", [])),
+        bool(result.get("queries", {}).get("ko")),
+        bool(result.get("queries", {}).get("en")),
+    )
+
+    # 트럼프 컨텍스트 감지
+    task.is_trump_context = detect_trump_context(
+        article_text=task.text,
+        quote_text=task.quote,
+        pipeline_result=result,
+    )
+    logger.info("Trump context detected: %s", task.is_trump_context)
+
+
+def cse_items(data: dict) -> list[dict]:
+    """CSE 응답의 items. 검색 자체가 실패했으면 (quota/429 등) 빈 결과로 두지 않고 SearchUnavailable을 낸다."""
+    if data.get("error"):
+        raise SearchUnavailable(data["error"])
+    return data.get("items", []) or []
+
+
+def filter_rollcall_links(rollcall_links: list[str], date: str | None) -> list[str]:
+    """기사 연도가 slug에 들어 있는 Rollcall 링크만 남긴다 (하나도 없으면 원본 그대로)."""
+    # 🔹 기사 날짜에서 연도 뽑기
+    target_year = None
+    if date:
+        try:
+            # 네가 이미 쓰는 포맷에 맞게만 파싱
+            for fmt in ("%Y-%m-%d", "%Y.%m.%d", "%Y/%m/%d"):
+                try:
+                    target_year = datetime.strptime(str(date).strip(), fmt).year
+                    break
+                except ValueError:
+                    continue
+        except Exception:
+            target_year = None
+    # 🔹 연도가 있으면 slug에서 연도로 한 번 필터링
+    filtered_links: list[str] = []
+    if target_year:
+        year_token = f"-{target_year}/"
+        for url in rollcall_links:
+            if year_token in url:
+                filtered_links.append(url)
+
+        logger.info("[Search] Rollcall links filtered by year %s: %d",
+                    target_year, len(filtered_links))
+
+    # 🔹 연도로 필터했는데 아무것도 없으면 원본 그대로 사용
+    return filtered_links if filtered_links else rollcall_links
+
+
+def step_search(task: Qdd2Task) -> None:
+    """[Step 4] 생성된 쿼리로 Rollcall(트럼프 + rollcall) 또는 Google CSE 검색."""
+    if not task.search:
+        return
+    logger.info("[Step 4] Running search with generated query")
+
+    queries = task.result.get("queries") or {}
+    query = queries.get("en") or queries.get("ko")
+    search_items: list[dict] = []
+
+    if not query:
+        logger.warning("No query available to search.")
+    else:
+        # 4-A) Trump + rollcall=True → Rollcall JSON 우선
+        if task.is_trump_context and task.rollcall:
+            logger.info("[Search] Trump context + rollcall=True → using Rollcall JSON search")
+
+            rollcall_links: list[str] = []
+            try:
+                rollcall_links = get_search_results(query, top_k=5)
+            except Exception as e:
+                logger.warning("Rollcall search failed, fallback to CSE: %s", e)
+
+            logger.info("[Search] Rollcall raw links: %d", len(rollcall_links))
+
+            effective_links = filter_rollcall_links(rollcall_links, task.date)
+            search_items = [{"link": url, "snippet": ""} for url in effective_links if url]
+
+            if not search_items:
+                logger.info("[Search] No rollcall results, fallback to Google CSE")
+                data = google_cse_search(query, num=20, debug=task.debug)
+                search_items = cse_items(data)
+        else:
+            # 4-B) 일반 CSE 검색
+            logger.info("[Search] Using Google CSE (non-Trump context or rollcall=False)")
+            data = google_cse_search(query, num=5, debug=task.debug)
+            search_items = cse_items(data)
+
+    task.search_items = search_items
+    if not search_items:
+        logger.warning("No results returned from search backends.")
+
+
+def step_prepare_match(task: Qdd2Task) -> None:
+    """[Step 5] 유사도 기준 문장 (영어 번역, cross-lingual 모드면 한국어 인용문 그대로)."""
+    if not task.search_items:
+        return
+    logger.info("[Search] Rollcall/CSE items: %d", len(task.search_items))
+    logger.info("[Step 5] Running SBERT snippet matching on search results")
+
+    quote_text = task.quote or ""
+    quote_for_match_en: str | None = None
+
+    if quote_text and config.MATCH_CROSS_LINGUAL:
+        quote_for_match_en = quote_text
+    elif quote_text:
+        try:
+            quote_for_match_en = translate_ko_to_en(quote_text)
+        except Exception as e:
+            logger.warning("Quote translation failed, fallback to EN query: %s", e)
+
+    if not quote_for_match_en:
+        quote_for_match_en = (task.result.get("queries") or {}).get("en")
+
+    task.quote_for_match_en = quote_for_match_en
+    if not quote_for_match_en:
+        logger.warning("No English text available for similarity matching.")
+
+
+def transcript_candidate(url: str, transcript: dict) -> Candidate | None:
+    body = transcript.get("text")
+    if not body:
+        return None
+    return Candidate(url=url, snippet=body, segments=transcript.get("segments"))
+
+
+def snippet_candidates(search_items: list[dict]) -> list[Candidate]:
+    """일반 CSE → snippet 기반 후보."""
+    candidates: list[Candidate] = []
+    for it in search_items:
+        url = it.get("link")
+        if not url:
+            continue
+        snippet = it.get("snippet", "") or ""
+        if not snippet:
+            continue
+        candidates.append(Candidate(url=url, snippet=snippet))
+    return candidates
+
+
+def step_fetch(task: Qdd2Task) -> None:
+    """후보 문서 수집: Trump + rollcall이면 transcript 본문 fetch, 아니면 CSE snippet."""
+    if not task.quote_for_match_en:
+        return
+
+    # Trump + rollcall → transcript 본문 (발화자 turn 포함)
+    if task.is_trump_context and task.rollcall:
+        candidates: list[Candidate] = []
+        for it in task.search_items:
+            url = it.get("link")
+            if not url:
+                continue
+            try:
+                transcript = fetch_transcript(url)
+            except Exception as e:
+                logger.warning("Failed to fetch transcript text: %s", e)
+                continue
+            candidate = transcript_candidate(url, transcript)
+            if candidate is not None:
+                candidates.append(candidate)
+        task.candidates = candidates
+    else:
+        task.candidates = snippet_candidates(task.search_items)
+
+
+def step_match(task: Qdd2Task) -> None:
+    """[Step 6] SBERT span 매칭으로 top-k span 선택."""
+    if not task.quote_for_match_en:
+        return
+    if not task.candidates:
+        logger.warning("No candidate texts for similarity matching.")
+        return
+
+    try:
+        top_spans = get_top_k_spans(
+            quote_en=task.quote_for_match_en,
+            candidates=task.candidates,
+            k=task.top_matches,
+            num_before=1,
+            num_after=1,
+            min_score=0.1,
+            keywords=match_keywords(task),
+        )
+        set_top_spans(task, top_spans)
+    except Exception as e:
+        logger.warning("SBERT snippet matching failed: %s", e)
+
+
+def match_keywords(task: Qdd2Task) -> list[str] | None:
+    """prefilter(BM25)에 quote와 함께 넣는 keywords: 영어 검색 쿼리."""
+    queries = task.result.get("queries") or {}
+    return [queries["en"]] if queries.get("en") else None
+
+
+def set_top_spans(task: Qdd2Task, top_spans: list[SpanMatch]) -> None:
+    # task에 남는 span은 자기 window 문장만 들고 있게 한다 (후보 문서 전체를 붙잡지 않도록)
+    top_spans = [span.detached() for span in top_spans]
+    if top_spans:
+        task.best_span = top_spans[0]
+        task.span_candidates = top_spans  # 필요하면 top_k 전체 넘김
+
+        logger.info(
+            "[Step 6] Best span found: score=%.4f, url=%s",
+            task.best_span.get("best_score", -1.0),
+            task.best_span.get("url", ""),
+        )
+    else:
+        logger.warning("No span passed the similarity threshold.")
+
+
+def step_match_batch(tasks: list[Qdd2Task]) -> None:
+    """
+    step_match의 여러 task 버전 (결과 같음). SBERT 매칭은 match_span_candidates_batch 한 번으로 하고,
+    archive 인덱스 추가/조회는 task 순서대로 하나씩 한다.
+    배치 매칭이 실패하거나 어떤 task에 span을 하나도 못 내면 (match_quotes_batched는 인코딩 오류를 삼키고
+    빈 결과를 낸다) 그 task는 step_match로 따로 다시 매칭한다.
+    """
+    ready = []
+    for task in tasks:
+        if not task.quote_for_match_en:
+            continue
+        if not task.candidates:
+            logger.warning("No candidate texts for similarity matching.")
+            continue
+        ready.append(task)
+    if not ready:
+        return
+
+    try:
+        per_task = match_span_candidates_batch(
+            [task.quote_for_match_en for task in ready],
+            [task.candidates for task in ready],
+            [task.top_matches for task in ready],
+            num_before=1,
+            num_after=1,
+            keywords_list=[match_keywords(task) for task in ready],
+        )
+    except Exception as e:
+        logger.warning("Batched SBERT snippet matching failed, matching quotes one by one: %s", e)
+        per_task = [[] for _ in ready]
+
+    for task, results in zip(ready, per_task):
+        if not results:
+            step_match(task)
+            continue
+        try:
+            set_top_spans(task, merge_archive_spans(task.quote_for_match_en, task.candidates, results, task.top_matches))
+        except Exception as e:
+            logger.warning("SBERT snippet matching failed: %s", e)
+
+
+# ---------------------------------------------------------------------------
+# Async path: 네트워크 호출(Wikidata, Rollcall, CSE, transcript)은 httpx.AsyncClient로, 모델 호출이 있는
+# 단계(추출/쿼리 번역, 매칭용 번역, SBERT 매칭)는 executor로 보낸다. 한 이벤트 루프에서 인용문 여러 개를
+# 동시에 돌리면 전체 시간이 네트워크 지연의 합이 아니라 모델 계산 시간에 가까워진다.
+# 각 step은 동기 step_*과 같은 필드를 채우므로 결과도 같다.
+# httpx / qdd2.async_client는 async 경로를 쓸 때만 import한다 (동기 CLI / serial 실행은 httpx 없이 돈다).
+# ---------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=1)
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """모델 추론용 executor (프로세스당 하나). worker가 1개라 모델 호출이 겹치지 않고, 요청 순서대로 처리된다."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdd2-cpu")
+
+
+async def run_in_executor(executor: Executor | None, fn, *args, **kwargs):
+    """fn을 executor(없으면 get_cpu_executor())에서 돌린다."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or get_cpu_executor(), partial(fn, *args, **kwargs))
+
+
+async def step_extract_async(
+    task: Qdd2Task,
+    client: "httpx.AsyncClient",
+    executor: Executor | None = None,
+    extraction: dict | None = None,
+) -> None:
+    """step_extract: 추출(executor) → 발화자 Wikidata 조회(async) → 쿼리 생성/트럼프 감지(executor)."""
+    from qdd2.async_client import resolve_person_name_en_async
+
+    if extraction is None:
+        extraction = await run_in_executor(executor, task_extraction, task)
+    per_list = extraction["entities_by_type"].get("PER") or []
+    speaker_en = None
+    if per_list:
+        speaker_en = await resolve_person_name_en_async(client, per_list[0], executor or get_cpu_executor())
+    await run_in_executor(executor, step_extract, task, extraction=extraction, speaker_en=speaker_en)
+
+
+async def step_search_async(task: Qdd2Task, client: "httpx.AsyncClient") -> None:
+    """step_search의 비동기 버전 (같은 분기/fallback)."""
+    from qdd2.async_client import get_search_results_async, google_cse_search_async
+
+    if not task.search:
+        return
+    logger.info("[Step 4] Running search with generated query")
+
+    queries = task.result.get("queries") or {}
+    query = queries.get("en") or queries.get("ko")
+    search_items: list[dict] = []
+
+    if not query:
+        logger.warning("No query available to search.")
+    elif task.is_trump_context and task.rollcall:
+        logger.info("[Search] Trump context + rollcall=True → using Rollcall JSON search")
+        rollcall_links: list[str] = []
+        try:
+            rollcall_links = await get_search_results_async(client, query, top_k=5)
+        except Exception as e:
+            logger.warning("Rollcall search failed, fallback to CSE: %s", e)
+
+        logger.info("[Search] Rollcall raw links: %d", len(rollcall_links))
+        effective_links = filter_rollcall_links(rollcall_links, task.date)
+        search_items = [{"link": url, "snippet": ""} for url in effective_links if url]
+
+        if not search_items:
+            logger.info("[Search] No rollcall results, fallback to Google CSE")
+            data = await google_cse_search_async(client, query, num=20, debug=task.debug)
+            search_items = cse_items(data)
+    else:
+        logger.info("[Search] Using Google CSE (non-Trump context or rollcall=False)")
+        data = await google_cse_search_async(client, query, num=5, debug=task.debug)
+        search_items = cse_items(data)
+
+    task.search_items = search_items
+    if not search_items:
+        logger.warning("No results returned from search backends.")
+
+
+async def step_fetch_async(task: Qdd2Task, client: "httpx.AsyncClient") -> None:
+    """step_fetch의 비동기 버전. 한 인용문의 transcript들도 동시에 받는다 (후보 순서는 검색 결과 순서 그대로)."""
+    from qdd2.async_client import fetch_transcript_async
+
+    if not task.quote_for_match_en:
+        return
+    if not (task.is_trump_context and task.rollcall):
+        task.candidates = snippet_candidates(task.search_items)
+        return
+
+    urls = [it.get("link") for it in task.search_items if it.get("link")]
+    transcripts = await asyncio.gather(
+        *(fetch_transcript_async(client, url) for url in urls),
+        return_exceptions=True,
+    )
+    candidates: list[Candidate] = []
+    for url, transcript in zip(urls, transcripts):
+        if isinstance(transcript, BaseException):
+            logger.warning("Failed to fetch transcript text: %s", transcript)
+            continue
+        candidate = transcript_candidate(url, transcript)
+        if candidate is not None:
+            candidates.append(candidate)
+    task.candidates = candidates
+
+
+async def run_task_async(task: Qdd2Task, client: "httpx.AsyncClient", executor: Executor | None = None) -> dict:
+    """한 task의 step_* 전체를 비동기로 (run_qdd2와 같은 순서)."""
+    await step_extract_async(task, client, executor)
+    await step_search_async(task, client)
+    await run_in_executor(executor, step_prepare_match, task)
+    await step_fetch_async(task, client)
+    await run_in_executor(executor, step_match, task)
+    return task.output()
+
+
 def run_qdd2(
     text: str | None = None,
     file_path: str | None = None,
@@ -373,9 +930,13 @@ def run_qdd2(
     debug: bool = False,
     search: bool = False,
     top_matches: int = 1,
+    title: str | None = None,
+    quote_span: tuple[int, int] | None = None,
 ):
     """
     QDD2 파이프라인 엔트리포인트 (함수 버전).
+    title/quote_span: quote-local 추출(config.QUERY_CONTEXT_SENTENCES)에 쓰는 헤드라인과 원문 내 인용 offset.
+    단계별 구현은 step_extract → step_search → step_prepare_match → step_fetch → step_match.
 
     반환 예시:
     {
@@ -385,11 +946,71 @@ def run_qdd2(
         "span_candidates": [ {...}, ... ]  # top-k 후보들 (선택)
     }
     """
+    task = _start_task(
+        text, file_path, quote, date, top_n, top_k, rollcall, debug, search, top_matches, title, quote_span
+    )
+    step_extract(task)
+    step_search(task)
+    step_prepare_match(task)
+    step_fetch(task)
+    step_match(task)
+
+    # ★★★ 반드시 여기에서 한 번만 return ★★★
+    return task.output()
+
+    # return {
+    #     "pipeline_result": result,
+    #     "search_items": search_items,
+    #     "best_span": best_span,
+    #     "span_candidates": span_candidates,  # ★ 추가
+    #
+    # }
+
+
+async def run_qdd2_async(
+    text: str | None = None,
+    file_path: str | None = None,
+    quote: str | None = None,
+    date: str | None = None,
+    top_n: int = 15,
+    top_k: int = 3,
+    rollcall: bool = False,
+    debug: bool = False,
+    search: bool = False,
+    top_matches: int = 1,
+    title: str | None = None,
+    quote_span: tuple[int, int] | None = None,
+    client: "httpx.AsyncClient | None" = None,
+    executor: Executor | None = None,
+):
+    """
+    run_qdd2의 비동기 버전 (같은 인자, 같은 반환값).
+    client: 공유할 httpx.AsyncClient (없으면 이번 호출용으로 만들고 닫는다).
+    executor: 모델 호출을 돌릴 executor (없으면 get_cpu_executor()).
+
+    여러 인용문을 동시에 돌릴 때:
+        async with create_client() as client:
+            outs = await asyncio.gather(*(run_qdd2_async(text=t, quote=q, search=True, client=client) for t, q in jobs))
+    """
+    task = _start_task(
+        text, file_path, quote, date, top_n, top_k, rollcall, debug, search, top_matches, title, quote_span
+    )
+    if client is not None:
+        return await run_task_async(task, client, executor)
+    from qdd2.async_client import create_client
+
+    async with create_client() as own_client:
+        return await run_task_async(task, own_client, executor)
+
+
+def _start_task(
+    text, file_path, quote, date, top_n, top_k, rollcall, debug, search, top_matches, title, quote_span
+) -> Qdd2Task:
+    """[Step 0-1] 로깅 설정, 텍스트 로딩, Qdd2Task 생성 (run_qdd2 / run_qdd2_async 공용)."""
     logging.basicConfig(
         level=logging.DEBUG if debug else logging.INFO,
         format="[%(levelname)s] %(message)s",
     )
-    logger = logging.getLogger("qdd2.cli")
 
     logger.info("[Step 0] Starting QDD2 pipeline (function mode)")
 
@@ -415,230 +1036,19 @@ def run_qdd2(
         top_n, top_k, rollcall, debug, search, top_matches,
     )
 
-    # 2) 쿼리 빌드
-    logger.info("[Step 2] Calling pipeline.build_queries_from_text()")
-    result = build_queries_from_text(
+    return Qdd2Task(
         text=loaded_text,
-        top_n_keywords=top_n,
-        top_k_for_query=top_k,
-        quote_sentence=quote,
-        article_date=date,
-        rollcall_mode=rollcall,
-        device=0,  # CPU
+        quote=quote,
+        date=date,
+        top_n=top_n,
+        top_k=top_k,
+        rollcall=rollcall,
         debug=debug,
+        search=search,
+        top_matches=top_matches,
+        title=title,
+        quote_span=quote_span,
     )
-    logger.info("[Step 3] Pipeline completed")
-    logger.info(
-        "Summary: entities=%d, keywords=%d, queries(ko=%s / en=%s)",
-        len(result.get("entities", [])),
-        len(result.get("keywords", [])),
-        bool(result.get("queries", {}).get("ko")),
-        bool(result.get("queries", {}).get("en")),
-    )
-
-    quote_text = quote or ""
-
-    # 3) 트럼프 컨텍스트 감지
-    is_trump_context = detect_trump_context(
-        article_text=loaded_text,
-        quote_text=quote,
-        pipeline_result=result,
-    )
-    logger.info("Trump context detected: %s", is_trump_context)
-
-    # 4) 검색 + SBERT span
-    search_items: list[dict] = []
-    best_span: dict | None = None
-    span_candidates: list[dict] = []
-
-    def get_top_k_spans(
-        quote_en: str,
-        candidates: list[dict],
-        k: int,
-        num_before: int = 1,
-        num_after: int = 1,
-        min_score: float = 0.1,   # 필요하면 0.15, 0.2 로 조정
-    ) -> list[dict]:
-        """
-        snippet_matcher.find_best_span_from_candidates_debug 를 후보별로 돌려서
-        top-k span dict 리스트를 반환.
-        """
-        results: list[dict] = []
-        for c in candidates:
-            from qdd2.snippet_matcher import find_best_span_from_candidates_debug
-
-            span = find_best_span_from_candidates_debug(
-                quote_en=quote_en,
-                candidates=[c],
-                num_before=num_before,
-                num_after=num_after,
-                min_score=min_score,
-            )
-            if span:
-                results.append(span)
-
-        results = sorted(results, key=lambda x: x.get("best_score", 0.0), reverse=True)
-        return results[:k]
-
-    if search:
-        logger.info("[Step 4] Running search with generated query")
-
-        queries = result.get("queries") or {}
-        query = queries.get("en") or queries.get("ko")
-
-        if not query:
-            logger.warning("No query available to search.")
-        else:
-            # 4-A) Trump + rollcall=True → Rollcall JSON 우선
-            if is_trump_context and rollcall:
-                logger.info("[Search] Trump context + rollcall=True → using Rollcall JSON search")
-
-                rollcall_links: list[str] = []
-                try:
-                    rollcall_links = get_search_results(query, top_k=5)
-                except Exception as e:
-                    logger.warning("Rollcall search failed, fallback to CSE: %s", e)
-
-                logger.info("[Search] Rollcall raw links: %d", len(rollcall_links))
-
-                # 🔹 기사 날짜에서 연도 뽑기
-                target_year = None
-                if date:
-                    try:
-                        # 네가 이미 쓰는 포맷에 맞게만 파싱
-                        for fmt in ("%Y-%m-%d", "%Y.%m.%d", "%Y/%m/%d"):
-                            try:
-                                target_year = datetime.strptime(str(date).strip(), fmt).year
-                                break
-                            except ValueError:
-                                continue
-                    except Exception:
-                        target_year = None
-                # 🔹 연도가 있으면 slug에서 연도로 한 번 필터링
-                filtered_links: list[str] = []
-                if target_year:
-                    year_token = f"-{target_year}/"
-                    for url in rollcall_links:
-                        if year_token in url:
-                            filtered_links.append(url)
-
-                    logger.info("[Search] Rollcall links filtered by year %s: %d",
-                                target_year, len(filtered_links))
-
-                # 🔹 연도로 필터했는데 아무것도 없으면 원본 그대로 사용
-                effective_links = filtered_links if filtered_links else rollcall_links
-
-                search_items = [{"link": url, "snippet": ""} for url in effective_links if url]
-
-                if not search_items:
-                    logger.info("[Search] No rollcall results, fallback to Google CSE")
-                    data = google_cse_search(query, num=20, debug=debug)
-                    search_items = data.get("items", []) or []
-            else:
-                # 4-B) 일반 CSE 검색
-                logger.info("[Search] Using Google CSE (non-Trump context or rollcall=False)")
-                data = google_cse_search(query, num=5, debug=debug)
-                search_items = data.get("items", []) or []
-
-        if not search_items:
-            logger.warning("No results returned from search backends.")
-        else:
-            logger.info("[Search] Rollcall/CSE items: %d", len(search_items))
-            logger.info("[Step 5] Running SBERT snippet matching on search results")
-
-            # 1) 유사도 기준 문장 (영어)
-            quote_for_match_en: str | None = None
-
-            if quote_text:
-                try:
-                    quote_for_match_en = translate_ko_to_en(quote_text)
-                except Exception as e:
-                    logger.warning("Quote translation failed, fallback to EN query: %s", e)
-
-            if not quote_for_match_en:
-                quote_for_match_en = queries.get("en")
-
-            if quote_for_match_en:
-                candidates: list[dict] = []
-
-                # Trump + rollcall → transcript 본문
-                if is_trump_context and rollcall:
-                    for it in search_items:
-                        url = it.get("link")
-                        if not url:
-                            continue
-                        try:
-                            body = fetch_transcript_text(url)
-                        except Exception as e:
-                            logger.warning("Failed to fetch transcript text: %s", e)
-                            continue
-                        if not body:
-                            continue
-                        candidates.append(
-                            {
-                                "url": url,
-                                "snippet": body,
-                            }
-                        )
-                else:
-                    # 일반 CSE → snippet 기반
-                    for it in search_items:
-                        url = it.get("link")
-                        if not url:
-                            continue
-                        snippet = it.get("snippet", "") or ""
-                        if not snippet:
-                            continue
-                        candidates.append(
-                            {
-                                "url": url,
-                                "snippet": snippet,
-                            }
-                        )
-
-                if candidates:
-                    try:
-                        top_spans = get_top_k_spans(
-                            quote_en=quote_for_match_en,
-                            candidates=candidates,
-                            k=top_matches,
-                            num_before=1,
-                            num_after=1,
-                            min_score=0.1,
-                        )
-                        if top_spans:
-                            best_span = top_spans[0]
-                            span_candidates = top_spans  # 필요하면 top_k 전체 넘김
-
-                            logger.info(
-                                "[Step 6] Best span found: score=%.4f, url=%s",
-                                best_span.get("best_score", -1.0),
-                                best_span.get("url", ""),
-                            )
-                        else:
-                            logger.warning("No span passed the similarity threshold.")
-                    except Exception as e:
-                        logger.warning("SBERT snippet matching failed: %s", e)
-                else:
-                    logger.warning("No candidate texts for similarity matching.")
-            else:
-                logger.warning("No English text available for similarity matching.")
-
-    # ★★★ 반드시 여기에서 한 번만 return ★★★
-    return {
-        "pipeline_result": result,
-        "search_items": search_items,
-        "best_span": best_span,
-        "span_candidates": span_candidates,
-    }
-
-    # return {
-    #     "pipeline_result": result,
-    #     "search_items": search_items,
-    #     "best_span": best_span,
-    #     "span_candidates": span_candidates,  # ★ 추가
-    #
-    # }
 
 
 def parse_args() -> argparse.Namespace:
@@ -22,6 +22,8 @@ from bs4 import BeautifulSoup
 import pandas as pd
 from urllib.parse import urlparse, parse_qs
 
+from qdd2.text_utils import scan_quotes
+
 # -------------------------------------------------------------------
 # 0. 전역 설정
 # -------------------------------------------------------------------
@@ -34,6 +36,10 @@ USER_AGENT = (
     "Chrome/121.0.0.0 Safari/537.36"
 )
 
+_MEANINGFUL_CHAR_RE = re.compile(r"[가-힣A-Za-z]")
+# 헤드라인은 "…” 처럼 짝이 어긋난 부호가 흔하므로 큰따옴표 계열을 전부 " 로 통일한 뒤 scan (길이 불변)
+_DOUBLE_QUOTE_NORMALIZE = str.maketrans({c: '"' for c in "“”«»「」『』"})
+
 session = requests.Session()
 session.headers.update({"User-Agent": USER_AGENT})
 
@@ -113,30 +119,15 @@ def get_html(url: str, max_retry: int = 3, sleep: float = 0.5) -> Optional[str]:
 def has_direct_quote(text: str, min_chars: int = 3) -> bool:
     """
     직접 인용문(큰따옴표) 존재 여부를 판단.
-    - “ ”, 『 』, 「 」 등은 전부 " 로 통일 후 처리
+    - “ ”, « », 「 」, 『 』 등은 전부 " 로 통일 후 text_utils.scan_quotes 한 번의 scan으로 찾는다
     - 따옴표 안에 한글/영문 문자가 min_chars개 이상 있을 때만 True
     - 여기서는 '제목(헤드라인)'에 쓰는 것을 전제
     """
     if not text:
         return False
 
-    # 다양한 따옴표를 " 로 통일
-    normalized = (
-        text.replace("“", '"')
-            .replace("”", '"')
-            .replace("«", '"')
-            .replace("»", '"')
-            .replace("「", '"')
-            .replace("」", '"')
-            .replace("『", '"')
-            .replace("』", '"')
-    )
-
-    # " ... " 구간 추출
-    segments = re.findall(r'"([^"]+)"', normalized)
-
-    for seg in segments:
-        meaningful_chars = re.findall(r"[가-힣A-Za-z]", seg)
+    for quote in scan_quotes(text.translate(_DOUBLE_QUOTE_NORMALIZE), styles=("double",)):
+        meaningful_chars = _MEANINGFUL_CHAR_RE.findall(quote.text)
         if len(meaningful_chars) >= min_chars:
             return True
 
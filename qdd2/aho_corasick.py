@@ -0,0 +1,73 @@
+"""
+Aho-Corasick multi-pattern matcher (pure Python).
+
+Used to test many entity/relation terms against a keyword in one pass instead of one
+`term in text` check per term.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class AhoCorasick:
+    """문자 단위 trie + failure link. 빈 패턴은 무시한다."""
+
+    __slots__ = ("patterns", "_goto", "_fail", "_out")
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(dict.fromkeys(p for p in patterns if p))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for pat_id, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (pat_id,)
+
+        # BFS로 failure link 계산, 출력은 suffix 쪽 패턴까지 합쳐 둔다
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _step(self, node: int, ch: str) -> int:
+        while node and ch not in self._goto[node]:
+            node = self._fail[node]
+        return self._goto[node].get(ch, 0)
+
+    def contains_any(self, text: str) -> bool:
+        """text 안에 패턴이 하나라도 있으면 True (첫 매칭에서 멈춘다)."""
+        node = 0
+        for ch in text:
+            node = self._step(node, ch)
+            if self._out[node]:
+                return True
+        return False
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """모든 (겹치는 것 포함) 매칭을 (start, end, pattern)으로 반환."""
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            node = self._step(node, ch)
+            for pat_id in self._out[node]:
+                pattern = self.patterns[pat_id]
+                matches.append((i + 1 - len(pattern), i + 1, pattern))
+        return matches
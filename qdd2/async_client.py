@@ -0,0 +1,135 @@
+"""
+Async counterparts of the blocking network helpers (httpx.AsyncClient).
+
+요청 파라미터와 응답 해석은 search_client / rollcall_search / name_resolution의 함수를 그대로 쓰고,
+여기서는 전송만 비동기로 바꾼다. 한 이벤트 루프에서 여러 인용문의 검색/fetch가 동시에 진행되도록
+client 하나(create_client)를 공유해서 넘긴다. 번역 같은 모델 호출은 executor로 보낸다.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
+
+import httpx
+
+from qdd2 import config
+from qdd2.name_resolution import WIKIDATA_API, wikidata_entity_url, wikidata_label_result, wikidata_search_params
+from qdd2.rollcall_search import API_BASE, links_from_payload, parse_transcript_html, search_params
+from qdd2.search_client import CSE_URL, RETRY_STATUS, cse_params, retry_delay
+from qdd2.translation import translate_ko_to_en
+
+
+def create_client(max_connections: int = config.ASYNC_MAX_CONNECTIONS) -> httpx.AsyncClient:
+    """검색/fetch 공용 AsyncClient. 호출한 쪽에서 `async with` 또는 aclose()로 닫는다."""
+    return httpx.AsyncClient(
+        headers=config.HTTP_HEADERS,
+        timeout=config.DEFAULT_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections),
+    )
+
+
+async def google_cse_search_async(
+    client: httpx.AsyncClient,
+    q: str,
+    num: int = 10,
+    start: int = 1,
+    lr: Optional[str] = None,
+    hl: str = "en",
+    gl: str = "us",
+    safe: Optional[str] = None,
+    retries: int = 3,
+    backoff: float = 1.4,
+    debug: bool = False,
+) -> Dict:
+    """search_client.google_cse_search와 같은 재시도 규칙. 실패하면 {"items": [], "error": 사유}."""
+    params = cse_params(q, num=num, start=start, lr=lr, hl=hl, gl=gl, safe=safe)
+
+    error = None
+    for attempt in range(retries):
+        try:
+            resp = await client.get(CSE_URL, params=params, timeout=config.DEFAULT_TIMEOUT)
+            if debug:
+                print(f"[DEBUG] CSE attempt {attempt + 1}: {resp.status_code} -> {resp.url}")
+
+            if resp.status_code == 200:
+                return resp.json()
+            error = f"CSE HTTP {resp.status_code}"
+            if resp.status_code in RETRY_STATUS:
+                await asyncio.sleep(retry_delay(attempt, backoff))
+                continue
+            resp.raise_for_status()
+        except httpx.HTTPError as e:
+            error = f"CSE request failed: {e}"
+            await asyncio.sleep(retry_delay(attempt, backoff))
+            continue
+
+    return {"items": [], "error": error}
+
+
+async def get_search_results_async(client: httpx.AsyncClient, query: str, top_k: int = 5) -> List[str]:
+    resp = await client.get(API_BASE, params=search_params(query), timeout=10)
+    print("[ROLLCALL] status:", resp.status_code, "url:", resp.url)
+
+    if resp.status_code != 200:
+        return []
+
+    try:
+        payload = resp.json()
+    except Exception:
+        print("[ROLLCALL] invalid json")
+        return []
+
+    return links_from_payload(payload, top_k)
+
+
+async def fetch_transcript_async(client: httpx.AsyncClient, url: str) -> Dict:
+    """rollcall_search.fetch_transcript의 비동기 버전. HTML 파싱은 기본 thread pool에서 한다 (큰 페이지는 수십 ms)."""
+    print("[ROLLCALL] fetch_transcript:", url)
+    resp = await client.get(url, timeout=15)
+    resp.raise_for_status()
+    parsed = await asyncio.to_thread(parse_transcript_html, resp.text)
+    print("[ROLLCALL] transcript chars:", len(parsed["text"]), "segments:", len(parsed["segments"]))
+    return parsed
+
+
+async def get_wikidata_english_name_async(
+    client: httpx.AsyncClient,
+    korean_name: str,
+    timeout: int = 10,
+) -> Dict[str, Optional[str]]:
+    """name_resolution.get_wikidata_english_name과 같은 반환 형식."""
+    try:
+        resp = await client.get(WIKIDATA_API, params=wikidata_search_params(korean_name), timeout=timeout)
+        data = resp.json()
+    except Exception:
+        return {"error": "Failed to fetch search results"}
+
+    if "search" not in data or not data["search"]:
+        return {"error": "No matching Wikidata entry"}
+
+    qid = data["search"][0]["id"]
+
+    try:
+        resp = await client.get(wikidata_entity_url(qid), timeout=timeout)
+        labels = resp.json()["entities"][qid]["labels"]
+    except Exception:
+        return {"error": "Failed to fetch entity details"}
+
+    return wikidata_label_result(korean_name, qid, labels)
+
+
+async def resolve_person_name_en_async(
+    client: httpx.AsyncClient,
+    name_ko: str,
+    executor: Optional[Executor] = None,
+) -> str:
+    """name_resolution.resolve_person_name_en: Wikidata 영어 label → 번역(executor) → 원래 이름."""
+    info = await get_wikidata_english_name_async(client, name_ko)
+    if isinstance(info, dict) and info.get("en"):
+        return info["en"]
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, translate_ko_to_en, name_ko)
+    except Exception:
+        return name_ko
@@ -8,12 +8,21 @@ NER_MODEL_NAME = "monologg/koelectra-base-v3-naver-ner"
 KEYBERT_MODEL_NAME = "snunlp/KR-SBERT-V40K-klueNLI-augSTS"
 TRANSLATION_MODEL_NAME = "Helsinki-NLP/opus-mt-ko-en"
 SENTENCE_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+# Cross-lingual matching: embed the Korean quote directly against English spans (no Marian step)
+MULTILINGUAL_SENTENCE_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+MATCH_CROSS_LINGUAL = False
 
 # Device configuration: 0 = CPU, >0 for GPU (aligns with transformers pipeline)
 DEFAULT_DEVICE = 0
 
 # Named-entity labels we keep from the NER model
 NER_LABELS = {"PER", "ORG", "LOC", "DAT", "AFW"}
+# Sentences per NER forward pass (token-classification model run directly, not via pipeline())
+NER_BATCH_SIZE = 32
+# Long sentences are tagged in overlapping token windows instead of being truncated
+# (None = tokenizer.model_max_length); NER_WINDOW_STRIDE tokens are shared between windows
+NER_WINDOW_TOKENS = 256
+NER_WINDOW_STRIDE = 64
 
 # Relation-like keywords to boost during keyword re-ranking (Korean terms)
 RELATION_KEYWORDS = {
@@ -55,6 +64,94 @@ HTTP_HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
 }
 
+# Rollcall/Factbase transcripts: only this speaker's turns are matched against quotes
+TRANSCRIPT_TARGET_SPEAKER = "Trump"
+# Speaker labels that count as the target (compared whole after rollcall_search.normalize_speaker_name,
+# so "Melania Trump" / "Donald Trump Jr." do not match). A target without an entry matches only itself.
+TRANSCRIPT_SPEAKER_ALIASES = {
+    "Trump": (
+        "Trump",
+        "Donald Trump",
+        "Donald J. Trump",
+        "President Trump",
+        "President Donald Trump",
+        "President Donald J. Trump",
+        "Mr. Trump",
+    ),
+}
+
+# Snippet matching: "exact" encodes every span window, "pooled" encodes each sentence once
+# and mean-pools window embeddings; MATCH_RERANK_TOP_N > 0 re-encodes the top windows exactly.
+MATCH_MODE = "exact"
+MATCH_RERANK_TOP_N = 0
+# Long candidates: only the top-N windows by BM25 against the quote/keywords reach SBERT (None disables).
+# Lossy, so off by default until `bench_matcher.py prefilter` shows the best span unchanged with the real
+# encoder (e.g. 200 for long transcripts).
+MATCH_PREFILTER_TOP_N = None
+# Span windows are scored in streaming chunks of this size (bounds peak memory on long transcripts)
+MATCH_CHUNK_WINDOWS = 512
+# Top windows kept per candidate document; windows whose sentence-range IoU with an already kept
+# window exceeds MATCH_NMS_IOU are suppressed (0.0 = no shared sentences)
+MATCH_PER_DOC_TOP_K = 1
+MATCH_NMS_IOU = 0.0
+# Near-verbatim quotes: token-level fuzzy score at/above this skips the encoder (None disables)
+LEXICAL_MATCH_THRESHOLD = 0.9
+
+# Persistent float16 embedding store for encoded sentences/spans (None or "" disables it)
+EMBEDDING_STORE_DIR = ".qdd2_cache/embeddings"
+# Also route KeyBERT candidate phrases (~300 per article) through that store. Off by default: the store
+# has no size bound, every process loads its whole index, and float16 vectors can reorder MMR picks.
+KEYWORD_PHRASE_STORE = False
+
+# build_dataset: quotes shorter than this (stripped chars) are not turned into jobs (e.g. '며' from broken marks)
+QUOTE_MIN_LENGTH = 2
+
+# KeyBERT batch extraction: documents vectorized/embedded together per batch
+KEYWORD_BATCH_SIZE = 64
+# Quote-local extraction: NER/keywords run only on the quote's sentence ± this many sentences
+# (+ headline), falling back to the full article when no PER is found there. None = full article.
+QUERY_CONTEXT_SENTENCES = None
+# Keyword engine for extract_keywords_with_ner: "keybert" (embedding + MMR) or "tfidf" (DF table, no model)
+KEYWORD_ENGINE = "keybert"
+# Count-min sketch of n-gram document frequencies for the tfidf engine: "<path>.npz" snapshot + "<path>.log"
+# append-only delta (None or "" keeps it in memory). Seed it with `python -m qdd2.tfidf_keywords articles.csv`.
+KEYWORD_DF_PATH = ".qdd2_cache/keyword_df"
+KEYWORD_DF_BUCKETS = 2**21  # per count-min row; 2 rows of int32 → 16 MB however many n-grams are seen
+KEYWORD_DF_SAVE_EVERY = 200  # articles buffered before appending them to the log
+KEYWORD_DF_COMPACT_EVERY = 5000  # logged articles before folding the log into the snapshot
+# Count each processed article into the DF table on the query path (off: the table only changes via the CLI)
+KEYWORD_DF_UPDATE = False
+
+# Archive ANN index over source sentences (IVF-Flat); None disables indexing/lookup
+SENTENCE_INDEX_DIR = None
+ANN_NLIST = 256
+ANN_NPROBE = 8
+ANN_TRAIN_POINTS_PER_LIST = 39
+
+# Staged pipeline (qdd2.stages / build_dataset engine="staged"): bounded queue size between stages,
+# items per CPU-stage batch, worker threads per I/O stage (search/fetch)
+PIPELINE_QUEUE_SIZE = 32
+PIPELINE_CPU_BATCH = 8
+PIPELINE_IO_WORKERS = 8
+
+# Async path (main.run_qdd2_async / build_dataset engine="async"): quotes in flight at once,
+# connection pool size of the shared httpx.AsyncClient
+ASYNC_MAX_IN_FLIGHT = 32
+ASYNC_MAX_CONNECTIONS = 20
+
+# Process-sharded build (build_dataset engine="processes"): worker processes (None: cpu_count // threads),
+# torch intra-op threads per worker, articles per task sent to a worker.
+# fork가 되는 플랫폼에서는 부모가 fork 전에 모델을 올리고 worker들이 copy-on-write로 공유한다.
+# spawn만 되는 플랫폼은 worker마다 모델을 따로 올리므로 (NER+KeyBERT+SBERT+Marian ≈ 2GB)
+# PROCESS_WORKERS가 None이면 PROCESS_MAX_SPAWN_WORKERS개까지만 띄운다.
+PROCESS_WORKERS = None
+PROCESS_MAX_SPAWN_WORKERS = 4
+PROCESS_THREADS_PER_WORKER = 1
+PROCESS_ARTICLES_PER_TASK = 4
+
+# build_dataset checkpoint: 끝난 (기사, 인용문) key와 CSV offset을 output_csv + 이 suffix 파일에 기록
+DATASET_CHECKPOINT_SUFFIX = ".checkpoint"
+
 HTML_MIN_LENGTH = 500
 DEFAULT_TIMEOUT = 12
 PDF_TIMEOUT = 20
@@ -0,0 +1,168 @@
+"""
+Persistent text-embedding store (text hash + model id -> float16 vector).
+
+Layout per model under config.EMBEDDING_STORE_DIR:
+  <model_id>/vectors.f16  raw float16 rows, memory-mapped for reads
+  <model_id>/index.tsv    "hash<TAB>row" lines, appended after the vector bytes
+  <model_id>/meta.json    {"model_id": ..., "dim": ...}
+  <model_id>/.lock        fcntl lock file: writers in different processes (build_dataset
+                          engine="processes") append one at a time
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from qdd2 import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: process 간 lock 없음 (thread lock만)
+    fcntl = None
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingStore:
+    """Append-only float16 embedding store for one encoder model."""
+
+    def __init__(self, root: str, model_id: str):
+        self.model_id = model_id
+        self.path = os.path.join(root, re.sub(r"[^\w.\-]+", "__", model_id))
+        os.makedirs(self.path, exist_ok=True)
+        self._vec_path = os.path.join(self.path, "vectors.f16")
+        self._idx_path = os.path.join(self.path, "index.tsv")
+        self._meta_path = os.path.join(self.path, "meta.json")
+        self._lock_path = os.path.join(self.path, ".lock")
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._idx_pos = 0  # index.tsv에서 이미 읽은 byte 위치
+        self._mmap: Optional[np.memmap] = None
+        self.dim: Optional[int] = None
+        with self._process_lock():
+            self._load()
+
+    def _load(self) -> None:
+        if self.dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        if not self.dim or not os.path.exists(self._idx_path):
+            return
+
+        # vectors.f16보다 index가 앞설 수는 없지만(항상 vector 먼저 기록), 잘린 파일은 방어한다
+        n_rows = os.path.getsize(self._vec_path) // (2 * self.dim) if os.path.exists(self._vec_path) else 0
+        with open(self._idx_path, "rb") as f:
+            f.seek(self._idx_pos)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 다른 process가 쓰는 중인 줄은 다음에 읽는다
+                self._idx_pos += len(raw)
+                parts = raw.decode("utf-8").rstrip("\n").split("\t")
+                if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < n_rows:
+                    self._index[parts[0]] = int(parts[1])
+
+    @contextmanager
+    def _process_lock(self):
+        """다른 process의 put_many와 겹치지 않게 .lock 파일에 배타 lock (fcntl이 없으면 no-op)."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _rows(self) -> np.memmap:
+        n_rows = os.path.getsize(self._vec_path) // (2 * self.dim)
+        if self._mmap is None or self._mmap.shape[0] != n_rows:
+            self._mmap = np.memmap(self._vec_path, dtype=np.float16, mode="r", shape=(n_rows, self.dim))
+        return self._mmap
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """texts 순서대로 저장된 벡터(float32) 또는 None을 반환."""
+        with self._lock:
+            rows = [self._index.get(text_hash(t)) for t in texts]
+            if not any(r is not None for r in rows):
+                return [None] * len(texts)
+            mm = self._rows()
+            return [None if r is None else np.asarray(mm[r], dtype=np.float32) for r in rows]
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float16)
+        if len(texts) != len(vectors):
+            raise ValueError("texts and vectors must have the same length")
+        if not len(texts):
+            return
+
+        with self._lock, self._process_lock():
+            # 다른 process가 그 사이에 추가한 행을 먼저 읽어야 row 번호와 중복 판정이 맞는다
+            self._load()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model_id": self.model_id, "dim": self.dim}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"dim mismatch: store={self.dim}, vectors={vectors.shape[1]}")
+
+            new_rows = []
+            hashes = set()
+            for text, vec in zip(texts, vectors):
+                h = text_hash(text)
+                if h in self._index or h in hashes:
+                    continue
+                hashes.add(h)
+                new_rows.append((h, vec))
+            if not new_rows:
+                return
+
+            start = os.path.getsize(self._vec_path) // (2 * self.dim) if os.path.exists(self._vec_path) else 0
+            with open(self._vec_path, "ab") as f:
+                f.write(np.stack([v for _, v in new_rows]).tobytes())
+            lines = "".join(f"{h}\t{start + i}\n" for i, (h, _) in enumerate(new_rows)).encode("utf-8")
+            with open(self._idx_path, "ab") as f:
+                f.write(lines)
+            for i, (h, _) in enumerate(new_rows):
+                self._index[h] = start + i
+
+
+@lru_cache(maxsize=8)
+def get_embedding_store(model_id: str) -> Optional[EmbeddingStore]:
+    """config.EMBEDDING_STORE_DIR이 비어 있으면 store를 사용하지 않는다 (None)."""
+    if not config.EMBEDDING_STORE_DIR:
+        return None
+    return EmbeddingStore(config.EMBEDDING_STORE_DIR, model_id)
+
+
+def encode_with_store(encode_fn, texts: Sequence[str], model_id: str) -> np.ndarray:
+    """
+    store에 있는 텍스트는 읽어오고, 없는 텍스트만 encode_fn(list[str]) -> np.ndarray로 인코딩 후 저장.
+    반환값은 texts 순서의 float32 배열.
+    """
+    texts = list(texts)
+    store = get_embedding_store(model_id)
+    if store is None:
+        return np.asarray(encode_fn(texts), dtype=np.float32)
+
+    cached = store.get_many(texts)
+    missing = [t for t, v in zip(texts, cached) if v is None]
+    if missing:
+        # 저장 정밀도(float16)로 맞춰서 첫 실행과 재실행의 점수가 같도록 한다
+        fresh = np.asarray(encode_fn(missing), dtype=np.float16).astype(np.float32)
+        store.put_many(missing, fresh)
+        fresh_by_text = dict(zip(missing, fresh))
+        cached = [fresh_by_text[t] if v is None else v for t, v in zip(texts, cached)]
+    return np.stack(cached) if cached else np.zeros((0, store.dim or 0), dtype=np.float32)
@@ -2,11 +2,24 @@
 NER helpers: run pipeline, merge BIO tokens, and return cleaned entities.
 """
 
-from typing import Dict, List, Sequence
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
 
 from qdd2 import config
 from qdd2.models import get_ner_pipeline
-from qdd2.text_utils import split_sentences
+from qdd2.text_utils import as_document
+
+_TAG_B, _TAG_I, _TAG_OTHER = 0, 1, 2
+_PUNCT_WORDS = {'"', "'", "(", ")", "[", "]", "{", "}", ",", ".", "!", "?"}
+
+
+def _is_valid_entity_word(word: str) -> bool:
+    if len(word) < 2 or word in _PUNCT_WORDS:
+        return False
+    return word.replace(" ", "").replace("-", "").replace("·", "") != ""
 
 
 def merge_ner_entities(results: Sequence[Dict], debug: bool = False) -> List[Dict]:
@@ -50,11 +63,7 @@ def merge_ner_entities(results: Sequence[Dict], debug: bool = False) -> List[Dic
         entity_type = (group[0]["entity"] or "").split("-")[0]
         word = "".join([str(e.get("word", "")).replace("##", "") for e in group]).strip()
 
-        if len(word) < 2:
-            continue
-        if word in {'"', "'", "(", ")", "[", "]", "{", "}", ",", ".", "!", "?"}:
-            continue
-        if word.replace(" ", "").replace("-", "").replace("·", "") == "":
+        if not _is_valid_entity_word(word):
             continue
 
         entities.append({"label": entity_type, "word": word})
@@ -64,22 +73,200 @@ def merge_ner_entities(results: Sequence[Dict], debug: bool = False) -> List[Dic
     return entities
 
 
-def extract_ner_entities(text: str, device: int = config.DEFAULT_DEVICE, debug: bool = False) -> List[Dict]:
+BioTables = Tuple[Tuple[Optional[str], ...], Tuple[int, ...], np.ndarray]
+
+
+@lru_cache(maxsize=4)
+def bio_tables(labels: Tuple[str, ...]) -> BioTables:
+    """
+    labels[i] = id2label[i] (예: "PER-B", "O") → (entity type 표, BIO tag 표, 대상 라벨 mask).
+    NER_LABELS에 없는 라벨("O" 포함)의 type은 None이고 mask는 False다 (decode에서 건너뛴다).
+    """
+    types: List[Optional[str]] = []
+    tags: List[int] = []
+    for label in labels:
+        parts = (label or "").split("-")
+        tag = parts[1] if len(parts) > 1 else "B"
+        types.append(parts[0] if parts[0] in config.NER_LABELS else None)
+        tags.append(_TAG_B if tag == "B" else _TAG_I if tag == "I" else _TAG_OTHER)
+    is_target = np.array([t is not None for t in types], dtype=bool)
+    return tuple(types), tuple(tags), is_target
+
+
+def model_bio_tables(model) -> BioTables:
+    id2label = model.config.id2label
+    return bio_tables(tuple(id2label[i] for i in range(len(id2label))))
+
+
+def decode_bio_entities(
+    text: str,
+    label_ids: Sequence[int],
+    offsets: Sequence[Tuple[int, int]],
+    tables: BioTables,
+    debug: bool = False,
+) -> List[Dict]:
+    """
+    토큰별 label id + (start, end) offset 배열에서 바로 entity를 만든다.
+    병합 규칙은 merge_ner_entities와 같고, word는 word piece를 이어 붙이지 않고 원문을 offset으로 잘라 만든다
+    (여러 어절 entity는 원문 공백을 유지한다. 중간에 건너뛴 토큰이 있으면 그 부분만 빼고 잇는다).
+    그래서 merge_ner_entities의 "도널드트럼프"는 여기서 "도널드 트럼프"가 된다 (의도된 변경: Wikidata 이름 검색과
+    쿼리에는 원문 표기가 맞고, 키워드 boost/중복 제거는 normalize_korean_phrase로 공백을 지우고 비교한다).
+    offset이 빈 토큰(special/padding)과 대상이 아닌 라벨은 배열 단계에서 미리 걸러낸다.
+    """
+    types, tags, is_target = tables
+    label_ids = np.asarray(label_ids)
+    offsets = np.asarray(offsets)
+    keep = np.flatnonzero(is_target[label_ids] & (offsets[:, 1] > offsets[:, 0]))
+
+    groups: List[List] = []
+    current: Optional[List] = None  # [type, start, end, 앞서 끊긴 (start, end) 조각들]
+    for label_id, start, end in zip(label_ids[keep].tolist(), offsets[keep, 0].tolist(), offsets[keep, 1].tolist()):
+        entity_type = types[label_id]
+        tag = tags[label_id]
+        if tag == _TAG_B:
+            if current is not None:
+                groups.append(current)
+            current = [entity_type, start, end, []]
+        elif tag == _TAG_I and current is not None:
+            if entity_type == current[0] and start <= current[2] + 1:
+                if start > current[2] and not text[current[2] : start].isspace():
+                    current[3].append((current[1], current[2]))
+                    current[1] = start
+                current[2] = end
+            else:
+                groups.append(current)
+                current = [entity_type, start, end, []]
+        else:
+            if current is not None:
+                groups.append(current)
+            current = None
+    if current is not None:
+        groups.append(current)
+
+    entities: List[Dict] = []
+    for entity_type, start, end, pieces in groups:
+        if pieces:
+            word = "".join(text[s:e] for s, e in pieces) + text[start:end]
+        else:
+            word = text[start:end]
+        word = word.strip()
+        if not _is_valid_entity_word(word):
+            continue
+        entities.append({"label": entity_type, "word": word})
+        if debug:
+            print(f"Merged entity: {entity_type} -> {word}")
+    return entities
+
+
+def _merge_windows(
+    rows: Sequence[int],
+    row_labels: Sequence[np.ndarray],
+    row_offsets: Sequence[np.ndarray],
+    row_special: Sequence[np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    한 문장의 window들을 토큰 단위로 합친다. 겹치는 구간의 토큰은 window 가장자리에서 더 먼 쪽
+    (문맥을 양쪽으로 더 많이 본 쪽)의 예측을 쓰고, 원문 start offset 순서로 정렬해 돌려준다.
+    """
+    labels, offsets, margins = [], [], []
+    for row in rows:
+        valid = np.flatnonzero(~row_special[row])
+        if not len(valid):
+            continue
+        pos = np.arange(len(valid))
+        labels.append(row_labels[row][valid])
+        offsets.append(row_offsets[row][valid])
+        margins.append(np.minimum(pos, len(valid) - 1 - pos))
+    if not labels:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 2), dtype=np.int64)
+    if len(labels) == 1:
+        return labels[0], offsets[0]
+
+    labels = np.concatenate(labels)
+    offsets = np.concatenate(offsets)
+    margins = np.concatenate(margins)
+    order = np.lexsort((-margins, offsets[:, 0]))
+    _, first = np.unique(offsets[order, 0], return_index=True)
+    keep = order[first]
+    return labels[keep], offsets[keep]
+
+
+def iter_ner_label_ids(
+    sentences: Sequence[str],
+    device: int = config.DEFAULT_DEVICE,
+    batch_size: int = config.NER_BATCH_SIZE,
+    max_tokens: Optional[int] = config.NER_WINDOW_TOKENS,
+    stride: int = config.NER_WINDOW_STRIDE,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    pipeline 객체의 tokenizer/model을 직접 돌려 문장마다 (argmax label id 배열, offset 배열)을 낸다.
+
+    max_tokens(없으면 tokenizer.model_max_length)보다 긴 문장은 stride 토큰씩 겹치는 window로 나눠서
+    끝까지 태깅한다 (pipeline처럼 잘라 버리지 않음). 모든 문장의 window를 길이순으로 정렬해
+    batch_size개씩 모델에 넣으므로, 긴 문장 하나 때문에 배치 전체가 큰 길이로 padding되지 않는다.
+    반환 배열에는 special 토큰이 없고, window 경계에서 겹친 토큰은 한 번만 들어간다.
+    """
+    ner = get_ner_pipeline(device=device)
+    tokenizer, model = ner.tokenizer, ner.model
+    if not sentences:
+        return
+    max_length = min(max_tokens or tokenizer.model_max_length, tokenizer.model_max_length)
+    # tokenizer는 stride가 (max_length - special 토큰 수) 이상이면 거부한다
+    stride = min(stride, (max_length - tokenizer.num_special_tokens_to_add()) // 2)
+
+    enc = tokenizer(
+        list(sentences),
+        truncation=True,
+        max_length=max_length,
+        stride=stride,
+        return_overflowing_tokens=True,
+        return_offsets_mapping=True,
+        return_special_tokens_mask=True,
+    )
+    sample_of_row = enc.pop("overflow_to_sample_mapping")
+    row_offsets = [np.asarray(o, dtype=np.int64).reshape(-1, 2) for o in enc.pop("offset_mapping")]
+    row_special = [np.asarray(m, dtype=bool) for m in enc.pop("special_tokens_mask")]
+    model_keys = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in enc]
+
+    row_labels: List[Optional[np.ndarray]] = [None] * len(sample_of_row)
+    by_length = sorted(range(len(sample_of_row)), key=lambda r: len(enc["input_ids"][r]))
+    for pos in range(0, len(by_length), batch_size):
+        chunk = by_length[pos : pos + batch_size]
+        batch = tokenizer.pad({k: [enc[k][r] for r in chunk] for k in model_keys}, return_tensors="pt")
+        with torch.inference_mode():
+            logits = model(**{k: v.to(model.device) for k, v in batch.items()}).logits
+        label_ids = logits.argmax(dim=-1).cpu().numpy()
+        for i, r in enumerate(chunk):
+            row_labels[r] = label_ids[i, : len(enc["input_ids"][r])]
+
+    rows_of_sample: List[List[int]] = [[] for _ in sentences]
+    for r, sample in enumerate(sample_of_row):
+        rows_of_sample[sample].append(r)
+    for rows in rows_of_sample:
+        yield _merge_windows(rows, row_labels, row_offsets, row_special)
+
+
+def extract_ner_entities(text, device: int = config.DEFAULT_DEVICE, debug: bool = False) -> List[Dict]:
     """
     Run NER over each sentence and merge tokens into clean entities.
+    text는 str 또는 text_utils.Document (문장 경계는 Document에 캐시된 것을 쓴다).
+    문장들은 배치로 모델에 넣고, label id/offset 배열을 decode_bio_entities로 바로 디코딩한다.
     Returns: [{'label': 'PER', 'word': '...'}, ...]
     """
-    sentences = split_sentences(text)
-    ner = get_ner_pipeline(device=device)
+    sentences = as_document(text).sentences()
+    if not sentences:
+        return []
+    tables = model_bio_tables(get_ner_pipeline(device=device).model)
     all_entities: List[Dict] = []
 
-    for idx, sentence in enumerate(sentences):
-        raw = ner(sentence)
-        merged = merge_ner_entities(raw, debug=debug)
+    for idx, (sentence, (label_ids, offsets)) in enumerate(
+        zip(sentences, iter_ner_label_ids(sentences, device=device))
+    ):
+        merged = decode_bio_entities(sentence, label_ids, offsets, tables, debug=debug)
         all_entities.extend(merged)
 
         if debug:
             print(f"[Sentence {idx + 1}] {sentence[:80]}...")
-            print(f"  Raw: {len(raw)} -> Merged: {len(merged)}")
+            print(f"  Tokens: {len(label_ids)} -> Merged: {len(merged)}")
 
     return all_entities
@@ -2,12 +2,25 @@
 Keyword extraction and NER-informed re-ranking.
 """
 
-from typing import Dict, List, Sequence, Tuple
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
 
 from qdd2 import config
+from qdd2.aho_corasick import AhoCorasick
+from qdd2.embedding_store import encode_with_store
 from qdd2.entities import extract_ner_entities
 from qdd2.models import get_keyword_model
-from qdd2.text_utils import normalize_korean_phrase
+from qdd2.text_utils import as_document, normalize_korean_phrase
+from qdd2.tfidf_keywords import extract_keywords_tfidf
+
+
+@lru_cache(maxsize=4)
+def _relation_automaton(relation_keywords: FrozenSet[str]) -> AhoCorasick:
+    """relation 용어 automaton (같은 용어 집합이면 프로세스당 한 번만 만든다)."""
+    return AhoCorasick(normalize_korean_phrase(r) for r in relation_keywords)
 
 
 def rerank_with_ner_boost(
@@ -20,14 +33,15 @@ def rerank_with_ner_boost(
     """
     Boost keyword scores when they include entities or relation-like terms.
     """
-    rel_terms = {normalize_korean_phrase(r) for r in (relation_keywords or config.RELATION_KEYWORDS)}
-    ent_terms = {normalize_korean_phrase(e["word"]) for e in entities}
+    # 용어마다 `in` 검사를 하지 않고, 키워드 하나를 automaton으로 한 번씩만 훑는다
+    rel_matcher = _relation_automaton(frozenset(relation_keywords or config.RELATION_KEYWORDS))
+    ent_matcher = AhoCorasick(normalize_korean_phrase(e["word"]) for e in entities)  # 기사마다 한 번
 
     rescored = []
     for phrase, score in keywords:
         normalized = normalize_korean_phrase(phrase)
-        has_entity = any(et and et in normalized for et in ent_terms)
-        has_relation = any(rt and rt in normalized for rt in rel_terms)
+        has_entity = ent_matcher.contains_any(normalized)
+        has_relation = rel_matcher.contains_any(normalized)
 
         bonus = 0.0
         if has_entity and has_relation:
@@ -46,8 +60,62 @@ def rerank_with_ner_boost(
     return sorted(deduped.values(), key=lambda x: x[1], reverse=True)
 
 
+def extract_keywords_batch(
+    texts: Sequence[str],
+    top_n: int = 15,
+    use_mmr: bool = True,
+    diversity: float = 0.7,
+    keyphrase_ngram_range: Tuple[int, int] = (1, 3),
+    batch_size: int = config.KEYWORD_BATCH_SIZE,
+) -> List[List[Tuple[str, float]]]:
+    """
+    여러 문서의 KeyBERT 키워드를 한 번에 추출한다 (문서 순서대로 [(phrase, score), ...] 리스트).
+
+    batch_size개 문서씩 1~3-gram 후보를 한 번에 vectorize하고, 문서 임베딩과 후보 phrase 임베딩을
+    배치로 구한다 (float32). 후보 선택/MMR은 KeyBERT 그대로라 문서별 결과는 kw_model.extract_keywords(doc)와 같다.
+    config.KEYWORD_PHRASE_STORE가 켜져 있으면 phrase 임베딩은 embedding store(KEYBERT_MODEL_NAME 기준)를 거쳐
+    처음 보는 phrase만 인코딩한다 (float16 정밀도 때문에 MMR 순서가 달라질 수 있음).
+    """
+    kw_model = get_keyword_model()
+    results: List[List[Tuple[str, float]]] = [[] for _ in texts]
+    todo = [i for i, t in enumerate(texts) if t and t.strip()]
+
+    for pos in range(0, len(todo), batch_size):
+        idxs = todo[pos : pos + batch_size]
+        docs = [texts[i] for i in idxs]
+        # KeyBERT는 받은 vectorizer를 같은 docs로 다시 fit하므로 vocabulary 순서가 그대로 유지된다
+        vectorizer = CountVectorizer(ngram_range=keyphrase_ngram_range, stop_words="english")
+        try:
+            words = vectorizer.fit(docs).get_feature_names_out()
+        except ValueError:  # 배치 전체에 후보 n-gram이 없음
+            continue
+
+        doc_embeddings = np.asarray(kw_model.model.embed(docs), dtype=np.float32)
+        if config.KEYWORD_PHRASE_STORE:
+            word_embeddings = encode_with_store(
+                kw_model.model.embed, list(words), model_id=config.KEYBERT_MODEL_NAME
+            )
+        else:
+            word_embeddings = np.asarray(kw_model.model.embed(list(words)), dtype=np.float32)
+
+        batch_keywords = kw_model.extract_keywords(
+            docs,
+            vectorizer=vectorizer,
+            doc_embeddings=doc_embeddings,
+            word_embeddings=word_embeddings,
+            top_n=top_n,
+            use_mmr=use_mmr,
+            diversity=diversity if use_mmr else None,
+        )
+        if len(docs) == 1:  # KeyBERT는 문서가 하나면 리스트를 한 겹 벗겨서 돌려준다
+            batch_keywords = [batch_keywords]
+        for i, keywords in zip(idxs, batch_keywords):
+            results[i] = keywords
+    return results
+
+
 def extract_keywords_with_ner(
-    text: str,
+    text,
     top_n: int = 15,
     use_mmr: bool = True,
     diversity: float = 0.7,
@@ -55,9 +123,14 @@ def extract_keywords_with_ner(
     beta: float = 0.3,
     device: int = config.DEFAULT_DEVICE,
     debug: bool = False,
+    base_keywords: Sequence[Tuple[str, float]] = None,
+    engine: str = None,
 ) -> Dict:
     """
-    Extract keywords with KeyBERT, then boost scores using NER + relation hints.
+    Extract keywords with KeyBERT (or TF-IDF), then boost scores using NER + relation hints.
+    text는 str 또는 text_utils.Document (NER은 Document의 캐시된 문장 경계를 쓴다).
+    base_keywords: extract_keywords_batch로 미리 뽑아 둔 KeyBERT 결과 (top_n * 3개). 없으면 여기서 추출.
+    engine: "keybert" | "tfidf" (None이면 config.KEYWORD_ENGINE). tfidf는 모델 없이 DF 테이블로 순위를 매긴다.
     Returns:
         {
           "entities": [...],
@@ -65,16 +138,19 @@ def extract_keywords_with_ner(
           "entities_by_type": {"PER": [...], ...},
         }
     """
-    entities = extract_ner_entities(text, device=device, debug=debug)
-
-    kw_model = get_keyword_model()
-    base_keywords = kw_model.extract_keywords(
-        text,
-        keyphrase_ngram_range=(1, 3),
-        top_n=top_n * 3,
-        use_mmr=use_mmr,
-        diversity=diversity if use_mmr else None,
-    )
+    doc = as_document(text)
+    entities = extract_ner_entities(doc, device=device, debug=debug)
+
+    engine = engine or config.KEYWORD_ENGINE
+    if base_keywords is None and engine == "tfidf":
+        base_keywords = extract_keywords_tfidf(doc.text, top_n=top_n * 3, update=config.KEYWORD_DF_UPDATE)
+    elif base_keywords is None:
+        base_keywords = extract_keywords_batch(
+            [doc.text],
+            top_n=top_n * 3,
+            use_mmr=use_mmr,
+            diversity=diversity,
+        )[0]
 
     reranked_keywords = rerank_with_ner_boost(
         base_keywords,
@@ -83,33 +159,92 @@ def extract_keywords_with_ner(
         beta=beta,
     )
 
-    entities_by_type: Dict[str, List[str]] = {}
-    seen_normalized = set()
-    for ent in entities:
-        label = ent["label"]
-        word = ent["word"]
-        normalized = normalize_korean_phrase(word)
-
-        is_duplicate = False
-        for seen in list(seen_normalized):
-            if normalized in seen and normalized != seen:
-                is_duplicate = True
-                break
-            if seen in normalized and normalized != seen:
-                seen_normalized.discard(seen)
-                for lbl in entities_by_type:
-                    entities_by_type[lbl] = [
-                        w for w in entities_by_type[lbl] if normalize_korean_phrase(w) != seen
-                    ]
-
-        if not is_duplicate:
-            seen_normalized.add(normalized)
-            entities_by_type.setdefault(label, [])
-            if word not in entities_by_type[label]:
-                entities_by_type[label].append(word)
+    entities_by_type = group_entities_by_type(entities)
 
     return {
         "entities": entities,
         "keywords": reranked_keywords[:top_n],
         "entities_by_type": entities_by_type,
     }
+
+
+def extract_keywords_with_ner_batch(
+    texts: Sequence,
+    top_n: int = 15,
+    use_mmr: bool = True,
+    diversity: float = 0.7,
+    alpha: float = 0.7,
+    beta: float = 0.3,
+    device: int = config.DEFAULT_DEVICE,
+    debug: bool = False,
+    engine: str = None,
+) -> List[Dict]:
+    """extract_keywords_with_ner의 여러 기사 버전. KeyBERT 단계만 extract_keywords_batch로 묶는다."""
+    docs = [as_document(t) for t in texts]
+    if (engine or config.KEYWORD_ENGINE) == "tfidf":
+        base = [extract_keywords_tfidf(d.text, top_n=top_n * 3, update=config.KEYWORD_DF_UPDATE) for d in docs]
+    else:
+        base = extract_keywords_batch([d.text for d in docs], top_n=top_n * 3, use_mmr=use_mmr, diversity=diversity)
+    return [
+        extract_keywords_with_ner(
+            doc,
+            top_n=top_n,
+            alpha=alpha,
+            beta=beta,
+            device=device,
+            debug=debug,
+            base_keywords=keywords,
+        )
+        for doc, keywords in zip(docs, base)
+    ]
+
+
+def _substrings(text: str) -> Iterable[str]:
+    n = len(text)
+    return (text[i:j] for i in range(n) for j in range(i + 1, n + 1))
+
+
+def group_entities_by_type(entities: Sequence[Dict]) -> Dict[str, List[str]]:
+    """
+    라벨별 entity 목록. 정규화 형태가 이미 본 entity의 일부이면 버리고,
+    새 entity가 이미 본 entity를 포함하면 짧은 쪽을 목록에서 뺀다 (긴 이름 우선).
+
+    entity 쌍을 모두 비교하지 않고 substring 색인을 쓴다:
+      - contained_in[sub]: sub를 (자기 자신이 아닌) 부분 문자열로 갖는 seen 항목 수
+      - 새 entity의 부분 문자열만 seen에서 찾는다
+    entity 길이를 L이라 하면 entity당 O(L^2)이고, entity 수가 늘어도 비용이 늘지 않는다.
+    """
+    by_type: Dict[str, Dict[str, None]] = {}
+    words_by_norm: Dict[str, List[Tuple[str, str]]] = {}
+    contained_in: Dict[str, int] = {}
+
+    def index(norm: str, delta: int) -> None:
+        for sub in set(_substrings(norm)):
+            if sub != norm:
+                contained_in[sub] = contained_in.get(sub, 0) + delta
+
+    for ent in entities:
+        label = ent["label"]
+        word = ent["word"]
+        normalized = normalize_korean_phrase(word)
+
+        # 구분자만 있는 entity, 또는 이미 본 더 긴 entity의 일부 → 중복
+        if not normalized or contained_in.get(normalized, 0) > 0:
+            continue
+
+        # 새 entity가 포함하는 짧은 entity들은 제거
+        for sub in set(_substrings(normalized)):
+            if sub != normalized and sub in words_by_norm:
+                for lbl, w in words_by_norm.pop(sub):
+                    by_type[lbl].pop(w, None)
+                index(sub, -1)
+
+        if normalized not in words_by_norm:
+            words_by_norm[normalized] = []
+            index(normalized, +1)
+        by_type.setdefault(label, {})
+        if word not in by_type[label]:
+            by_type[label][word] = None
+            words_by_norm[normalized].append((label, word))
+
+    return {label: list(words) for label, words in by_type.items()}
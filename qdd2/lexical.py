@@ -0,0 +1,148 @@
+"""
+Cheap lexical scoring used before (or instead of) SBERT on long candidate texts.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+EN_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "been", "but", "by", "for", "from", "has", "have",
+    "he", "her", "his", "i", "in", "is", "it", "its", "of", "on", "or", "our", "she", "so", "that",
+    "the", "their", "them", "they", "this", "to", "was", "we", "were", "will", "with", "you",
+}
+
+
+def tokenize_en(text: str, drop_stopwords: bool = True) -> List[str]:
+    """소문자 영문/숫자 토큰. drop_stopwords=True면 기능어를 뺀다."""
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in EN_STOPWORDS]
+    return tokens
+
+
+def bm25_scores(
+    docs_tokens: Sequence[Sequence[str]],
+    query_tokens: Iterable[str],
+    k1: float = 1.5,
+    b: float = 0.75,
+) -> List[float]:
+    """
+    docs_tokens(문장별 토큰 리스트) 각각의 BM25 점수.
+    IDF는 주어진 문장 집합 안에서 계산한다 (문서 하나를 문장 단위 corpus로 본다).
+    """
+    n_docs = len(docs_tokens)
+    if not n_docs:
+        return []
+    query_terms = set(query_tokens)
+    if not query_terms:
+        return [0.0] * n_docs
+
+    df = Counter()
+    for tokens in docs_tokens:
+        df.update(query_terms.intersection(tokens))
+    idf = {t: math.log(1.0 + (n_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in query_terms if df[t]}
+    if not idf:
+        return [0.0] * n_docs
+
+    avg_len = sum(len(t) for t in docs_tokens) / n_docs or 1.0
+    scores = []
+    for tokens in docs_tokens:
+        tf = Counter(t for t in tokens if t in idf)
+        norm = k1 * (1.0 - b + b * len(tokens) / avg_len)
+        scores.append(sum(idf[t] * f * (k1 + 1.0) / (f + norm) for t, f in tf.items()))
+    return scores
+
+
+def top_window_indices(
+    sentence_scores: Sequence[float],
+    windows: Sequence[tuple],
+    top_n: int,
+) -> List[int]:
+    """
+    window(=(center, start, end))마다 포함 문장 BM25 합으로 점수를 매기고
+    상위 top_n개 window 인덱스를 원래 순서대로 반환.
+    """
+    prefix = [0.0]
+    for score in sentence_scores:
+        prefix.append(prefix[-1] + score)
+    window_scores = [prefix[w[2] + 1] - prefix[w[1]] for w in windows]
+    top = heapq.nlargest(top_n, range(len(windows)), key=window_scores.__getitem__)
+    return sorted(top)
+
+
+def fuzzy_match_span(
+    quote_text: str,
+    sentences: Sequence[str],
+    min_quote_tokens: int = 4,
+) -> Optional[Tuple[float, int, int]]:
+    """
+    정규화 토큰 기준으로 quote와 가장 비슷한 구간을 sliding window로 찾는다.
+
+    문서 전체 토큰열 위에서 quote 길이만큼의 window를 한 칸씩 옮기면서
+    quote unigram/bigram 재현율을 카운터로 증분 갱신한다 (문서 길이에 선형).
+    반환: (score, start_sentence_idx, end_sentence_idx) 또는 None.
+    score = 0.5 * unigram 재현율 + 0.5 * bigram 재현율, verbatim이면 1.0.
+    """
+    q_tokens = tokenize_en(quote_text, drop_stopwords=False)
+    m = len(q_tokens)
+    if m < min_quote_tokens:
+        return None
+
+    doc_tokens: List[str] = []
+    token_sent: List[int] = []
+    for sent_idx, sentence in enumerate(sentences):
+        toks = tokenize_en(sentence, drop_stopwords=False)
+        doc_tokens.extend(toks)
+        token_sent.extend([sent_idx] * len(toks))
+    if not doc_tokens:
+        return None
+
+    q_uni = Counter(q_tokens)
+    q_bi = Counter(zip(q_tokens, q_tokens[1:]))
+    n_bi = max(1, m - 1)
+    width = min(m, len(doc_tokens))
+
+    win_uni: Counter = Counter()
+    win_bi: Counter = Counter()
+    hit_uni = 0
+    hit_bi = 0
+
+    def add(counter, q_counter, key, delta):
+        before = min(counter[key], q_counter[key])
+        counter[key] += delta
+        return min(counter[key], q_counter[key]) - before
+
+    best = (-1.0, 0)
+    for end in range(len(doc_tokens)):
+        tok = doc_tokens[end]
+        if tok in q_uni:
+            hit_uni += add(win_uni, q_uni, tok, 1)
+        if end > 0 and end - 1 >= end - width + 1:
+            bi = (doc_tokens[end - 1], tok)
+            if bi in q_bi:
+                hit_bi += add(win_bi, q_bi, bi, 1)
+
+        start = end - width + 1
+        if start > 0:
+            # window 밖으로 나간 토큰/ bigram 제거
+            old = doc_tokens[start - 1]
+            if old in q_uni:
+                hit_uni += add(win_uni, q_uni, old, -1)
+            old_bi = (old, doc_tokens[start])
+            if old_bi in q_bi:
+                hit_bi += add(win_bi, q_bi, old_bi, -1)
+
+        if start >= 0:
+            score = 0.5 * hit_uni / m + 0.5 * hit_bi / n_bi
+            if score > best[0]:
+                best = (score, start)
+
+    score, start = best
+    if score < 0:
+        return None
+    return score, token_sent[start], token_sent[start + width - 1]
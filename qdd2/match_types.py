@@ -0,0 +1,161 @@
+"""
+Compact result/candidate types for snippet matching.
+
+Inside the matcher a SpanMatch keeps a reference to the candidate's sentence-unit list (shared
+by every span of that document) plus window indices; span text is joined only when accessed.
+Results that leave the matcher are detached() so they hold only their own window's units and
+do not keep whole transcripts alive. Both types expose
+a read-only dict-style view (get / [] / keys / items / to_dict) so callers written against the
+old plain-dict results keep working.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+SentenceUnit = Tuple[str, int, int]  # (sentence, char_start, char_end)
+
+
+class _DictView(ABC):
+    """읽기 전용 dict 호환 인터페이스. 하위 클래스는 _KEYS와 _value(key)를 정의한다."""
+
+    __slots__ = ()
+    _KEYS: Tuple[str, ...] = ()
+
+    @abstractmethod
+    def _value(self, key: str):
+        """key에 해당하는 값."""
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._KEYS
+
+    def __getitem__(self, key: str):
+        if key not in self.keys():
+            raise KeyError(key)
+        return self._value(key)
+
+    def get(self, key: str, default=None):
+        return self._value(key) if key in self.keys() else default
+
+    def __contains__(self, key) -> bool:
+        return key in self.keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def items(self):
+        return [(k, self._value(k)) for k in self.keys()]
+
+    def values(self):
+        return [self._value(k) for k in self.keys()]
+
+    def to_dict(self) -> Dict:
+        return dict(self.items())
+
+
+@dataclass(slots=True, eq=False)
+class Candidate(_DictView):
+    """검색/transcript 후보 문서. snippet은 원문 문자열을 그대로 참조한다."""
+
+    url: str
+    snippet: str = field(repr=False)
+    segments: Optional[List[Dict]] = field(default=None, repr=False)
+
+    _KEYS = ("url", "snippet", "segments")
+
+    def _value(self, key: str):
+        return getattr(self, key)
+
+
+@dataclass(slots=True, eq=False)
+class SpanMatch(_DictView):
+    """
+    후보 문서 하나에서 찾은 span. units는 문서의 문장 단위 리스트(공유 참조)이고,
+    span_text/best_sentence/char offset은 units와 window 인덱스에서 필요할 때 만든다.
+    detached()한 span은 units에 자기 window만 들고 있고, unit_offset이 그 첫 문장의 문서 내 인덱스다
+    (span_start_idx 등 인덱스는 계속 문서 기준).
+
+    best_score는 match_type과 무관하게 항상 SBERT cosine이다. lexical fast path로 찾은 span은
+    fuzzy 매칭 점수를 lexical_score에 따로 둔다 (semantic span은 None).
+    alternatives: 같은 quote의 나머지 순위 후보 (자기 자신은 넣지 않는다).
+    dict view의 "top_k_candidates"는 예전 형식대로 [self] + alternatives를 돌려준다.
+    """
+
+    url: str
+    units: Sequence[SentenceUnit] = field(repr=False)
+    center_idx: int
+    span_start_idx: int
+    span_end_idx: int
+    best_score: float
+    match_type: str = "semantic"
+    lexical_score: Optional[float] = None
+    alternatives: Optional[Tuple["SpanMatch", ...]] = field(default=None, repr=False)
+    unit_offset: int = 0
+
+    _BASE_KEYS = (
+        "url",
+        "best_sentence",
+        "best_score",
+        "span_text",
+        "span_start_idx",
+        "span_end_idx",
+        "span_char_start",
+        "span_char_end",
+        "match_type",
+        "lexical_score",
+    )
+
+    @property
+    def best_sentence(self) -> str:
+        return self.units[self.center_idx - self.unit_offset][0]
+
+    @property
+    def span_text(self) -> str:
+        start = self.span_start_idx - self.unit_offset
+        return " ".join(u[0] for u in self.units[start : self.span_end_idx - self.unit_offset + 1])
+
+    @property
+    def span_char_start(self) -> int:
+        return self.units[self.span_start_idx - self.unit_offset][1]
+
+    @property
+    def span_char_end(self) -> int:
+        return self.units[self.span_end_idx - self.unit_offset][2]
+
+    def detached(self) -> "SpanMatch":
+        """
+        units를 이 span의 window(+ 중심 문장)만 남긴 사본으로 바꾼 SpanMatch (alternatives도 같이).
+        matcher 밖으로 나가는 결과에 쓴다: 공유 units를 참조하면 span 하나가 문서 전체를 붙잡아 둔다.
+        """
+        start = min(self.span_start_idx, self.center_idx)
+        end = max(self.span_end_idx, self.center_idx)
+        alternatives = self.alternatives
+        if alternatives is not None:
+            alternatives = tuple(alt.detached() for alt in alternatives)
+        return replace(
+            self,
+            units=tuple(self.units[start - self.unit_offset : end - self.unit_offset + 1]),
+            unit_offset=start,
+            alternatives=alternatives,
+        )
+
+    @property
+    def top_k_candidates(self) -> Optional[List["SpanMatch"]]:
+        if self.alternatives is None:
+            return None
+        return [self, *self.alternatives]
+
+    def keys(self) -> Tuple[str, ...]:
+        if self.alternatives is None:
+            return self._BASE_KEYS
+        return self._BASE_KEYS + ("top_k_candidates",)
+
+    def _value(self, key: str):
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict:
+        """평범한 dict로 변환 (top_k_candidates는 각 후보의 dict 리스트, 재귀 참조 없음)."""
+        out = {k: getattr(self, k) for k in self._BASE_KEYS}
+        if self.alternatives is not None:
+            out["top_k_candidates"] = [out] + [alt.to_dict() for alt in self.alternatives]
+        return out
@@ -4,7 +4,7 @@ Loading happens once per process to keep import time fast in downstream scripts.
 """
 
 from functools import lru_cache
-from typing import Tuple
+from typing import Optional, Tuple
 
 import torch
 from keybert import KeyBERT
@@ -51,7 +51,7 @@ def get_translation_models() -> Tuple[MarianTokenizer, MarianMTModel]:
     return tokenizer, model
 
 
-@lru_cache(maxsize=1)
-def get_sentence_model() -> SentenceTransformer:
-    """SentenceTransformer for semantic similarity."""
-    return SentenceTransformer(config.SENTENCE_MODEL_NAME)
+@lru_cache(maxsize=2)
+def get_sentence_model(name: Optional[str] = None) -> SentenceTransformer:
+    """SentenceTransformer for semantic similarity (default: config.SENTENCE_MODEL_NAME)."""
+    return SentenceTransformer(name or config.SENTENCE_MODEL_NAME)
@@ -36,22 +36,40 @@ def resolve_person_name_en(name_ko: str) -> str:
     except Exception:
         return name_ko
 
-def get_wikidata_english_name(korean_name: str, timeout: int = 10) -> Dict[str, Optional[str]]:
-    """
-    Look up a Korean name on Wikidata and return English label if found.
-    Returns {"ko": "...", "en": "...", "qid": "..."} or {"error": "..."}.
-    """
-    search_url = "https://www.wikidata.org/w/api.php"
-    params = {
+WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+
+
+def wikidata_search_params(korean_name: str) -> Dict[str, str]:
+    return {
         "action": "wbsearchentities",
         "search": korean_name,
         "language": "ko",
         "format": "json",
     }
+
+
+def wikidata_entity_url(qid: str) -> str:
+    return f"https://www.wikidata.org/wiki/Special:EntityData/{qid}.json"
+
+
+def wikidata_label_result(korean_name: str, qid: str, labels: Dict) -> Dict[str, Optional[str]]:
+    """EntityData labels → get_wikidata_english_name 반환 형식."""
+    if "en" in labels:
+        return {"ko": korean_name, "en": labels["en"]["value"], "qid": qid}
+    if "ko" in labels:
+        return {"ko": korean_name, "en": None, "qid": qid}
+    return {"error": "No labels found"}
+
+
+def get_wikidata_english_name(korean_name: str, timeout: int = 10) -> Dict[str, Optional[str]]:
+    """
+    Look up a Korean name on Wikidata and return English label if found.
+    Returns {"ko": "...", "en": "...", "qid": "..."} or {"error": "..."}.
+    """
     headers = {"User-Agent": config.HTTP_HEADERS["User-Agent"]}
 
     try:
-        resp = requests.get(search_url, params=params, headers=headers, timeout=timeout)
+        resp = requests.get(WIKIDATA_API, params=wikidata_search_params(korean_name), headers=headers, timeout=timeout)
         data = resp.json()
     except Exception:
         return {"error": "Failed to fetch search results"}
@@ -60,19 +78,14 @@ def get_wikidata_english_name(korean_name: str, timeout: int = 10) -> Dict[str,
         return {"error": "No matching Wikidata entry"}
 
     qid = data["search"][0]["id"]
-    detail_url = f"https://www.wikidata.org/wiki/Special:EntityData/{qid}.json"
 
     try:
-        detail = requests.get(detail_url, headers=headers, timeout=timeout).json()
+        detail = requests.get(wikidata_entity_url(qid), headers=headers, timeout=timeout).json()
         labels = detail["entities"][qid]["labels"]
     except Exception:
         return {"error": "Failed to fetch entity details"}
 
-    if "en" in labels:
-        return {"ko": korean_name, "en": labels["en"]["value"], "qid": qid}
-    if "ko" in labels:
-        return {"ko": korean_name, "en": None, "qid": qid}
-    return {"error": "No labels found"}
+    return wikidata_label_result(korean_name, qid, labels)
 
 
 def resolve_person_name_en(name_ko: str) -> str:
@@ -85,7 +98,11 @@ def resolve_person_name_en(name_ko: str) -> str:
     info = get_wikidata_english_name(name_ko)
     if isinstance(info, dict) and info.get("en"):
         return info["en"]
+    return translate_person_name(name_ko)
+
 
+def translate_person_name(name_ko: str) -> str:
+    """Wikidata에 영어 label이 없을 때의 fallback: 기계 번역, 실패하면 원래 이름."""
     try:
         return translate_ko_to_en(name_ko)
     except Exception:
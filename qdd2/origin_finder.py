@@ -3,7 +3,7 @@ from qdd2.pipeline import build_queries_from_text
 from qdd2.search_client import google_cse_search
 from qdd2.rollcall_search import get_search_results
 from qdd2.snippet_matcher import find_best_span_from_candidates_debug
-from qdd2.text_utils import split_sentences
+from qdd2.text_utils import as_document
 
 
 def normalize_search_results(res):
@@ -20,8 +20,7 @@ def extract_candidates_from_results(search_results):
     candidates = []
     for r in search_results:
         snippet = r.get("snippet") or ""
-        sents = split_sentences(snippet)
-        candidates.extend(sents)
+        candidates.extend(as_document(snippet).sentences())
     return candidates
 
 
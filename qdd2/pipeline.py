@@ -3,14 +3,77 @@ High-level helpers that compose extraction + query building.
 """
 
 import logging
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
+from qdd2 import config
 from qdd2.keywords import extract_keywords_with_ner
 from qdd2.query_builder import generate_search_query
+from qdd2.text_utils import as_document
+from qdd2.tfidf_keywords import extract_keywords_tfidf, get_df_table
 
 logger = logging.getLogger(__name__)
 
 
+def extract_for_queries(
+    text: str,
+    top_n_keywords: int = 15,
+    quote_sentence: Optional[str] = None,
+    device: int = 0,
+    debug: bool = False,
+    keyword_engine: Optional[str] = None,
+    headline: Optional[str] = None,
+    quote_span: Optional[Tuple[int, int]] = None,
+    context_sentences: Optional[int] = None,
+) -> Dict:
+    """
+    build_queries_from_text의 1단계: {"entities", "keywords", "entities_by_type"}.
+
+    Quote-local mode (context_sentences, 기본값 config.QUERY_CONTEXT_SENTENCES):
+      인용문 위치(quote_span, 없으면 원문에서 quote_sentence를 찾음) 주변 앞뒤 context_sentences개
+      문장 + headline만 추출에 쓰고, 거기서 PER가 나오지 않으면 기사 전체로 다시 추출한다.
+      인용 위치를 모르면 처음부터 기사 전체를 쓴다.
+    """
+    if context_sentences is None:
+        context_sentences = config.QUERY_CONTEXT_SENTENCES
+    if context_sentences is not None and context_sentences >= 0:
+        if quote_span is None and quote_sentence:
+            pos = text.find(quote_sentence)
+            if pos >= 0:
+                quote_span = (pos, pos + len(quote_sentence))
+        if quote_span is not None:
+            start, end = as_document(text).context_range(quote_span[0], quote_span[1], context_sentences)
+            context = text[start:end]
+            if headline:
+                context = f"{headline}\n{context}"
+            logger.info("Quote-local extraction: %d of %d chars (+ headline)", end - start, len(text))
+
+            base_keywords = None
+            if (keyword_engine or config.KEYWORD_ENGINE) == "tfidf":
+                # DF 테이블에는 문맥 조각이 아니라 기사 전체를 센다
+                if config.KEYWORD_DF_UPDATE:
+                    get_df_table().add(text)
+                base_keywords = extract_keywords_tfidf(context, top_n=top_n_keywords * 3, update=False)
+            extraction = extract_keywords_with_ner(
+                context,
+                top_n=top_n_keywords,
+                device=device,
+                debug=debug,
+                base_keywords=base_keywords,
+                engine=keyword_engine,
+            )
+            if extraction["entities_by_type"].get("PER"):
+                return extraction
+            logger.info("No PER entity near the quote; falling back to the full article")
+
+    return extract_keywords_with_ner(
+        text,
+        top_n=top_n_keywords,
+        device=device,
+        debug=debug,
+        engine=keyword_engine,
+    )
+
+
 def build_queries_from_text(
     text: str,
     top_n_keywords: int = 15,
@@ -20,18 +83,34 @@ def build_queries_from_text(
     rollcall_mode: bool = False,
     device: int = 0,
     debug: bool = False,
+    keyword_engine: Optional[str] = None,
+    headline: Optional[str] = None,
+    quote_span: Optional[Tuple[int, int]] = None,
+    context_sentences: Optional[int] = None,
+    extraction: Optional[Dict] = None,
+    speaker_en: Optional[str] = None,
 ) -> Dict:
     """
     Convenience wrapper:
-      1) extract keywords + entities
+      1) extract keywords + entities (extract_for_queries, quote-local mode 포함)
       2) build ko/en queries
+
+    extraction: 같은 입력으로 이미 구한 {"entities", "keywords", "entities_by_type"}. 주면 추출을 건너뛴다
+      (한 기사의 인용문 여러 개가 기사 전체 추출 결과를 공유할 때).
+    speaker_en: 이미 변환한 발화자 영어 이름 (generate_search_query 참고).
     """
-    extraction = extract_keywords_with_ner(
-        text,
-        top_n=top_n_keywords,
-        device=device,
-        debug=debug,
-    )
+    if extraction is None:
+        extraction = extract_for_queries(
+            text,
+            top_n_keywords=top_n_keywords,
+            quote_sentence=quote_sentence,
+            device=device,
+            debug=debug,
+            keyword_engine=keyword_engine,
+            headline=headline,
+            quote_span=quote_span,
+            context_sentences=context_sentences,
+        )
     logger.info(
         "Extraction complete: %d entities, %d keywords",
         len(extraction["entities"]),
@@ -46,12 +125,15 @@ def build_queries_from_text(
         quote_sentence=quote_sentence,
         article_date=article_date,
         rollcall_mode=rollcall_mode,
+        speaker_en=speaker_en,
     )
     logger.info("Query generation complete (ko/en)")
     logger.debug("KO query: %s", queries["ko"])
     logger.debug("EN query: %s", queries["en"])
 
     return {
-        **extraction,
+        "entities": extraction["entities"],
+        "keywords": extraction["keywords"],
+        "entities_by_type": extraction["entities_by_type"],
         "queries": queries,
     }
@@ -72,7 +72,8 @@ def generate_search_query(
     quote_sentence: Optional[str] = None,
     article_date: Optional[str] = None,  # YYYY-MM-DD
     rollcall_mode: bool = False,
-    use_wikidata: bool = True
+    use_wikidata: bool = True,
+    speaker_en: Optional[str] = None,
 ) -> Dict[str, Optional[str]]:
     """
     Build Korean/English search queries using entities + keywords.
@@ -85,6 +86,8 @@ def generate_search_query(
     default:
         → 기존 일반 모드 쿼리:
             speaker + location tokens + keyword tokens + optional quoted sentence
+
+    speaker_en: 이미 영어로 바꾼 발화자 이름 (비동기 경로에서 Wikidata를 따로 조회한 경우). 주면 이름 변환을 건너뛴다.
     """
     article_date_str, date_en = _format_date_en(article_date)
 
@@ -93,7 +96,9 @@ def generate_search_query(
         return {"ko": None, "en": None}
 
     speaker_ko = per_list[0]
-    if use_wikidata:
+    if speaker_en:
+        pass  # 호출자가 이미 변환함
+    elif use_wikidata:
         speaker_en = resolve_person_name_en(speaker_ko)
     else:
         try:
@@ -1,12 +1,18 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
 import requests
 from bs4 import BeautifulSoup
-from typing import List
+
+from qdd2 import config
 
 API_BASE = "https://rollcall.com/wp-json/factbase/v1/search"
 
 
-def get_search_results(query: str, top_k: int = 5) -> List[str]:
-    params = {
+def search_params(query: str) -> Dict:
+    """Factbase 검색 API 파라미터 (동기/비동기 클라이언트 공용)."""
+    return {
         "q": query,
         "media": "",
         "type": "",
@@ -17,18 +23,9 @@ def get_search_results(query: str, top_k: int = 5) -> List[str]:
         "format": "json",
     }
 
-    resp = requests.get(API_BASE, params=params, timeout=10)
-    print("[ROLLCALL] status:", resp.status_code, "url:", resp.url)
-
-    if resp.status_code != 200:
-        return []
-
-    try:
-        payload = resp.json()
-    except Exception:
-        print("[ROLLCALL] invalid json")
-        return []
 
+def links_from_payload(payload: Dict, top_k: int = 5) -> List[str]:
+    """검색 API 응답에서 트럼프 factbase 문서 링크를 중복 없이 top_k개까지."""
     data = payload.get("data", []) or []
     print("[ROLLCALL] data_len:", len(data))
 
@@ -60,35 +57,144 @@ def get_search_results(query: str, top_k: int = 5) -> List[str]:
     return links
 
 
-def fetch_transcript_text(url: str) -> str:
+def get_search_results(query: str, top_k: int = 5) -> List[str]:
+    resp = requests.get(API_BASE, params=search_params(query), timeout=10)
+    print("[ROLLCALL] status:", resp.status_code, "url:", resp.url)
+
+    if resp.status_code != 200:
+        return []
+
+    try:
+        payload = resp.json()
+    except Exception:
+        print("[ROLLCALL] invalid json")
+        return []
+
+    return links_from_payload(payload, top_k)
+
+
+_SPEAKER_PREFIX_RE = re.compile(r"^([A-Z][\w.'\- ]{1,48}?):\s+(.+)$", re.S)
+
+
+def _speaker_label(tag) -> Optional[str]:
+    """Return the speaker name if the tag is a Factbase speaker label element."""
+    classes = " ".join(tag.get("class") or []).lower()
+    if "speaker" not in classes or tag.find("p") is not None:
+        return None
+    label = tag.get_text(" ", strip=True)
+    return label or None
+
+
+def parse_transcript_html(html: str) -> Dict:
     """
-    Rollcall transcript 페이지에서 'Full Transcript' 이하 <p>들을 이어붙여 하나의 텍스트로 반환.
-    못 찾으면 페이지의 모든 <p>를 fallback으로 사용.
+    Factbase transcript HTML를 발화자 단위 turn 구조로 파싱.
+
+    반환:
+        {
+          "text": "...",   # 'Full Transcript' 이하 <p>들을 "\n"으로 이어붙인 전체 텍스트
+          "segments": [{"speaker": "Donald Trump", "text": "...", "start": 0, "end": 42}, ...],
+        }
+    start/end는 "text" 안의 문자 offset이므로 매칭 결과를 전체 텍스트로 되돌릴 수 있다.
+    발화자 정보가 없는 문단은 speaker=None으로 남긴다.
     """
-    print("[ROLLCALL] fetch_transcript_text:", url)
-    resp = requests.get(url, timeout=15)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+    soup = BeautifulSoup(html, "html.parser")
 
-    # "Full Transcript" 헤더 이후의 p 태그만 모으기
+    # "Full Transcript" 헤더 이후의 요소만 보기
     header = soup.find(lambda t: t.name in ("h2", "h3") and "Full Transcript" in t.get_text())
-    paragraphs = []
-
     if header:
+        elements = []
         for sib in header.find_all_next():
-            if sib.name in ("h2", "h3"):
+            if sib.name in ("h2", "h3") and _speaker_label(sib) is None:
                 break
-            if sib.name == "p":
-                txt = sib.get_text(" ", strip=True)
-                if txt:
-                    paragraphs.append(txt)
+            elements.append(sib)
     else:
         # fallback: 모든 p
-        for p in soup.find_all("p"):
-            txt = p.get_text(" ", strip=True)
-            if txt:
-                paragraphs.append(txt)
-
-    text = "\n".join(paragraphs)
-    print("[ROLLCALL] transcript chars:", len(text))
-    return text
+        elements = soup.find_all("p")
+
+    paragraphs: List[str] = []
+    segments: List[Dict] = []
+    speaker: Optional[str] = None
+    offset = 0
+
+    for el in elements:
+        label = _speaker_label(el)
+        if label is not None and el.name != "p":
+            speaker = label
+            continue
+        if el.name != "p":
+            continue
+
+        txt = el.get_text(" ", strip=True)
+        if not txt:
+            continue
+
+        # "Donald Trump: ..." 형태의 인라인 발화자 표기
+        utter_start = 0
+        m = _SPEAKER_PREFIX_RE.match(txt)
+        if m:
+            speaker = m.group(1).strip()
+            utter_start = m.start(2)
+
+        paragraphs.append(txt)
+        segments.append(
+            {
+                "speaker": speaker,
+                "text": txt[utter_start:],
+                "start": offset + utter_start,
+                "end": offset + len(txt),
+            }
+        )
+        offset += len(txt) + 1  # "\n" join
+
+    return {"text": "\n".join(paragraphs), "segments": segments}
+
+
+def fetch_transcript(url: str) -> Dict:
+    """Rollcall transcript 페이지를 받아 parse_transcript_html 결과를 반환."""
+    print("[ROLLCALL] fetch_transcript:", url)
+    resp = requests.get(url, timeout=15)
+    resp.raise_for_status()
+    parsed = parse_transcript_html(resp.text)
+    print("[ROLLCALL] transcript chars:", len(parsed["text"]), "segments:", len(parsed["segments"]))
+    return parsed
+
+
+def fetch_transcript_text(url: str) -> str:
+    """
+    Rollcall transcript 페이지에서 'Full Transcript' 이하 <p>들을 이어붙여 하나의 텍스트로 반환.
+    못 찾으면 페이지의 모든 <p>를 fallback으로 사용.
+    """
+    return fetch_transcript(url)["text"]
+
+
+_SPEAKER_NOISE_RE = re.compile(r"\(.*?\)|\[.*?\]|\b\d{1,2}:\d{2}(?::\d{2})?\b")
+
+
+def normalize_speaker_name(name: str) -> str:
+    """발화자 표기 정규화: 괄호/timestamp·마침표 제거, 소문자, 공백 정리 ("Donald J. Trump (01:02)" → "donald j trump")."""
+    name = _SPEAKER_NOISE_RE.sub(" ", name).replace(".", " ")
+    return " ".join(name.lower().split())
+
+
+@lru_cache(maxsize=16)
+def _speaker_aliases(target: str, aliases: Tuple[str, ...]) -> FrozenSet[str]:
+    return frozenset(normalize_speaker_name(a) for a in (target, *aliases))
+
+
+def is_target_speaker(speaker: Optional[str], target: str = config.TRANSCRIPT_TARGET_SPEAKER) -> bool:
+    """
+    발화자가 target인지: 정규화한 이름 전체를 config.TRANSCRIPT_SPEAKER_ALIASES[target]과 비교한다
+    ('Donald Trump', 'President Trump' 등은 맞고, 부분 문자열인 'Melania Trump', 'Donald Trump Jr.'는 아님).
+    """
+    if not speaker or not target:
+        return False
+    aliases = _speaker_aliases(target, tuple(config.TRANSCRIPT_SPEAKER_ALIASES.get(target, ())))
+    return normalize_speaker_name(speaker) in aliases
+
+
+def select_speaker_segments(
+    segments: List[Dict],
+    target: str = config.TRANSCRIPT_TARGET_SPEAKER,
+) -> List[Dict]:
+    """대상 발화자의 turn만 남긴다 (offset은 그대로 유지)."""
+    return [seg for seg in segments or [] if is_target_speaker(seg.get("speaker"), target)]
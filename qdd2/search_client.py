@@ -33,7 +33,15 @@ def is_valid_page(url: str, timeout: int = config.DEFAULT_TIMEOUT) -> bool:
         return False
 
 
-def google_cse_search(
+CSE_URL = "https://www.googleapis.com/customsearch/v1"
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class SearchUnavailable(RuntimeError):
+    """검색 API가 재시도 후에도 실패 (429/quota, 5xx, 네트워크). '결과 없음'과 구분해서 나중에 다시 시도한다."""
+
+
+def cse_params(
     q: str,
     num: int = 10,
     start: int = 1,
@@ -41,10 +49,8 @@ def google_cse_search(
     hl: str = "en",
     gl: str = "us",
     safe: Optional[str] = None,
-    retries: int = 3,
-    backoff: float = 1.4,
-    debug: bool = False,
-):
+) -> Dict:
+    """CSE 요청 파라미터 (동기/비동기 클라이언트 공용)."""
     # Prefer environment variables; if none, fall back to config literals (as currently stored).
     api_key = os.getenv(config.GOOGLE_API_KEY_ENV) or (
         config.GOOGLE_API_KEY_ENV if config.GOOGLE_API_KEY_ENV and len(config.GOOGLE_API_KEY_ENV) > 20 else None
@@ -67,28 +73,51 @@ def google_cse_search(
         params["lr"] = lr
     if safe in ("active", "off"):
         params["safe"] = safe
+    return params
+
 
-    url = "https://www.googleapis.com/customsearch/v1"
+def retry_delay(attempt: int, backoff: float) -> float:
+    return (backoff ** attempt) + random.uniform(0, 0.25)
+
+
+def google_cse_search(
+    q: str,
+    num: int = 10,
+    start: int = 1,
+    lr: Optional[str] = None,
+    hl: str = "en",
+    gl: str = "us",
+    safe: Optional[str] = None,
+    retries: int = 3,
+    backoff: float = 1.4,
+    debug: bool = False,
+):
+    """
+    CSE 검색. 재시도 후에도 실패하면 {"items": [], "error": 마지막 실패 사유}를 돌려준다
+    (빈 결과 {"items": []}와 구분; 파이프라인은 error가 있으면 SearchUnavailable을 낸다).
+    """
+    params = cse_params(q, num=num, start=start, lr=lr, hl=hl, gl=gl, safe=safe)
 
+    error = None
     for attempt in range(retries):
         try:
-            resp = SESSION.get(url, params=params, timeout=config.DEFAULT_TIMEOUT)
+            resp = SESSION.get(CSE_URL, params=params, timeout=config.DEFAULT_TIMEOUT)
             if debug:
                 print(f"[DEBUG] CSE attempt {attempt + 1}: {resp.status_code} -> {resp.url}")
 
             if resp.status_code == 200:
                 return resp.json()
-            if resp.status_code in (429, 500, 502, 503, 504):
-                sleep_s = (backoff ** attempt) + random.uniform(0, 0.25)
-                time.sleep(sleep_s)
+            error = f"CSE HTTP {resp.status_code}"
+            if resp.status_code in RETRY_STATUS:
+                time.sleep(retry_delay(attempt, backoff))
                 continue
             resp.raise_for_status()
-        except requests.RequestException:
-            sleep_s = (backoff ** attempt) + random.uniform(0, 0.25)
-            time.sleep(sleep_s)
+        except requests.RequestException as e:
+            error = f"CSE request failed: {e}"
+            time.sleep(retry_delay(attempt, backoff))
             continue
 
-    return {"items": []}
+    return {"items": [], "error": error}
 
 
 def collect_candidates_google_cse(
@@ -0,0 +1,241 @@
+"""
+Approximate nearest-neighbour index over source-document sentences (IVF-Flat, numpy only).
+
+Layout under the index directory:
+  vectors.f16   float16 sentence embeddings (append-only, memory-mapped for reads)
+  rows.tsv      "doc_id<TAB>sent_idx" per vector row (append-only)
+  docs.jsonl    {"url": ..., "sentences": [...], "offsets": [[start, end], ...]} per document
+  ivf.npz       coarse centroids + row→list assignment (rewritten by save())
+  meta.json     {"model_id": ..., "dim": ...}
+
+Until enough rows exist to train the coarse quantizer, search falls back to exact
+brute force. After training, new rows are assigned to their nearest centroid on insert.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from qdd2 import config
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def train_spherical_kmeans(x: np.ndarray, k: int, n_iter: int = 10, seed: int = 0) -> np.ndarray:
+    """코사인 유사도 기준 k-means (centroid도 정규화). x는 정규화된 float32 행렬."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        empty = np.bincount(assign, minlength=k) == 0
+        # 비어 있는 list는 임의의 점으로 다시 채운다
+        sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+class SentenceIndex:
+    """IVF-Flat 문장 인덱스. add_document로 점진 추가하고 search로 top-k 문장을 찾는다."""
+
+    def __init__(
+        self,
+        path: str,
+        model_id: str = config.SENTENCE_MODEL_NAME,
+        nlist: int = config.ANN_NLIST,
+        nprobe: int = config.ANN_NPROBE,
+    ):
+        self.path = path
+        self.model_id = model_id
+        self.nlist = nlist
+        self.nprobe = nprobe
+        os.makedirs(path, exist_ok=True)
+        self._vec_path = os.path.join(path, "vectors.f16")
+        self._rows_path = os.path.join(path, "rows.tsv")
+        self._docs_path = os.path.join(path, "docs.jsonl")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._lock = threading.Lock()
+
+        self.dim: Optional[int] = None
+        self.docs: List[Dict] = []
+        self._doc_by_url: Dict[str, int] = {}
+        self._row_doc: List[int] = []
+        self._row_sent: List[int] = []
+        self._mmap: Optional[np.memmap] = None
+        self.centroids: Optional[np.ndarray] = None
+        self._assign: List[int] = []
+        self._lists: Optional[Dict[int, np.ndarray]] = None
+        self._load()
+
+    # ------------------------------------------------------------------
+    # persistence
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim = meta["dim"]
+            if meta.get("model_id") != self.model_id:
+                raise ValueError(f"index at {self.path} was built with {meta.get('model_id')}, not {self.model_id}")
+
+        if os.path.exists(self._docs_path):
+            with open(self._docs_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        doc = json.loads(line)
+                        self._doc_by_url[doc["url"]] = len(self.docs)
+                        self.docs.append(doc)
+
+        if os.path.exists(self._rows_path) and self.dim:
+            n_vec = os.path.getsize(self._vec_path) // (2 * self.dim)
+            with open(self._rows_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) == 2 and len(self._row_doc) < n_vec and int(parts[0]) < len(self.docs):
+                        self._row_doc.append(int(parts[0]))
+                        self._row_sent.append(int(parts[1]))
+
+        if os.path.exists(self._ivf_path):
+            ivf = np.load(self._ivf_path)
+            self.centroids = ivf["centroids"]
+            self._assign = ivf["assign"].tolist()[: len(self._row_doc)]
+            if len(self._assign) < len(self._row_doc):
+                # save() 이후에 추가된 row는 다시 배정
+                missing = np.arange(len(self._assign), len(self._row_doc))
+                self._assign.extend(self._nearest_lists(self._vectors()[missing]).tolist())
+
+    def save(self) -> None:
+        """vector/row/doc 파일은 add 시점에 append되므로 여기서는 IVF 상태만 기록한다."""
+        with self._lock:
+            if self.centroids is not None:
+                np.savez(self._ivf_path, centroids=self.centroids, assign=np.asarray(self._assign, dtype=np.int32))
+
+    def __len__(self) -> int:
+        return len(self._row_doc)
+
+    def _vectors(self) -> np.ndarray:
+        n_rows = len(self._row_doc)
+        if self._mmap is None or self._mmap.shape[0] != n_rows:
+            self._mmap = np.memmap(self._vec_path, dtype=np.float16, mode="r", shape=(n_rows, self.dim))
+        return self._mmap
+
+    # ------------------------------------------------------------------
+    # insert
+    # ------------------------------------------------------------------
+    def has_document(self, url: str) -> bool:
+        return url in self._doc_by_url
+
+    def add_document(
+        self,
+        url: str,
+        sentences: Sequence[str],
+        embeddings: np.ndarray,
+        offsets: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> int:
+        """
+        문서 하나의 문장/임베딩을 추가하고 doc_id를 반환 (이미 있는 url이면 기존 doc_id).
+        offsets는 원문 기준 문장 (start, end)이며, 없으면 저장하지 않는다.
+        """
+        if url in self._doc_by_url:
+            return self._doc_by_url[url]
+        embeddings = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if len(sentences) != len(embeddings):
+            raise ValueError("sentences and embeddings must have the same length")
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(embeddings.shape[1])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model_id": self.model_id, "dim": self.dim}, f)
+
+            doc_id = len(self.docs)
+            doc = {"url": url, "sentences": list(sentences)}
+            if offsets is not None:
+                doc["offsets"] = [list(o) for o in offsets]
+            with open(self._docs_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            self.docs.append(doc)
+            self._doc_by_url[url] = doc_id
+
+            if len(sentences):
+                with open(self._vec_path, "ab") as f:
+                    f.write(embeddings.astype(np.float16).tobytes())
+                with open(self._rows_path, "a", encoding="utf-8") as f:
+                    for sent_idx in range(len(sentences)):
+                        f.write(f"{doc_id}\t{sent_idx}\n")
+                self._row_doc.extend([doc_id] * len(sentences))
+                self._row_sent.extend(range(len(sentences)))
+
+                if self.centroids is not None:
+                    self._assign.extend(self._nearest_lists(embeddings).tolist())
+                    self._lists = None
+                elif len(self._row_doc) >= self.nlist * config.ANN_TRAIN_POINTS_PER_LIST:
+                    self._train()
+        return doc_id
+
+    def _nearest_lists(self, x: np.ndarray) -> np.ndarray:
+        return np.argmax(np.asarray(x, dtype=np.float32) @ self.centroids.T, axis=1)
+
+    def _train(self) -> None:
+        vecs = np.asarray(self._vectors(), dtype=np.float32)
+        rng = np.random.default_rng(0)
+        sample_size = min(len(vecs), self.nlist * 64)
+        sample = vecs[rng.choice(len(vecs), size=sample_size, replace=False)]
+        self.centroids = train_spherical_kmeans(sample, self.nlist)
+        self._assign = self._nearest_lists(vecs).tolist()
+        self._lists = None
+
+    def _inverted_lists(self) -> Dict[int, np.ndarray]:
+        if self._lists is None:
+            assign = np.asarray(self._assign, dtype=np.int64)
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+            self._lists = {i: order[bounds[i] : bounds[i + 1]] for i in range(self.nlist)}
+        return self._lists
+
+    # ------------------------------------------------------------------
+    # search
+    # ------------------------------------------------------------------
+    def search(self, query: np.ndarray, top_k: int = 10) -> List[Tuple[int, int, float]]:
+        """query 임베딩과 가장 가까운 문장 top_k개를 (doc_id, sent_idx, score)로 반환."""
+        if not len(self):
+            return []
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        vecs = self._vectors()
+
+        with self._lock:
+            if self.centroids is None:
+                rows = np.arange(len(self))
+            else:
+                probe = np.argsort(-(self.centroids @ q))[: self.nprobe]
+                lists = self._inverted_lists()
+                rows = np.concatenate([lists[int(c)] for c in probe])
+        if not len(rows):
+            return []
+
+        scores = np.asarray(vecs[rows], dtype=np.float32) @ q
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._row_doc[rows[i]], self._row_sent[rows[i]], float(scores[i])) for i in top]
+
+
+_INDEXES: Dict[str, SentenceIndex] = {}
+
+
+def get_sentence_index(path: Optional[str] = None) -> Optional[SentenceIndex]:
+    """config.SENTENCE_INDEX_DIR(또는 path)의 인덱스를 프로세스당 한 번 연다. 설정이 없으면 None."""
+    path = path or config.SENTENCE_INDEX_DIR
+    if not path:
+        return None
+    if path not in _INDEXES:
+        _INDEXES[path] = SentenceIndex(path)
+    return _INDEXES[path]
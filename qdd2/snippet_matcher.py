@@ -2,32 +2,69 @@
 Snippet-level semantic matching helpers using SentenceTransformer.
 """
 
-import re
-from typing import Dict, List, Optional
+import heapq
+import itertools
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 import torch
 from sentence_transformers import util
 
+from qdd2 import config
+from qdd2.embedding_store import encode_with_store
+from qdd2.match_types import SpanMatch
+from qdd2.lexical import bm25_scores, fuzzy_match_span, tokenize_en, top_window_indices
 from qdd2.models import get_sentence_model
-from qdd2.text_utils import contains_korean, clean_text
+from qdd2.rollcall_search import select_speaker_segments
+from qdd2.sentence_index import SentenceIndex, get_sentence_index
+from qdd2.text_utils import as_document
 
-# We keep split_into_sentences here to allow custom length thresholds for snippets.
-def split_into_sentences(text: str, is_ko: Optional[bool] = None) -> List[str]:
+
+def split_into_sentences_with_offsets(
+    text,
+    is_ko: Optional[bool] = None,
+    base_offset: int = 0,
+) -> List[Tuple[str, int, int]]:
+    """
+    split_into_sentences와 같은 기준으로 문장을 나누되, (sentence, start, end) 문자 offset을 함께 반환.
+    offset은 원문 text 기준이며 base_offset만큼 평행이동된다. text는 str 또는 Document.
+    """
+    doc = as_document(text)
     if is_ko is None:
-        is_ko = contains_korean(text)
+        is_ko = doc.is_ko
+    units = doc.sentence_units(min_len=_min_sentence_len(is_ko))
+    if base_offset:
+        units = [(s, start + base_offset, end + base_offset) for s, start, end in units]
+    return units
+
+
+def _min_sentence_len(is_ko: bool) -> int:
+    return 10 if is_ko else 20
+
+
+# We keep split_into_sentences here to allow custom length thresholds for snippets.
+def split_into_sentences(text, is_ko: Optional[bool] = None) -> List[str]:
+    return [s for s, _, _ in split_into_sentences_with_offsets(text, is_ko=is_ko)]
 
-    rough = re.split(r"(?<=[.!?])\s+", text or "")
-    sentences = []
-    for s in rough:
-        s = clean_text(s)
-        if not s:
-            continue
-        if is_ko and len(s) < 10:
-            continue
-        if not is_ko and len(s) < 20:
-            continue
-        sentences.append(s)
-    return sentences
+
+def collect_candidate_sentences(
+    snippet_text,
+    segments: Optional[List[Dict]] = None,
+    speaker: Optional[str] = config.TRANSCRIPT_TARGET_SPEAKER,
+) -> List[Tuple[str, int, int]]:
+    """
+    후보 텍스트(str 또는 Document)에서 매칭 대상 문장을 (sentence, start, end)로 모은다.
+
+    segments(rollcall_search.parse_transcript_html 결과)가 있으면 speaker의 발화만 문장 분리하고,
+    offset은 snippet_text 기준으로 유지한다. 대상 발화자의 turn이 없으면 전체 텍스트로 fallback.
+    문장 경계는 Document에 캐시되므로 같은 transcript를 여러 quote가 매칭해도 다시 분리하지 않는다.
+    """
+    doc = as_document(snippet_text)
+    min_len = _min_sentence_len(False)
+    if segments and speaker:
+        target = select_speaker_segments(segments, speaker)
+        if target:
+            return doc.sentence_units(min_len=min_len, ranges=[(seg["start"], seg["end"]) for seg in target])
+    return doc.sentence_units(min_len=min_len)
 
 
 def extract_span(sentences: List[str], center_idx: int, num_before: int = 1, num_after: int = 1, join_with: str = " "):
@@ -43,183 +80,923 @@ def extract_span(sentences: List[str], center_idx: int, num_before: int = 1, num
     return span, start_idx, end_idx
 
 
-def find_best_match_span_in_snippet(
-    quote_text: str,
-    snippet_text: str,
+def build_quote_span_text(quote_text: str, num_before: int = 1, num_after: int = 1) -> str:
+    """
+    인용문도 중심 문장 ± num_before/num_after 문장으로 span을 만든다.
+    보통 영어(quote_en)지만 cross-lingual 모드에서는 한국어 원문이 그대로 들어오므로 언어는 자동 판별한다.
+    """
+    quote_sentences = split_into_sentences(quote_text, is_ko=None)
+    if not quote_sentences:
+        # 문장 분리가 안 되면 전체를 하나의 span으로 사용
+        return quote_text
+
+    center_idx_q = len(quote_sentences) // 2
+    quote_span_text, _, _ = extract_span(
+        quote_sentences,
+        center_idx_q,
+        num_before=num_before,
+        num_after=num_after,
+        join_with=" ",
+    )
+    return quote_span_text
+
+
+def window_bounds(n_sentences: int, num_before: int = 1, num_after: int = 1) -> List[Tuple[int, int, int]]:
+    """모든 중심 문장에 대해 (center_idx, start_idx, end_idx) window 경계를 만든다 (텍스트는 필요할 때 만든다)."""
+    return [
+        (center_idx, max(0, center_idx - num_before), min(n_sentences - 1, center_idx + num_after))
+        for center_idx in range(n_sentences)
+    ]
+
+
+def window_text(sentence_units: List[Tuple[str, int, int]], bound: Tuple[int, int, int]) -> str:
+    _, s_idx, e_idx = bound
+    return " ".join(u[0] for u in sentence_units[s_idx : e_idx + 1])
+
+
+def split_long_units(
+    sentence_units: List[Tuple[str, int, int]],
+    max_tokens: int,
+    tokenizer=None,
+) -> List[Tuple[str, int, int]]:
+    """
+    구두점 없는 transcript 등에서 생긴 거대한 '문장'을 토큰 예산(max_tokens) 단위로 잘라
+    인코더가 조용히 truncate하지 않게 한다. 잘린 조각도 원문 offset을 유지한다.
+    문자 수가 max_tokens 이하인 문장은 토큰 수도 넘을 수 없으므로 토크나이저를 부르지 않는다.
+    """
+    out: List[Tuple[str, int, int]] = []
+    for sentence, start, end in sentence_units:
+        if len(sentence) <= max_tokens:
+            out.append((sentence, start, end))
+            continue
+        if tokenizer is None:
+            tokenizer = get_sentence_model().tokenizer
+        enc = tokenizer(sentence, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = enc["offset_mapping"]
+        if len(offsets) <= max_tokens:
+            out.append((sentence, start, end))
+            continue
+        # sentence는 clean_text 결과라 원문과 공백만 다를 수 있다 → 조각 offset은 조각 비율로 원문에 대응
+        scale = (end - start) / max(1, len(sentence))
+        for i in range(0, len(offsets), max_tokens):
+            piece_start = offsets[i][0]
+            piece_end = offsets[min(i + max_tokens, len(offsets)) - 1][1]
+            piece = sentence[piece_start:piece_end].strip()
+            if piece:
+                out.append((piece, start + int(piece_start * scale), start + int(piece_end * scale)))
+    return out
+
+
+def window_embeddings_from_sentences(
+    sentence_embs: torch.Tensor,
+    bounds: List[Tuple[int, int, int]],
+) -> torch.Tensor:
+    """
+    문장 임베딩을 누적합(cumsum)으로 mean-pooling해서 window 임베딩을 만든다.
+    window 크기와 무관하게 window당 O(1)이며, 결과는 L2 정규화된다.
+    bounds의 start/end는 sentence_embs의 행 번호 기준이다.
+    """
+    zero = torch.zeros((1, sentence_embs.shape[1]), dtype=sentence_embs.dtype, device=sentence_embs.device)
+    csum = torch.cat([zero, torch.cumsum(sentence_embs, dim=0)], dim=0)
+    starts = torch.as_tensor([b[1] for b in bounds], device=sentence_embs.device)
+    ends = torch.as_tensor([b[2] for b in bounds], device=sentence_embs.device) + 1
+    pooled = (csum[ends] - csum[starts]) / (ends - starts).unsqueeze(1).to(sentence_embs.dtype)
+    return torch.nn.functional.normalize(pooled, dim=1)
+
+
+def matcher_model_name(cross_lingual: Optional[bool] = None) -> str:
+    """span 매칭에 쓸 인코더 이름. cross_lingual이 None이면 config.MATCH_CROSS_LINGUAL을 따른다."""
+    if cross_lingual is None:
+        cross_lingual = config.MATCH_CROSS_LINGUAL
+    return config.MULTILINGUAL_SENTENCE_MODEL_NAME if cross_lingual else config.SENTENCE_MODEL_NAME
+
+
+def _encode_unique(sim_model, texts: List[str], model_id: str = config.SENTENCE_MODEL_NAME) -> torch.Tensor:
+    """정규화된 임베딩을 반환. config.EMBEDDING_STORE_DIR이 설정되어 있으면 model_id별 영구 store를 거친다."""
+    embs = encode_with_store(
+        lambda batch: sim_model.encode(batch, convert_to_numpy=True, normalize_embeddings=True),
+        texts,
+        model_id=model_id,
+    )
+    return torch.from_numpy(embs).to(sim_model.device)
+
+
+def _score_chunk(
+    sim_model,
+    quote_embs: torch.Tensor,
+    per_cand: List[Dict],
+    chunk,
+    mode: str,
+    model_id: str = config.SENTENCE_MODEL_NAME,
+    sentence_cache: Optional[Dict[str, torch.Tensor]] = None,
+) -> List[List[float]]:
+    """
+    chunk = [(cand_pos, bound), ...]의 quote별 유사도 행렬 (len(quotes) x len(chunk)).
+    exact는 window 텍스트를, pooled는 chunk에 필요한 문장만 인코딩한다 (둘 다 chunk 안에서 중복 제거).
+    sentence_cache(문장 -> 임베딩)가 주어지면 pooled 모드는 캐시에 없는 문장만 인코딩하고 캐시에 채운다.
+    """
+    if mode == "exact":
+        texts = [window_text(per_cand[pos]["units"], bound) for pos, bound in chunk]
+        rows: Dict[str, int] = {}
+        idx = [rows.setdefault(t, len(rows)) for t in texts]
+        embs = _encode_unique(sim_model, list(rows), model_id=model_id)
+        # 같은 텍스트의 window는 같은 열을 복사해서 점수가 bit 단위로 같다 (동점은 후보 순서로 갈린다)
+        return _quote_similarities(quote_embs, embs)[:, torch.as_tensor(idx, device=embs.device)].tolist()
+
+    # pooled: 후보별로 chunk에 쓰이는 문장만 압축 순서로 모은 뒤 cumsum pooling
+    groups: Dict[int, List[int]] = {}
+    for i, (pos, _) in enumerate(chunk):
+        groups.setdefault(pos, []).append(i)
+
+    rows = {}
+    plans = []
+    for pos, members in groups.items():
+        units = per_cand[pos]["units"]
+        needed = sorted({s for i in members for s in range(chunk[i][1][1], chunk[i][1][2] + 1)})
+        compact = {s: k for k, s in enumerate(needed)}
+        sent_rows = [rows.setdefault(units[s][0], len(rows)) for s in needed]
+        shifted = [(0, compact[chunk[i][1][1]], compact[chunk[i][1][2]]) for i in members]
+        plans.append((members, sent_rows, shifted))
+
+    if sentence_cache is None:
+        embs = _encode_unique(sim_model, list(rows), model_id=model_id)
+    else:
+        missing = [t for t in rows if t not in sentence_cache]
+        if missing:
+            sentence_cache.update(zip(missing, _encode_unique(sim_model, missing, model_id=model_id)))
+        embs = torch.stack([sentence_cache[t] for t in rows])
+    window_embs = torch.empty((len(chunk), embs.shape[1]), dtype=embs.dtype, device=embs.device)
+    for members, sent_rows, shifted in plans:
+        sent_embs = embs[torch.as_tensor(sent_rows, device=embs.device)]
+        window_embs[torch.as_tensor(members, device=embs.device)] = window_embeddings_from_sentences(sent_embs, shifted)
+    return _quote_similarities(quote_embs, window_embs).tolist()
+
+
+def _score_chunk_isolated(
+    sim_model,
+    quote_embs: torch.Tensor,
+    per_cand: List[Dict],
+    chunk,
+    mode: str,
+    failed: Set[int],
+    model_id: str = config.SENTENCE_MODEL_NAME,
+    sentence_cache: Optional[Dict[str, torch.Tensor]] = None,
+) -> List[List[Optional[float]]]:
+    """
+    _score_chunk와 같지만 인코딩 오류를 후보 단위로 가둔다. chunk 전체가 실패하면 후보별로 나눠 다시
+    점수화하고, 그래도 실패한 후보(cand_pos)는 failed에 넣고 그 window 점수는 None으로 둔다.
+    이미 failed인 후보의 window는 다시 인코딩하지 않는다.
+    """
+    if not any(pos in failed for pos, _ in chunk):
+        try:
+            return _score_chunk(
+                sim_model, quote_embs, per_cand, chunk, mode, model_id=model_id, sentence_cache=sentence_cache
+            )
+        except Exception as e:
+            print(f"[WARN] SBERT similarity error ({len(chunk)} windows), retrying per candidate: {e}")
+
+    sims: List[List[Optional[float]]] = [[None] * len(chunk) for _ in range(len(quote_embs))]
+    members_by_pos: Dict[int, List[int]] = {}
+    for i, (pos, _) in enumerate(chunk):
+        members_by_pos.setdefault(pos, []).append(i)
+    for pos, members in members_by_pos.items():
+        if pos in failed:
+            continue
+        try:
+            part = _score_chunk(
+                sim_model,
+                quote_embs,
+                per_cand,
+                [chunk[i] for i in members],
+                mode,
+                model_id=model_id,
+                sentence_cache=sentence_cache,
+            )
+        except Exception as e:
+            print(f"[WARN] SBERT similarity error (url={per_cand[pos]['url']}): {e}")
+            failed.add(pos)
+            continue
+        for row, part_row in zip(sims, part):
+            for i, score in zip(members, part_row):
+                row[i] = score
+    return sims
+
+
+def _quote_similarities(quote_embs: torch.Tensor, embs: torch.Tensor) -> torch.Tensor:
+    """
+    quote별 cosine 유사도 행렬 (len(quotes) x len(embs)). (quote, window) 점수를 행별 내적으로 따로 계산해서,
+    함께 매칭하는 quote나 같은 chunk에 든 다른 window와 무관하게 bit 단위로 같게 한다
+    (matmul은 행렬 모양에 따라 BLAS kernel이 달라져 마지막 자리가 바뀌고, 근소한 동점의 순위가 뒤집힌다).
+    """
+    quote_embs = torch.nn.functional.normalize(quote_embs, dim=1)
+    embs = torch.nn.functional.normalize(embs, dim=1)
+    return torch.stack([(embs * q).sum(dim=1) for q in quote_embs])
+
+
+def _span_result(
     url: str,
+    sentence_units: List[Tuple[str, int, int]],
+    bound: Tuple[int, int, int],
+    score: float,
+    match_type: str = "semantic",
+    lexical_score: Optional[float] = None,
+) -> SpanMatch:
+    # span_text / best_sentence / char offset은 sentence_units(문서 단위 공유)에서 필요할 때 만든다
+    center_idx, s_idx, e_idx = bound
+    return SpanMatch(
+        url=url,
+        units=sentence_units,
+        center_idx=center_idx,
+        span_start_idx=s_idx,
+        span_end_idx=e_idx,
+        best_score=score,
+        match_type=match_type,  # "semantic"(SBERT) 또는 "lexical"(fast path)
+        lexical_score=lexical_score,
+    )
+
+
+def _rescore_lexical(
+    sim_model,
+    model_id: str,
+    quote_embs: torch.Tensor,
+    hits: List[Tuple[int, List[Tuple[str, int, int]], Tuple[int, int, int]]],
+) -> List[float]:
+    """
+    lexical fast path로 고른 window [(quote_idx, sentence_units, bound), ...]의 SBERT cosine.
+    window 찾기(전체 window 인코딩)만 건너뛰고, 점수는 semantic span과 같은 척도로 맞춘다.
+    """
+    rows: Dict[str, int] = {}
+    idx = [rows.setdefault(window_text(units, bound), len(rows)) for _, units, bound in hits]
+    sims = _quote_similarities(quote_embs, _encode_unique(sim_model, list(rows), model_id=model_id))
+    return [sims[q_idx, col].item() for (q_idx, _, _), col in zip(hits, idx)]
+
+
+def lexical_fast_match(
+    quote_en: str,
+    sentence_units: List[Tuple[str, int, int]],
     num_before: int = 1,
     num_after: int = 1,
-) -> Optional[Dict]:
+    threshold: Optional[float] = config.LEXICAL_MATCH_THRESHOLD,
+) -> Optional[Tuple[Tuple[int, int, int], float]]:
     """
-    Use semantic similarity to find the best matching SPAN (문맥 포함 구간) within a snippet.
-
-    변경 사항:
-      - 인용문도 앞뒤 num_before/num_after 문장을 포함한 span으로 만든다.
-      - snippet 쪽도 중심 문장 ± num_before/after span으로 만들고,
-        quote_span vs snippet_span (SPAN-SPAN) 유사도를 비교한다.
+    quote가 거의 그대로 들어 있는 구간이면 (bound, score)를 돌려준다 (인코더 생략용).
+    window는 매칭 구간의 중심 문장 ± num_before/num_after이며, 매칭 구간 전체를 포함하도록 넓힌다.
     """
-    if not snippet_text:
+    if threshold is None:
         return None
-
-    # -----------------------------
-    # 1) 인용문(quote_text) 쪽 span 만들기
-    # -----------------------------
-    # quote_text는 이미 영어(quote_en)라 가정 → is_ko=False
-    quote_sentences = split_into_sentences(quote_text, is_ko=False)
-
-    if quote_sentences:
-        # 인용문 문장들 가운데 중심 문장 기준 span 생성
-        center_idx_q = len(quote_sentences) // 2
-        quote_span_text, _, _ = extract_span(
-            quote_sentences,
-            center_idx_q,
-            num_before=num_before,
-            num_after=num_after,
-            join_with=" ",
-        )
-    else:
-        # 문장 분리가 안 되면 전체를 하나의 span으로 사용
-        quote_span_text = quote_text
-
-    # -----------------------------
-    # 2) snippet 쪽 span 후보들 만들기
-    # -----------------------------
-    sentences = split_into_sentences(snippet_text, is_ko=False)
-    if not sentences:
+    match = fuzzy_match_span(quote_en, [u[0] for u in sentence_units])
+    if not match or match[0] < threshold:
         return None
+    return _lexical_bound(match, len(sentence_units), num_before, num_after), match[0]
 
-    sim_model = get_sentence_model()
-    try:
-        with torch.no_grad():
-            # 3) quote span 임베딩
-            quote_emb = sim_model.encode(
-                [quote_span_text],
-                convert_to_tensor=True,
-                normalize_embeddings=True,
-            )[0]
-
-            # 4) snippet 내 모든 candidate span 생성
-            span_texts: List[str] = []
-            span_meta: List[Dict] = []  # center_idx, start_idx, end_idx 저장
-
-            n = len(sentences)
-            for center_idx in range(n):
-                span_text, s_idx, e_idx = extract_span(
-                    sentences,
-                    center_idx,
-                    num_before=num_before,
-                    num_after=num_after,
-                    join_with=" ",
-                )
-                span_texts.append(span_text)
-                span_meta.append(
-                    {
-                        "center_idx": center_idx,
-                        "span_start_idx": s_idx,
-                        "span_end_idx": e_idx,
-                    }
-                )
 
-            # 5) 각 snippet span 임베딩
-            span_embs = sim_model.encode(
-                span_texts,
-                convert_to_tensor=True,
-                normalize_embeddings=True,
-            )
+def _lexical_bound(match: Tuple[float, int, int], n_sentences: int, num_before: int, num_after: int) -> Tuple[int, int, int]:
+    """fuzzy 매칭 구간 (score, start, end)을 중심 문장 ± num_before/num_after window 경계로 바꾼다."""
+    _, m_start, m_end = match
+    center_idx = (m_start + m_end) // 2
+    s_idx = max(0, center_idx - num_before)
+    e_idx = min(n_sentences - 1, center_idx + num_after)
+    return center_idx, min(s_idx, m_start), max(e_idx, m_end)
 
-            # 6) quote_span vs snippet_span 유사도 (SPAN-SPAN)
-            sims = util.cos_sim(quote_emb, span_embs)[0]
-            best_idx = int(torch.argmax(sims).item())
-            best_score = float(sims[best_idx].item())
 
-    except Exception as e:
-        print(f"[WARN] SBERT similarity error (span-span mode): {e}")
-        return None
+def _window_iou(a: Tuple[int, int, int], b: Tuple[int, int, int]) -> float:
+    """두 window의 문장 구간 [start, end] IoU."""
+    inter = min(a[2], b[2]) - max(a[1], b[1]) + 1
+    if inter <= 0:
+        return 0.0
+    union = (a[2] - a[1] + 1) + (b[2] - b[1] + 1) - inter
+    return inter / union
 
-    # -----------------------------
-    # 7) 베스트 span 정보 정리
-    # -----------------------------
-    best_span_text = span_texts[best_idx]
-    meta = span_meta[best_idx]
-    center_idx = meta["center_idx"]
-    s_idx = meta["span_start_idx"]
-    e_idx = meta["span_end_idx"]
 
-    best_sentence = sentences[center_idx]  # 인터페이스 유지용
+def nms_windows(scored: Sequence[Tuple], k: int, max_iou: float = config.MATCH_NMS_IOU) -> List[Tuple]:
+    """
+    (score, tie, bound) 목록에서 점수순으로 최대 k개를 고르되,
+    이미 고른 window와 IoU가 max_iou를 넘는 window는 버린다 (non-maximum suppression).
+    """
+    kept: List[Tuple] = []
+    for item in sorted(scored, reverse=True):
+        if all(_window_iou(item[2], other[2]) <= max_iou for other in kept):
+            kept.append(item)
+            if len(kept) >= k:
+                break
+    return kept
 
-    return {
-        "url": url,
-        "best_sentence": best_sentence,   # 중심 문장
-        "best_score": best_score,         # quote_span vs span_text 유사도
-        "span_text": best_span_text,      # 실제 비교에 쓰인 span
-        "span_start_idx": s_idx,
-        "span_end_idx": e_idx,
-    }
 
+def find_best_spans_batched(
+    quote_en: str,
+    candidates: List[Dict],
+    num_before: int = 1,
+    num_after: int = 1,
+    speaker: Optional[str] = config.TRANSCRIPT_TARGET_SPEAKER,
+    mode: str = config.MATCH_MODE,
+    rerank_top_n: int = config.MATCH_RERANK_TOP_N,
+    prefilter_top_n: Optional[int] = config.MATCH_PREFILTER_TOP_N,
+    keywords: Optional[Sequence[str]] = None,
+    lexical_threshold: Optional[float] = config.LEXICAL_MATCH_THRESHOLD,
+    chunk_windows: int = config.MATCH_CHUNK_WINDOWS,
+    cross_lingual: Optional[bool] = None,
+) -> List[Optional[SpanMatch]]:
+    """후보별 best span(dict 또는 None)을 candidates 순서로 반환. find_top_spans_batched(per_doc_k=1)의 wrapper."""
+    per_doc = find_top_spans_batched(
+        quote_en,
+        candidates,
+        num_before=num_before,
+        num_after=num_after,
+        speaker=speaker,
+        mode=mode,
+        rerank_top_n=rerank_top_n,
+        prefilter_top_n=prefilter_top_n,
+        keywords=keywords,
+        lexical_threshold=lexical_threshold,
+        chunk_windows=chunk_windows,
+        per_doc_k=1,
+        cross_lingual=cross_lingual,
+    )
+    return [spans[0] if spans else None for spans in per_doc]
 
 
-def find_best_span_from_candidates_debug(
+def find_top_spans_batched(
     quote_en: str,
     candidates: List[Dict],
     num_before: int = 1,
     num_after: int = 1,
-    min_score: float = 0.0,   # ★ threshold 거의 없애기
-) -> Optional[Dict]:
+    speaker: Optional[str] = config.TRANSCRIPT_TARGET_SPEAKER,
+    mode: str = config.MATCH_MODE,
+    rerank_top_n: int = config.MATCH_RERANK_TOP_N,
+    prefilter_top_n: Optional[int] = config.MATCH_PREFILTER_TOP_N,
+    keywords: Optional[Sequence[str]] = None,
+    lexical_threshold: Optional[float] = config.LEXICAL_MATCH_THRESHOLD,
+    chunk_windows: int = config.MATCH_CHUNK_WINDOWS,
+    per_doc_k: int = config.MATCH_PER_DOC_TOP_K,
+    nms_iou: float = config.MATCH_NMS_IOU,
+    cross_lingual: Optional[bool] = None,
+) -> List[List[SpanMatch]]:
     """
-    Iterate through candidate snippets, collect ALL span candidates,
-    and return:
-      - best_global: 최고 점수 span (dict)
-      - best_global["top_k_candidates"]: 점수 내림차순으로 정렬된 전체 후보 리스트
-
-    주의:
-      - min_score는 이제 "완전 쓰레기만 버리는 용도" 정도로만 사용하고,
-        top_k_candidates에는 min_score와 상관없이 모든 후보를 넣는다.
+    후보별 상위 span 리스트(점수 내림차순)를 candidates 순서로 반환.
+    같은 문서에서 발화가 반복되면 겹치지 않는 window 최대 per_doc_k개가 나온다 (nms_iou로 NMS).
+    quote 하나짜리 match_quotes_batched이며, 인자 설명은 그쪽 docstring 참고.
+    """
+    return match_quotes_batched(
+        [quote_en],
+        candidates,
+        num_before=num_before,
+        num_after=num_after,
+        speaker=speaker,
+        mode=mode,
+        rerank_top_n=rerank_top_n,
+        prefilter_top_n=prefilter_top_n,
+        keywords=keywords,
+        lexical_threshold=lexical_threshold,
+        chunk_windows=chunk_windows,
+        per_doc_k=per_doc_k,
+        nms_iou=nms_iou,
+        cross_lingual=cross_lingual,
+    )[0]
+
+
+def match_quotes_batched(
+    quotes_en: Sequence[str],
+    candidates: List[Dict],
+    num_before: int = 1,
+    num_after: int = 1,
+    speaker: Optional[str] = config.TRANSCRIPT_TARGET_SPEAKER,
+    mode: str = config.MATCH_MODE,
+    rerank_top_n: int = config.MATCH_RERANK_TOP_N,
+    prefilter_top_n: Optional[int] = config.MATCH_PREFILTER_TOP_N,
+    keywords: Optional[Sequence[str]] = None,
+    lexical_threshold: Optional[float] = config.LEXICAL_MATCH_THRESHOLD,
+    chunk_windows: int = config.MATCH_CHUNK_WINDOWS,
+    per_doc_k: int = config.MATCH_PER_DOC_TOP_K,
+    nms_iou: float = config.MATCH_NMS_IOU,
+    cross_lingual: Optional[bool] = None,
+    quote_candidates: Optional[Sequence[Iterable[int]]] = None,
+    quote_keywords: Optional[Sequence[Optional[Sequence[str]]]] = None,
+) -> List[List[List[SpanMatch]]]:
+    """
+    여러 quote(예: 한 기사의 인용문 전체)를 공유 후보 풀에 한 번에 매칭한다 (many-to-many).
+    반환: results[quote_idx][cand_idx] = 상위 span 리스트 (점수 내림차순, 최대 per_doc_k개).
+
+      - 후보 문서의 문장 분리/window 구성/인코딩은 quote 수와 무관하게 한 번만 한다.
+      - quote span은 한 번에 인코딩하고, window chunk마다 quotes x windows 유사도 행렬 하나를 계산한다.
+      - 모든 후보의 span window를 하나의 stream으로 이어서 chunk_windows개씩 인코딩한다
+        (chunk 안에서 중복 텍스트 제거, SentenceTransformer.encode가 내부에서 길이순 batch 구성).
+        window 텍스트/임베딩은 chunk 단위로만 메모리에 있고, (quote, 후보)별로 running top-k만 남긴다.
+      - 토큰 예산을 넘는 거대한 문장은 split_long_units로 잘라서 truncate를 막는다.
+
+    mode:
+      - "exact"  : window 텍스트를 그대로 인코딩 (기존 방식)
+      - "pooled" : 문장을 한 번씩만 인코딩하고 window 임베딩은 문장 임베딩 mean-pooling으로 만든다.
+                   rerank_top_n > 0이면 (quote, 후보)별 상위 N개 window만 exact 인코딩으로 다시 점수화한다.
+
+    prefilter_top_n: window가 이보다 많은 후보는 quote + keywords에 대한 BM25(문장 점수의 window 합)로
+                     quote마다 상위 N개 window를 고르고, 그 합집합만 SBERT로 넘긴다. None이면 끈다.
+    lexical_threshold: 토큰 단위 fuzzy 매칭 점수가 이 값 이상인 (quote, 후보)는 window 검색 없이 매칭 구간
+                       span 1개를 반환한다 (match_type="lexical", lexical_score=fuzzy 점수, best_score는 그 span의
+                       SBERT cosine). None이면 끈다.
+    cross_lingual: True면 번역하지 않은 한국어 quote를 다국어 인코더(MULTILINGUAL_SENTENCE_MODEL_NAME)로
+                   영어 span과 직접 비교한다. None이면 config.MATCH_CROSS_LINGUAL.
+                   (한국어 quote에는 영어 lexical/BM25 토큰이 없으므로 prefilter는 keywords에 의존한다)
+    quote_candidates: quote별로 매칭할 candidates index 목록 (예: 여러 인용문이 각자 검색한 후보를 한 풀로
+                      모은 경우). 목록에 없는 (quote, 후보)는 빈 리스트로 남는다. None이면 모든 후보.
+    quote_keywords: quote별 prefilter keywords (주면 keywords 대신 쓴다).
     """
+    if mode not in ("exact", "pooled"):
+        raise ValueError(f"unknown match mode: {mode}")
+
+    quotes_en = list(quotes_en)
+    results: List[List[List[SpanMatch]]] = [[[] for _ in candidates] for _ in quotes_en]
+    if not quotes_en:
+        return results
+    allowed = None if quote_candidates is None else [set(idxs) for idxs in quote_candidates]
+    if quote_keywords is None:
+        quote_keywords = [keywords] * len(quotes_en)
+
+    # 1) 후보별 문장 수집 (quote와 무관하게 한 번), lexical fast path는 (quote, 후보)마다
+    per_cand: List[Dict] = []
+    lexical_hits: List[Tuple[int, Dict, Tuple[Tuple[int, int, int], float]]] = []
+    for entry in _candidate_units(candidates, speaker, wanted=None if allowed is None else set().union(*allowed)):
+        pending = []
+        for q_idx, quote_en in enumerate(quotes_en):
+            if allowed is not None and entry["idx"] not in allowed[q_idx]:
+                continue
+            lexical = lexical_fast_match(quote_en, entry["units"], num_before, num_after, threshold=lexical_threshold)
+            if lexical:
+                # units는 split_long_units 전의 문장 리스트 (bound가 이 인덱스 기준)
+                lexical_hits.append((q_idx, {"idx": entry["idx"], "url": entry["url"], "units": entry["units"]}, lexical))
+            else:
+                pending.append(q_idx)
+        if pending:
+            entry["quotes"] = set(pending)
+            per_cand.append(entry)
+
+    if not per_cand and not lexical_hits:
+        return results
+
+    model_id = matcher_model_name(cross_lingual)
+    sim_model = get_sentence_model(model_id)
+    window_size = num_before + 1 + num_after
+    max_tokens = max(16, sim_model.max_seq_length // window_size - 2)
+    query_tokens = [
+        tokenize_en(" ".join([quote_en] + list(q_keywords or []))) if prefilter_top_n else []
+        for quote_en, q_keywords in zip(quotes_en, quote_keywords)
+    ]
+    for entry in per_cand:
+        entry["units"] = split_long_units(entry["units"], max_tokens, tokenizer=sim_model.tokenizer)
+        entry["bounds"] = _candidate_bounds(entry, num_before, num_after, prefilter_top_n, query_tokens)
+
+    # 2) quote 일괄 인코딩 후 window stream을 chunk 단위로 점수화, (quote, 후보)별 running top-k 유지
+    # NMS 후 per_doc_k개가 남도록: 선택된 window 하나가 억제할 수 있는 window는 최대 2*window_size-2개
+    keep = (max(1, per_doc_k) - 1) * (2 * window_size - 1) + 1
+    if mode == "pooled":
+        keep = max(keep, rerank_top_n)
+    quote_span_texts = [build_quote_span_text(q, num_before=num_before, num_after=num_after) for q in quotes_en]
+    try:
+        with torch.no_grad():
+            quote_embs = _encode_unique(sim_model, quote_span_texts, model_id=model_id)
+    except Exception as e:
+        print(f"[WARN] SBERT similarity error (span-span mode): {e}")
+        return results
+    # window 인코딩 오류는 _stream_top_windows가 후보 단위로 가두고, lexical 재점수 오류는 lexical span만 버린다
+    with torch.no_grad():
+        tops = _stream_top_windows(
+            sim_model, model_id, quote_embs, per_cand, mode, keep, rerank_top_n, chunk_windows
+        ) if per_cand else []
+        try:
+            lexical_scores = _rescore_lexical(
+                sim_model, model_id, quote_embs, [(q_idx, hit["units"], lex[0]) for q_idx, hit, lex in lexical_hits]
+            ) if lexical_hits else []
+        except Exception as e:
+            print(f"[WARN] SBERT similarity error (lexical spans): {e}")
+            lexical_scores = []
 
-    global_candidates: List[Dict] = []
+    for (q_idx, hit, (bound, lex_score)), score in zip(lexical_hits, lexical_scores):
+        results[q_idx][hit["idx"]] = [
+            _span_result(hit["url"], hit["units"], bound, score, match_type="lexical", lexical_score=lex_score)
+        ]
 
-    for cand in candidates:
+    # 3) (quote, 후보)별 상위 window (NMS)로 scatter
+    for q_idx, q_tops in enumerate(tops):
+        for entry, heap in zip(per_cand, q_tops):
+            if q_idx not in entry["quotes"]:
+                continue
+            results[q_idx][entry["idx"]] = [
+                _span_result(entry["url"], entry["units"], bound, score)
+                for score, _, bound in nms_windows(heap, max(1, per_doc_k), max_iou=nms_iou)
+            ]
+
+    return results
+
+
+def _candidate_units(
+    candidates: List[Dict],
+    speaker: Optional[str],
+    wanted: Optional[Set[int]] = None,
+) -> List[Dict]:
+    """
+    후보별 매칭 대상 문장 {"idx", "url", "units"} 목록 (url/본문/문장이 없는 후보는 뺀다).
+    wanted가 주어지면 그 index의 후보만 본다.
+    """
+    out = []
+    for cand_idx, cand in enumerate(candidates):
+        if wanted is not None and cand_idx not in wanted:
+            continue
         url = cand.get("url")
         snippet = cand.get("snippet")
-        if not url:
+        if not url or not snippet:
             continue
-
         try:
-            span_res = find_best_match_span_in_snippet(
-                quote_text=quote_en,
-                snippet_text=snippet,
-                url=url,
-                num_before=num_before,
-                num_after=num_after,
-            )
+            sentence_units = collect_candidate_sentences(snippet, segments=cand.get("segments"), speaker=speaker)
         except Exception as e:
             print(f"[WARN] span extraction error (url={url}, snippet-based): {e}")
             continue
+        if sentence_units:
+            out.append({"idx": cand_idx, "url": url, "units": sentence_units})
+    return out
+
+
+def _candidate_bounds(
+    entry: Dict,
+    num_before: int,
+    num_after: int,
+    prefilter_top_n: Optional[int],
+    query_tokens: List[List[str]],
+) -> List[Tuple[int, int, int]]:
+    """
+    후보 하나의 window 경계. 긴 문서는 quote별 BM25 상위 window의 합집합만 남긴다.
+    문장 BM25 점수는 window 설정과 무관하므로 entry["bm25"]에 캐시해서 재사용한다.
+    """
+    bounds = window_bounds(len(entry["units"]), num_before=num_before, num_after=num_after)
+    if not prefilter_top_n or len(bounds) <= prefilter_top_n or not any(query_tokens):
+        return bounds
+
+    cache = entry.setdefault("bm25", {})
+    sent_tokens = None
+    selected = set()
+    for q_idx in entry["quotes"]:
+        if not query_tokens[q_idx]:
+            continue
+        if q_idx not in cache:
+            if sent_tokens is None:
+                sent_tokens = [tokenize_en(u[0]) for u in entry["units"]]
+            cache[q_idx] = bm25_scores(sent_tokens, query_tokens[q_idx])
+        selected.update(top_window_indices(cache[q_idx], bounds, prefilter_top_n))
+    return [bounds[i] for i in sorted(selected)]
+
+
+def _stream_top_windows(
+    sim_model,
+    model_id: str,
+    quote_embs: torch.Tensor,
+    per_cand: List[Dict],
+    mode: str,
+    keep: int,
+    rerank_top_n: int,
+    chunk_windows: int,
+    sentence_cache: Optional[Dict[str, torch.Tensor]] = None,
+) -> List[List[List[Tuple[float, int, Tuple[int, int, int]]]]]:
+    """
+    모든 후보의 window(entry["bounds"])를 chunk_windows개씩 점수화하고 (quote, 후보)별 상위 keep개를 남긴다.
+    반환: tops[quote_idx][cand_pos] = [(score, -center, bound), ...] (heap 순서)
+    인코딩 오류는 후보 단위로 가둔다 (_score_chunk_isolated): 실패한 후보만 빈 리스트가 되고
+    나머지 후보는 정상 결과를 낸다.
+    """
+    tops: List[List[List[Tuple[float, int, Tuple[int, int, int]]]]] = [
+        [[] for _ in per_cand] for _ in range(len(quote_embs))
+    ]
+    failed: Set[int] = set()
+    chunk: List[Tuple[int, Tuple[int, int, int]]] = []
+    stream = ((pos, b) for pos, entry in enumerate(per_cand) for b in entry["bounds"])
+    for item in itertools.chain(stream, [None]):
+        if item is not None:
+            chunk.append(item)
+            if len(chunk) < chunk_windows:
+                continue
+        if not chunk:
+            break
+        sims = _score_chunk_isolated(
+            sim_model, quote_embs, per_cand, chunk, mode, failed, model_id=model_id, sentence_cache=sentence_cache
+        )
+        for q_idx, row in enumerate(sims):
+            q_tops = tops[q_idx]
+            for (pos, bound), score in zip(chunk, row):
+                if score is None or q_idx not in per_cand[pos]["quotes"]:
+                    continue
+                # 동점이면 앞쪽 window 우선 (argmax와 같은 규칙): -center를 tie-breaker로
+                heap_item = (score, -bound[0], bound)
+                if len(q_tops[pos]) < keep:
+                    heapq.heappush(q_tops[pos], heap_item)
+                elif heap_item > q_tops[pos][0]:
+                    heapq.heapreplace(q_tops[pos], heap_item)
+        chunk = []
+
+    if mode == "pooled" and rerank_top_n > 0:
+        # pooled 상위 window만 exact 인코딩으로 다시 점수화 (quote 간에 겹치는 window는 한 번만)
+        flat = list(dict.fromkeys(
+            (pos, item[2]) for q_tops in tops for pos, heap in enumerate(q_tops) for item in heap if pos not in failed
+        ))
+        col = {key: i for i, key in enumerate(flat)}
+        exact = _score_chunk_isolated(sim_model, quote_embs, per_cand, flat, "exact", failed, model_id=model_id)
+        tops = [
+            [
+                [] if pos in failed else [(exact[q_idx][col[(pos, item[2])]], item[1], item[2]) for item in heap]
+                for pos, heap in enumerate(q_tops)
+            ]
+            for q_idx, q_tops in enumerate(tops)
+        ]
+    # 중간 chunk에서 실패한 후보는 앞 chunk의 window만 본 불완전한 top-k라 버린다
+    for q_tops in tops:
+        for pos in failed:
+            q_tops[pos] = []
+    return tops
+
+
+def match_window_configs(
+    quote_en: str,
+    candidates: List[Dict],
+    window_configs: Sequence[Tuple[int, int]],
+    speaker: Optional[str] = config.TRANSCRIPT_TARGET_SPEAKER,
+    mode: str = config.MATCH_MODE,
+    rerank_top_n: int = config.MATCH_RERANK_TOP_N,
+    prefilter_top_n: Optional[int] = config.MATCH_PREFILTER_TOP_N,
+    keywords: Optional[Sequence[str]] = None,
+    lexical_threshold: Optional[float] = config.LEXICAL_MATCH_THRESHOLD,
+    chunk_windows: int = config.MATCH_CHUNK_WINDOWS,
+    cross_lingual: Optional[bool] = None,
+) -> Dict[Tuple[int, int], List[Optional[SpanMatch]]]:
+    """
+    여러 window 설정 (num_before, num_after)에 대해 한 번의 호출로 후보별 best span을 구한다 (파라미터 sweep용).
+    반환: {(num_before, num_after): find_best_spans_batched와 같은 형식의 리스트}
+
+    설정과 무관한 문장 단위 작업은 한 번만 한다:
+      - 문장 분리/발화자 필터, 긴 문장 분할 (가장 넓은 window의 토큰 예산 기준)
+      - lexical fuzzy 매칭 (매칭 구간은 한 번 찾고 window 경계만 설정별로 만든다)
+      - BM25 문장 점수, quote span 인코딩 (설정별 quote span을 한 번에)
+      - pooled 모드의 문장 인코딩 (호출 안에서 문장 임베딩을 공유 → 설정 수와 무관하게 문장당 1회)
+    exact 모드는 설정마다 window 텍스트가 달라서 window 인코딩 자체는 설정별로 한다
+    (EMBEDDING_STORE_DIR이 켜져 있으면 설정 간에 겹치는 window는 store에서 재사용).
+    """
+    if mode not in ("exact", "pooled"):
+        raise ValueError(f"unknown match mode: {mode}")
+
+    window_configs = list(dict.fromkeys((int(nb), int(na)) for nb, na in window_configs))
+    out: Dict[Tuple[int, int], List[Optional[SpanMatch]]] = {wc: [None] * len(candidates) for wc in window_configs}
+    entries = _candidate_units(candidates, speaker)
+    if not entries or not window_configs:
+        return out
+
+    for entry in entries:
+        entry["quotes"] = {0}
+        entry["lexical"] = None
+        if lexical_threshold is not None:
+            match = fuzzy_match_span(quote_en, [u[0] for u in entry["units"]])
+            if match and match[0] >= lexical_threshold:
+                entry["lexical"] = match
+    per_cand = [e for e in entries if e["lexical"] is None]
+
+    model_id = matcher_model_name(cross_lingual)
+    sim_model = get_sentence_model(model_id)
+    widest = max(nb + 1 + na for nb, na in window_configs)
+    max_tokens = max(16, sim_model.max_seq_length // widest - 2)
+    for entry in per_cand:
+        entry["units"] = split_long_units(entry["units"], max_tokens, tokenizer=sim_model.tokenizer)
+    query_tokens = [tokenize_en(" ".join([quote_en] + list(keywords or [])))] if prefilter_top_n else [[]]
+
+    sentence_cache: Optional[Dict[str, torch.Tensor]] = {} if mode == "pooled" else None
+    keep = max(1, rerank_top_n) if mode == "pooled" else 1
+    try:
+        with torch.no_grad():
+            quote_embs = _encode_unique(
+                sim_model,
+                [build_quote_span_text(quote_en, num_before=nb, num_after=na) for nb, na in window_configs],
+                model_id=model_id,
+            )
+            for wc_idx, (nb, na) in enumerate(window_configs):
+                results = out[(nb, na)]
+                lexical_entries = [e for e in entries if e["lexical"] is not None]
+                if lexical_entries:
+                    bounds = [_lexical_bound(e["lexical"], len(e["units"]), nb, na) for e in lexical_entries]
+                    scores = _rescore_lexical(
+                        sim_model,
+                        model_id,
+                        quote_embs[wc_idx : wc_idx + 1],
+                        [(0, e["units"], bound) for e, bound in zip(lexical_entries, bounds)],
+                    )
+                    for entry, bound, score in zip(lexical_entries, bounds, scores):
+                        results[entry["idx"]] = _span_result(
+                            entry["url"],
+                            entry["units"],
+                            bound,
+                            score,
+                            match_type="lexical",
+                            lexical_score=entry["lexical"][0],
+                        )
+                if not per_cand:
+                    continue
+                for entry in per_cand:
+                    entry["bounds"] = _candidate_bounds(entry, nb, na, prefilter_top_n, query_tokens)
+                tops = _stream_top_windows(
+                    sim_model,
+                    model_id,
+                    quote_embs[wc_idx : wc_idx + 1],
+                    per_cand,
+                    mode,
+                    keep,
+                    rerank_top_n,
+                    chunk_windows,
+                    sentence_cache=sentence_cache,
+                )
+                for entry, heap in zip(per_cand, tops[0]):
+                    if heap:
+                        score, _, bound = max(heap)
+                        results[entry["idx"]] = _span_result(entry["url"], entry["units"], bound, score)
+    except Exception as e:
+        print(f"[WARN] SBERT similarity error (span-span mode): {e}")
+    return out
+
+
+def top_spans_for_quotes(
+    quotes_en: Sequence[str],
+    candidates: List[Dict],
+    k: int = 1,
+    **kwargs,
+) -> List[List[SpanMatch]]:
+    """
+    match_quotes_batched 결과를 quote별 전역 top-k span 리스트로 모은다 (heap 기반 부분 선택).
+    kwargs는 match_quotes_batched로 그대로 넘긴다 (per_doc_k 기본값은 k).
+    """
+    kwargs.setdefault("per_doc_k", k)
+    per_quote = match_quotes_batched(quotes_en, candidates, **kwargs)
+    return [
+        heapq.nlargest(k, (span for spans in per_cand for span in spans), key=lambda x: x.get("best_score", 0.0))
+        for per_cand in per_quote
+    ]
+
+
+def index_candidates(
+    candidates: List[Dict],
+    index: Optional[SentenceIndex] = None,
+    speaker: Optional[str] = config.TRANSCRIPT_TARGET_SPEAKER,
+) -> int:
+    """
+    후보 문서의 매칭 대상 문장을 archive 인덱스에 추가한다 (이미 들어 있는 url은 건너뜀).
+    추가된 문서 수를 반환.
+    """
+    if index is None:
+        index = get_sentence_index()
+    if index is None:
+        return 0
 
-        if not span_res:
+    sim_model = get_sentence_model(index.model_id)
+    added = 0
+    for cand in candidates:
+        url = cand.get("url")
+        snippet = cand.get("snippet")
+        if not url or not snippet or index.has_document(url):
             continue
+        sentence_units = collect_candidate_sentences(snippet, segments=cand.get("segments"), speaker=speaker)
+        if not sentence_units:
+            continue
+        with torch.no_grad():
+            embs = _encode_unique(sim_model, [u[0] for u in sentence_units], model_id=index.model_id)
+        index.add_document(
+            url,
+            [u[0] for u in sentence_units],
+            embs.cpu().numpy(),
+            offsets=[(u[1], u[2]) for u in sentence_units],
+        )
+        added += 1
+    if added:
+        index.save()  # 새 문서가 없으면 (대부분의 인용문) 인덱스 파일을 다시 쓰지 않는다
+    return added
+
+
+def find_spans_in_index(
+    quote_en: str,
+    index: Optional[SentenceIndex] = None,
+    top_k: int = 5,
+    num_before: int = 1,
+    num_after: int = 1,
+    search_k: Optional[int] = None,
+) -> List[SpanMatch]:
+    """
+    archive 인덱스에서 quote span과 가까운 문장 top search_k개를 찾고, extract_span으로 span을 만든 뒤
+    quote_span vs span 유사도로 다시 점수화해서 상위 top_k개를 반환한다 (검색 결과 후보와 같은 점수 기준).
+    """
+    if index is None:
+        index = get_sentence_index()
+    if index is None or not len(index):
+        return []
+
+    quote_span_text = build_quote_span_text(quote_en, num_before=num_before, num_after=num_after)
+    sim_model = get_sentence_model(index.model_id)
+
+    with torch.no_grad():
+        quote_emb = _encode_unique(sim_model, [quote_span_text], model_id=index.model_id)
+        hits = index.search(quote_emb[0].cpu().numpy(), top_k=search_k or top_k * 4)
+
+        spans = {}
+        for doc_id, sent_idx, _ in hits:
+            doc = index.docs[doc_id]
+            _, s_idx, e_idx = extract_span(doc["sentences"], sent_idx, num_before=num_before, num_after=num_after)
+            offsets = doc.get("offsets") or [(0, 0)] * len(doc["sentences"])
+            units = [(sent, o[0], o[1]) for sent, o in zip(doc["sentences"], offsets)]
+            spans.setdefault((doc_id, s_idx, e_idx), (doc["url"], units, (sent_idx, s_idx, e_idx)))
+        if not spans:
+            return []
+
+        span_list = list(spans.values())
+        texts = [window_text(units, bound) for _, units, bound in span_list]
+        sims = util.cos_sim(quote_emb, _encode_unique(sim_model, texts, model_id=index.model_id))[0]
+
+    results = [
+        _span_result(url, units, bound, float(score))
+        for (url, units, bound), score in zip(span_list, sims.tolist())
+    ]
+    return heapq.nlargest(top_k, results, key=lambda r: r.best_score)
 
-        score = span_res.get("best_score", -1.0)
 
-        # ★ 모든 span 후보는 일단 다 모은다 (min_score와 무관)
-        global_candidates.append(span_res)
+def find_best_match_span_in_snippet(
+    quote_text: str,
+    snippet_text: str,
+    url: str,
+    num_before: int = 1,
+    num_after: int = 1,
+    segments: Optional[List[Dict]] = None,
+    speaker: Optional[str] = config.TRANSCRIPT_TARGET_SPEAKER,
+) -> Optional[SpanMatch]:
+    """
+    Use semantic similarity to find the best matching SPAN (문맥 포함 구간) within a snippet.
+
+    변경 사항:
+      - 인용문도 앞뒤 num_before/num_after 문장을 포함한 span으로 만든다.
+      - snippet 쪽도 중심 문장 ± num_before/after span으로 만들고,
+        quote_span vs snippet_span (SPAN-SPAN) 유사도를 비교한다.
+      - segments(발화자별 turn)가 주어지면 speaker의 발화 문장만 비교하고,
+        span_char_start/span_char_end로 snippet_text 안의 위치를 함께 돌려준다.
+      - 단일 후보용 wrapper이며, 여러 후보는 find_best_spans_batched로 한 번에 처리한다.
+    """
+    if not snippet_text:
+        return None
+
+    return find_best_spans_batched(
+        quote_text,
+        [{"url": url, "snippet": snippet_text, "segments": segments}],
+        num_before=num_before,
+        num_after=num_after,
+        speaker=speaker,
+    )[0]
+
+
+def find_best_span_from_candidates_debug(
+    quote_en: str,
+    candidates: List[Dict],
+    num_before: int = 1,
+    num_after: int = 1,
+    min_score: float = 0.0,   # ★ threshold 거의 없애기
+    speaker: Optional[str] = config.TRANSCRIPT_TARGET_SPEAKER,
+    keywords: Optional[Sequence[str]] = None,
+    per_doc_k: int = config.MATCH_PER_DOC_TOP_K,
+    top_k: Optional[int] = None,
+) -> Optional[SpanMatch]:
+    """
+    Match all candidate snippets in one batched pass, collect span candidates
+    (문서마다 겹치지 않는 상위 per_doc_k개), and return:
+      - best_global: 최고 점수 span (SpanMatch)
+      - best_global.alternatives: 나머지 후보 (점수 내림차순, top_k가 주어지면 best 포함 top_k개까지)
+      - best_global["top_k_candidates"]: 예전 형식의 [best_global] + alternatives
+
+    주의:
+      - min_score는 이제 "완전 쓰레기만 버리는 용도" 정도로만 사용하고,
+        top_k_candidates에는 min_score와 상관없이 모든 후보를 넣는다.
+    """
+
+    # ★ 모든 span 후보는 일단 다 모은다 (min_score와 무관), 인코딩은 후보 전체에 대해 한 번
+    per_doc = find_top_spans_batched(
+        quote_en,
+        candidates,
+        num_before=num_before,
+        num_after=num_after,
+        speaker=speaker,
+        keywords=keywords,
+        per_doc_k=per_doc_k,
+    )
+    global_candidates: List[SpanMatch] = [span for spans in per_doc for span in spans]
 
     # 후보가 하나도 없으면 None
     if not global_candidates:
         return None
 
-    # 점수 기준 내림차순 정렬
-    sorted_candidates = sorted(
+    # 점수 기준 상위 선택 (전체 정렬 대신 heap 기반 부분 선택)
+    ranked = heapq.nlargest(
+        top_k or len(global_candidates),
         global_candidates,
-        key=lambda x: x.get("best_score", 0.0),
-        reverse=True,
+        key=lambda x: x.best_score,
     )
 
-    # 최고 점수 span = 맨 앞
-    best_global = sorted_candidates[0]
-
-    # ★ 여기서 전체 후보 리스트를 best_global에 붙여서 반환
-    best_global["top_k_candidates"] = sorted_candidates
+    # 최고 점수 span = 맨 앞, 나머지는 자기 자신을 포함하지 않는 alternatives로 (재귀 참조 없음).
+    # 반환하는 span은 detached: 후보 문서의 문장 리스트 전체를 붙잡지 않는다
+    best_global = ranked[0].detached()
+    best_global.alternatives = tuple(span.detached() for span in ranked[1:])
 
     # 필요하다면 여기서 min_score만 한 번 체크해서
     # 너무 낮으면 None을 돌려도 되지만,
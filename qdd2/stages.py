@@ -0,0 +1,222 @@
+"""
+Staged pipeline engine: a chain of worker stages connected by bounded queues.
+
+Each stage has its own batch size and number of worker threads. CPU-bound stages
+(model inference) usually run one worker that takes batches across items, and I/O-bound
+stages (HTTP) fan out over several workers. Bounded queues give backpressure, and the
+number of items in flight is capped, so a slow item cannot make the reorder buffer grow
+without limit. Results are yielded in input order.
+
+A stage fn takes a list of items and returns a list of the same length (the outputs passed
+to the next stage). If it raises, every item of that batch becomes a StageFailure, which
+skips the remaining stages and is yielded in its place. Stage fns that want per-item error
+handling should catch exceptions themselves.
+"""
+
+import asyncio
+import queue
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from qdd2 import config
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    name: 로그/실패 표시용 이름
+    fn: items(list) -> outputs(list, 같은 길이)
+    batch_size: 한 번에 fn에 넘기는 최대 item 수 (큐에 쌓여 있는 만큼만 모으고 기다리지 않는다)
+    workers: 이 stage를 도는 thread 수
+    ordered: True면 입력 순서대로만 처리한다 (worker 1개). 순서에 따라 결과가 달라지는 부수효과
+             (예: archive 인덱스 추가, DF 테이블 갱신)가 있는 stage에 쓴다.
+    """
+
+    name: str
+    fn: Callable[[List[Any]], List[Any]]
+    batch_size: int = 1
+    workers: int = 1
+    ordered: bool = False
+
+    def __post_init__(self):
+        if self.ordered and self.workers != 1:
+            raise ValueError(f"ordered stage {self.name!r} must have exactly one worker")
+
+
+@dataclass(slots=True)
+class StageFailure:
+    """stage fn이 실패한 item. 이후 stage는 건너뛰고 결과 자리에 그대로 나온다."""
+
+    item: Any
+    stage: str
+    error: BaseException
+
+
+class _StageRunner:
+    def __init__(self, stage: Stage, inq: queue.Queue, outq: queue.Queue, next_workers: int):
+        self.stage = stage
+        self.inq = inq
+        self.outq = outq
+        self.next_workers = next_workers
+        self._alive = stage.workers
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        target = self._run_ordered if self.stage.ordered else self._run
+        for i in range(self.stage.workers):
+            threading.Thread(target=self._guarded, args=(target,), name=f"stage-{self.stage.name}-{i}", daemon=True).start()
+
+    def _guarded(self, target) -> None:
+        try:
+            target()
+        finally:
+            with self._lock:
+                self._alive -= 1
+                last = self._alive == 0
+            if last:
+                for _ in range(self.next_workers):
+                    self.outq.put(_DONE)
+
+    def _process(self, batch: List[tuple]) -> None:
+        live = [(seq, item) for seq, item in batch if not isinstance(item, StageFailure)]
+        results: Dict[int, Any] = {seq: item for seq, item in batch if isinstance(item, StageFailure)}
+        if live:
+            try:
+                outputs = self.stage.fn([item for _, item in live])
+                if len(outputs) != len(live):
+                    raise RuntimeError(f"stage {self.stage.name!r} returned {len(outputs)} outputs for {len(live)} items")
+                results.update((seq, out) for (seq, _), out in zip(live, outputs))
+            except Exception as e:
+                results.update((seq, StageFailure(item, self.stage.name, e)) for seq, item in live)
+        for seq, _ in batch:
+            self.outq.put((seq, results[seq]))
+
+    def _run(self) -> None:
+        while True:
+            msg = self.inq.get()
+            if msg is _DONE:
+                return
+            batch = [msg]
+            done = False
+            while len(batch) < self.stage.batch_size:
+                try:
+                    msg = self.inq.get_nowait()
+                except queue.Empty:
+                    break
+                if msg is _DONE:
+                    done = True
+                    break
+                batch.append(msg)
+            self._process(batch)
+            if done:
+                return
+
+    def _run_ordered(self) -> None:
+        pending: Dict[int, tuple] = {}
+        next_seq = 0
+        done = False
+        while True:
+            while next_seq not in pending and not done:
+                msg = self.inq.get()
+                if msg is _DONE:
+                    done = True
+                else:
+                    pending[msg[0]] = msg
+            if next_seq not in pending:
+                return
+            # 이미 도착한 것은 기다리지 않고 모아서 연속 구간을 배치로 만든다
+            while not done:
+                try:
+                    msg = self.inq.get_nowait()
+                except queue.Empty:
+                    break
+                if msg is _DONE:
+                    done = True
+                else:
+                    pending[msg[0]] = msg
+            batch = []
+            while next_seq in pending and len(batch) < self.stage.batch_size:
+                batch.append(pending.pop(next_seq))
+                next_seq += 1
+            self._process(batch)
+
+
+def run_stages(
+    items: Iterable[Any],
+    stages: Sequence[Stage],
+    queue_size: int = config.PIPELINE_QUEUE_SIZE,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[Any]:
+    """
+    items를 stages에 차례로 통과시키고, 결과(또는 StageFailure)를 입력 순서대로 yield한다.
+    max_in_flight: 동시에 파이프라인 안에 있는 item 상한 (기본 queue_size * (stage 수 + 1)).
+    """
+    if not stages:
+        yield from items
+        return
+    max_in_flight = max_in_flight or queue_size * (len(stages) + 1)
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    for i, stage in enumerate(stages):
+        next_workers = stages[i + 1].workers if i + 1 < len(stages) else 1
+        _StageRunner(stage, queues[i], queues[i + 1], next_workers).start()
+
+    slots = threading.Semaphore(max_in_flight)
+    feed_error: List[BaseException] = []
+
+    def feed() -> None:
+        try:
+            for seq, item in enumerate(items):
+                slots.acquire()
+                queues[0].put((seq, item))
+        except BaseException as e:  # 입력 iterator 오류는 소비자 쪽에서 다시 올린다
+            feed_error.append(e)
+        finally:
+            for _ in range(stages[0].workers):
+                queues[0].put(_DONE)
+
+    threading.Thread(target=feed, name="stage-feed", daemon=True).start()
+
+    out = queues[-1]
+    buffered: Dict[int, Any] = {}
+    next_seq = 0
+    while True:
+        msg = out.get()
+        if msg is _DONE:
+            break
+        buffered[msg[0]] = msg[1]
+        while next_seq in buffered:
+            result = buffered.pop(next_seq)
+            next_seq += 1
+            slots.release()
+            yield result
+    if feed_error:
+        raise feed_error[0]
+
+
+class OrderedTurns:
+    """
+    asyncio 버전의 ordered stage: 동시에 도는 코루틴들이 구간 하나를 seq 순서대로만 지나가게 한다.
+    모든 seq가 turn(seq)를 정확히 한 번 지나가야 한다 (건너뛸 item도 빈 구간으로 들어갔다 나온다).
+
+        async with turns.turn(seq):
+            ...  # 순서에 따라 결과가 달라지는 부수효과
+    """
+
+    def __init__(self):
+        self._next = 0
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def turn(self, seq: int):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._next == seq)
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._next += 1
+                self._cond.notify_all()
@@ -3,7 +3,13 @@ Lightweight text helpers: cleaning, normalization, sentence splitting, and quote
 """
 
 import re
-from typing import Iterable, List
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 문장 경계: 종결부호 뒤 공백. 모든 단계(NER, snippet 매칭, origin_finder)가 이 규칙 하나를 공유한다.
+_SENT_BOUNDARY_RE = re.compile(r"(?<=[.!?])\s+")
 
 
 def clean_text(text: str) -> str:
@@ -24,48 +30,224 @@ def normalize_korean_phrase(text: str) -> str:
     return normalized.lower()
 
 
-def split_sentences(text: str) -> List[str]:
+class Document:
+    """
+    원문 텍스트 + 한 번만 계산하는 문장 경계.
+
+    경계 regex는 문서당 한 번 돌고, 문장은 원문 기준 (start, end) 문자 offset으로 보관한다.
+    clean_text는 문장 조각마다 한 번만 적용되고, 길이 필터(min_len)/구간(ranges)별 view는
+    요청될 때 만들어서 캐시한다.
+    """
+
+    __slots__ = ("text", "_is_ko", "_boundaries", "_pieces", "_clean", "_views")
+
+    def __init__(self, text: Optional[str]):
+        self.text = text or ""
+        self._is_ko: Optional[bool] = None
+        self._boundaries: Optional[List[Tuple[int, int]]] = None
+        self._pieces: Optional[List[Tuple[int, int]]] = None
+        self._clean: Dict[Tuple[int, int], str] = {}
+        self._views: Dict[Tuple, List[Tuple[str, int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @property
+    def is_ko(self) -> bool:
+        if self._is_ko is None:
+            self._is_ko = contains_korean(self.text)
+        return self._is_ko
+
+    def boundaries(self) -> List[Tuple[int, int]]:
+        """문장 경계(공백 구간)의 (start, end) offset 목록."""
+        if self._boundaries is None:
+            self._boundaries = [m.span() for m in _SENT_BOUNDARY_RE.finditer(self.text)]
+        return self._boundaries
+
+    def _split(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """text[start:end]를 따로 분리한 것과 같은 조각 (원문 offset). 경계 목록을 재사용한다."""
+        bounds = self.boundaries()
+        pieces = []
+        pos = start
+        for b_start, b_end in bounds[bisect_left(bounds, (start, start)) :]:
+            if b_start >= end:
+                break
+            if b_start == start:
+                continue  # 구간 밖 문자가 만든 경계 (구간 단독으로는 경계가 아님)
+            pieces.append((pos, b_start))
+            pos = min(b_end, end)
+        pieces.append((pos, end))
+        return pieces
+
+    def _unit(self, start: int, end: int) -> Optional[Tuple[str, int, int]]:
+        key = (start, end)
+        sentence = self._clean.get(key)
+        if sentence is None:
+            sentence = self._clean[key] = clean_text(self.text[start:end])
+        if not sentence:
+            return None
+        piece = self.text[start:end]
+        lead = len(piece) - len(piece.lstrip())
+        trail = len(piece) - len(piece.rstrip())
+        return sentence, start + lead, end - trail
+
+    def sentence_units(
+        self,
+        min_len: int = 0,
+        ranges: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> List[Tuple[str, int, int]]:
+        """
+        (clean sentence, start, end) 목록. min_len보다 짧은 문장은 뺀다.
+        ranges가 주어지면 각 (start, end) 구간을 독립적으로 분리한다 (예: 발화자 turn).
+        """
+        key = (min_len, tuple(ranges) if ranges is not None else None)
+        view = self._views.get(key)
+        if view is None:
+            if ranges is None:
+                if self._pieces is None:
+                    self._pieces = self._split(0, len(self.text))
+                pieces = self._pieces
+            else:
+                pieces = [p for start, end in ranges for p in self._split(start, end)]
+            view = []
+            for start, end in pieces:
+                unit = self._unit(start, end)
+                if unit and len(unit[0]) >= min_len:
+                    view.append(unit)
+            self._views[key] = view
+        return view
+
+    def sentences(self, min_len: int = 0) -> List[str]:
+        return [u[0] for u in self.sentence_units(min_len)]
+
+    def context_range(self, start: int, end: int, num_sentences: int) -> Tuple[int, int]:
+        """
+        원문 [start, end) 구간이 걸친 문장들과 그 앞뒤 num_sentences개 문장을 덮는 (start, end) offset.
+        (예: 인용문 offset → 주변 문맥 window)
+        """
+        if self._pieces is None:
+            self._pieces = self._split(0, len(self.text))
+        ends = [p[1] for p in self._pieces]
+        last_idx = len(ends) - 1
+        first = min(bisect_right(ends, start), last_idx)
+        last = min(bisect_right(ends, max(start, end - 1)), last_idx)
+        first = max(0, first - num_sentences)
+        last = min(last_idx, last + num_sentences)
+        return self._pieces[first][0], self._pieces[last][1]
+
+
+@lru_cache(maxsize=64)
+def _cached_document(text: str) -> Document:
+    return Document(text)
+
+
+def as_document(text) -> Document:
+    """
+    str이면 같은 텍스트에 대해 프로세스 안에서 공유되는 Document를 돌려준다 (최근 64개 캐시).
+    이미 Document면 그대로 반환.
+    """
+    if isinstance(text, Document):
+        return text
+    return _cached_document(text or "")
+
+
+def split_sentences(text) -> List[str]:
     """
     Basic sentence segmentation that works reasonably for Korean/English mixed text.
+    (Document 경계를 공유하므로 같은 텍스트는 다시 분리하지 않는다)
     """
-    text = clean_text(text)
-    if not text:
-        return []
-    return re.split(r"(?<=[.!?])\s+(?=[가-힣A-Za-z])", text)
+    return as_document(text).sentences()
+
+
+# 인용 부호 스타일: name -> (여는 부호, 닫는 부호)
+QUOTE_STYLES: Dict[str, Tuple[str, str]] = {
+    "double": ('"', '"'),
+    "curly_double": ("“", "”"),
+    "single": ("'", "'"),
+    "curly_single": ("‘", "’"),
+    "guillemet": ("«", "»"),
+    "corner": ("「", "」"),
+    "white_corner": ("『", "』"),
+}
+# 직접 인용(큰따옴표 계열)으로 보는 스타일
+DOUBLE_QUOTE_STYLES: Tuple[str, ...] = ("double", "curly_double", "guillemet", "corner", "white_corner")
+
+
+@dataclass(frozen=True, slots=True)
+class QuoteSpan:
+    """따옴표 안 텍스트와 원문 offset. start/end는 부호를 뺀 안쪽 텍스트 기준."""
+
+    text: str
+    start: int
+    end: int
+    style: str
+    sentence_idx: Optional[int] = None
+
+
+@lru_cache(maxsize=16)
+def _quote_scanner(styles: Tuple[str, ...]) -> re.Pattern:
+    """스타일별 패턴을 named group 하나의 alternation으로 컴파일 (스타일 조합당 한 번)."""
+    parts = []
+    for name in styles:
+        open_q, close_q = QUOTE_STYLES[name]
+        # 여는/닫는 부호 모두 본문에서 제외 → “…“…” 처럼 짝이 어긋나도 가장 안쪽 쌍만 잡는다
+        excluded = re.escape(open_q) if open_q == close_q else re.escape(open_q) + re.escape(close_q)
+        body = f"(?P<{name}>[^{excluded}]+)"
+        if name == "single":
+            # don't / Trump's 같은 영문 아포스트로피는 인용 부호로 보지 않는다 ('강경'이라며 는 허용)
+            parts.append(rf"(?<![A-Za-z]){re.escape(open_q)}{body}{re.escape(close_q)}(?![A-Za-z])")
+        elif name in DOUBLE_QUOTE_STYLES and open_q != close_q:
+            # 기사에 흔한 부호 오타: “A“ / ”B” 처럼 같은 쪽 부호가 반복되면 그 부호를 짝으로 본다
+            # (짝이 맞는 “A”는 왼쪽부터 먼저 잡히므로 결과가 같다)
+            parts.append(f"[{excluded}]{body}[{excluded}]")
+        else:
+            parts.append(f"{re.escape(open_q)}{body}{re.escape(close_q)}")
+    return re.compile("|".join(parts))
+
+
+def scan_quotes(
+    text,
+    styles: Sequence[str] = tuple(QUOTE_STYLES),
+    min_length: int = 0,
+    with_sentence: bool = False,
+) -> List[QuoteSpan]:
+    """
+    모든 인용 부호 스타일을 한 번의 선형 scan으로 찾아 QuoteSpan 목록(원문 순서)을 반환.
+    겹치는 인용은 먼저 열린 쪽이 이긴다 (큰따옴표 안의 작은따옴표는 따로 나오지 않음).
+    min_length: 공백을 뺀 길이가 이보다 짧은 인용은 버린다.
+    with_sentence: True면 Document의 문장 경계로 인용이 시작하는 문장 index를 채운다.
+    """
+    doc = as_document(text)
+    pattern = _quote_scanner(tuple(styles))
+    spans = []
+    for m in pattern.finditer(doc.text):
+        style = m.lastgroup
+        start, end = m.span(style)
+        quote = m.group(style)
+        if len(quote.strip()) < min_length:
+            continue
+        spans.append(QuoteSpan(quote, start, end, style))
+
+    if with_sentence and spans:
+        starts = [u[1] for u in doc.sentence_units()]
+        spans = [
+            QuoteSpan(q.text, q.start, q.end, q.style, max(0, bisect_right(starts, q.start) - 1))
+            for q in spans
+        ]
+    return spans
 
 
 def extract_quotes(text: str) -> List[str]:
-    """Extract text inside double quotes."""
-    return re.findall(r'"([^"]+)"', text or "")
+    """Extract text inside double quotes (", “ ”, « », 「 」, 『 』)."""
+    return [q.text for q in scan_quotes(text, styles=DOUBLE_QUOTE_STYLES)]
 
 
 def extract_quotes_advanced(text: str, min_length: int = 6) -> List[str]:
     """
     Extract quoted text using several quote styles, drop short/duplicate snippets.
     """
-    text = text or ""
-    patterns = [
-        r"“([^”]+)”",
-        r'"([^"]+)"',
-        r"'([^']+)'",
-        r"‘([^’]+)’",
-    ]
-
-    quotes: List[str] = []
-    for pattern in patterns:
-        quotes.extend(re.findall(pattern, text))
-
-    # Filter and deduplicate while preserving order
-    seen = set()
-    unique_quotes = []
-    for q in quotes:
-        cleaned = q.strip()
-        if len(cleaned) < min_length or cleaned in seen:
-            continue
-        seen.add(cleaned)
-        unique_quotes.append(cleaned)
-
-    return unique_quotes
+    quotes = scan_quotes(text, styles=("curly_double", "double", "single", "curly_single"), min_length=min_length)
+    return dedupe_preserve_order(q.text.strip() for q in quotes)
 
 
 def contains_korean(text: str) -> bool:
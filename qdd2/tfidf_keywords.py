@@ -0,0 +1,255 @@
+"""
+Statistical keyword engine: n-gram TF-IDF over an incrementally updated document-frequency table.
+
+No model is loaded. Candidates are the same 1~3-grams KeyBERT would consider (CountVectorizer
+token pattern, lowercase, English stop words removed before n-gram building).
+
+The DF table is a count-min sketch: each n-gram counts into one bucket in each of two rows of
+config.KEYWORD_DF_BUCKETS int32 counters (the two halves of a 64-bit blake2b hash), and its df is the
+smaller of the two. Memory and file size stay fixed however many n-grams the crawl sees; a df is
+only overestimated when the n-gram collides in both rows.
+
+DF table files (config.KEYWORD_DF_PATH is the common prefix):
+  "<path>.npz"  snapshot: df (int32[2, buckets]), n_docs, seen (hash of every counted article)
+  "<path>.log"  append-only delta since the snapshot, one line per article: "hash<TAB>term-hash term-hash ..."
+                (64-bit term hashes in hex)
+save() only appends new articles to the log; compact() folds the log into the snapshot once it holds
+config.KEYWORD_DF_COMPACT_EVERY articles. Seed or refresh the table with the CLI:
+  python -m qdd2.tfidf_keywords articles.csv [--column content]
+"""
+
+import atexit
+import hashlib
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from qdd2 import config
+from qdd2.embedding_store import text_hash
+
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")  # CountVectorizer 기본 token_pattern
+_ROWS = 2  # count-min sketch 행 수 (64-bit term hash를 32-bit씩 나눠 쓴다)
+
+
+def candidate_ngrams(text: str, ngram_range: Tuple[int, int] = (1, 3)) -> Counter:
+    """text의 n-gram 후보와 등장 횟수 (KeyBERT 후보와 같은 토큰화)."""
+    tokens = [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in ENGLISH_STOP_WORDS]
+    counts: Counter = Counter()
+    lo, hi = ngram_range
+    for n in range(lo, hi + 1):
+        if n == 1:
+            counts.update(tokens)
+        else:
+            counts.update(" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+    return counts
+
+
+class DocumentFrequencyTable:
+    """
+    n-gram별 문서 빈도 (count-min sketch). add()로 기사를 하나씩 반영하고,
+    save_every개마다 새 기사만 log에 덧붙인다. path가 없으면 메모리 전용.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        save_every: int = config.KEYWORD_DF_SAVE_EVERY,
+        n_buckets: int = config.KEYWORD_DF_BUCKETS,
+        compact_every: int = config.KEYWORD_DF_COMPACT_EVERY,
+    ):
+        self.path = path
+        self.save_every = save_every
+        self.n_buckets = n_buckets
+        self.compact_every = compact_every
+        self.n_docs = 0
+        self.df = np.zeros((_ROWS, n_buckets), dtype=np.int32)
+        self._seen = set()
+        self._pending: List[Tuple[str, np.ndarray]] = []  # 아직 log에 안 쓴 (기사 hash, term hash 배열)
+        self._logged = 0  # log에 있고 snapshot에는 아직 안 접힌 기사 수
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    @staticmethod
+    def term_hashes(terms: Sequence[str]) -> np.ndarray:
+        """term별 64-bit hash (Python hash()와 달리 process/실행이 달라도 같다)."""
+        digests = b"".join(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest() for t in terms)
+        return np.frombuffer(digests, dtype="<u8")
+
+    def _buckets(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return (hashes & 0xFFFFFFFF) % self.n_buckets, (hashes >> np.uint64(32)) % self.n_buckets
+
+    def _count(self, key: str, hashes: np.ndarray) -> None:
+        """hashes는 기사 안에서 중복이 없어야 한다 (같은 bucket에 두 번 더하지 않게 행마다 unique)."""
+        self._seen.add(key)
+        for row, buckets in enumerate(self._buckets(hashes)):
+            self.df[row, np.unique(buckets)] += 1
+        self.n_docs += 1
+
+    def _load(self) -> None:
+        snapshot = self.path + ".npz"
+        if os.path.exists(snapshot):
+            with np.load(snapshot) as data:
+                if data["df"].shape != self.df.shape:
+                    raise ValueError(f"DF table {snapshot} has shape {data['df'].shape}, expected {self.df.shape}")
+                self.df = data["df"].astype(np.int32)
+                self.n_docs = int(data["n_docs"])
+                self._seen.update(data["seen"].tolist())
+        log_path = self.path + ".log"
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):  # 쓰다 끊긴 마지막 줄
+                    break
+                key, _, ids = line.rstrip("\n").partition("\t")
+                # compact가 snapshot을 바꾼 뒤 log를 지우기 전에 끊겼으면 이미 접힌 줄이다
+                if not key or key in self._seen:
+                    continue
+                self._count(key, np.array([int(h, 16) for h in ids.split()], dtype=np.uint64))
+                self._logged += 1
+
+    def _append_pending(self) -> None:
+        """_lock을 잡은 상태에서 호출: 새 기사만 log 끝에 덧붙인다."""
+        pending, self._pending = self._pending, []
+        if not pending or not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".log", "a", encoding="utf-8") as f:
+            f.writelines(f"{key}\t{' '.join(format(h, 'x') for h in hashes.tolist())}\n" for key, hashes in pending)
+        self._logged += len(pending)
+
+    def save(self) -> None:
+        """아직 기록하지 않은 기사를 log에 덧붙인다 (기존 내용은 다시 쓰지 않는다). log가 길어지면 compact()."""
+        with self._lock:
+            self._append_pending()
+            should_compact = self.path and self.compact_every and self._logged >= self.compact_every
+        if should_compact:
+            self.compact()
+
+    def compact(self) -> None:
+        """log를 snapshot(.npz)에 접고 log를 지운다."""
+        if not self.path:
+            return
+        with self._lock:
+            self._append_pending()
+            snapshot = self.path + ".npz"
+            tmp_path = snapshot + ".tmp"
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, df=self.df, n_docs=self.n_docs, seen=np.array(sorted(self._seen)))
+            os.replace(tmp_path, snapshot)
+            if os.path.exists(self.path + ".log"):
+                os.remove(self.path + ".log")
+            self._logged = 0
+
+    def add(self, text: str, terms: Optional[Iterable[str]] = None) -> bool:
+        """기사 하나를 반영. 이미 센 기사면 False. terms는 미리 구한 n-gram (없으면 여기서 구한다)."""
+        key = text_hash(text)
+        if key in self._seen:
+            return False
+        hashes = self.term_hashes(list(set(terms if terms is not None else candidate_ngrams(text))))
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._count(key, hashes)
+            if self.path:
+                self._pending.append((key, hashes))
+            should_save = self.path and self.save_every and len(self._pending) >= self.save_every
+        if should_save:
+            self.save()
+        return True
+
+    def doc_freqs(self, terms: Sequence[str]) -> np.ndarray:
+        """term별 df 추정값 (두 행 중 작은 값; 실제 df보다 작게 나오지는 않는다)."""
+        first, second = self._buckets(self.term_hashes(terms))
+        return np.minimum(self.df[0, first], self.df[1, second])
+
+    def idfs(self, terms: Sequence[str]) -> np.ndarray:
+        """sklearn TfidfVectorizer(smooth_idf=True)와 같은 식."""
+        return np.log((1 + self.n_docs) / (1 + self.doc_freqs(terms))) + 1.0
+
+    def idf(self, term: str) -> float:
+        return float(self.idfs([term])[0])
+
+
+_TABLES: Dict[str, DocumentFrequencyTable] = {}
+_MEMORY_ONLY = False
+
+
+def get_df_table(path: Optional[str] = None) -> DocumentFrequencyTable:
+    """config.KEYWORD_DF_PATH(또는 path)의 DF 테이블을 프로세스당 한 번 연다. 경로가 없으면 메모리 전용."""
+    path = path or config.KEYWORD_DF_PATH or ""
+    if path not in _TABLES:
+        table = DocumentFrequencyTable(path or None)
+        if _MEMORY_ONLY:
+            table.path = None
+        elif path:
+            atexit.register(table.save)
+        _TABLES[path] = table
+    return _TABLES[path]
+
+
+def use_memory_only_df_tables() -> None:
+    """
+    이 process의 DF 테이블을 메모리 전용으로 바꾼다 (파일은 읽기만 하고 save()/compact()는 아무것도 안 함).
+    process worker용: worker마다 같은 파일에 쓰면 log 줄이 섞이고, compact가 다른 worker의 갱신을 지운다.
+    이미 연 테이블(fork로 물려받은 것)과 앞으로 열 테이블 모두에 적용된다.
+    """
+    global _MEMORY_ONLY
+    _MEMORY_ONLY = True
+    for table in _TABLES.values():
+        table.path = None
+
+
+def extract_keywords_tfidf(
+    text: str,
+    top_n: int = 15,
+    table: Optional[DocumentFrequencyTable] = None,
+    update: bool = False,
+    min_phrase_tf: int = 2,
+) -> List[Tuple[str, float]]:
+    """
+    TF-IDF 상위 n-gram을 [(phrase, score), ...]로 반환 (score는 최고점 대비 0~1, KeyBERT 점수와 같은 범위).
+    update=True면 이 기사를 먼저 DF 테이블에 반영한다. 기본은 읽기만 한다 (테이블은 CLI로 채운다).
+    2~3-gram은 기사 안에서 min_phrase_tf번 이상 나온 것만 후보로 둔다 (한 번 나온 구절은 idf만 높아 상위를 덮는다).
+    """
+    table = table if table is not None else get_df_table()
+    counts = candidate_ngrams(text)
+    if update:
+        table.add(text, counts)
+
+    terms = [term for term, tf in counts.items() if tf >= min_phrase_tf or " " not in term]
+    if not terms:
+        return []
+    scores = np.fromiter((counts[term] for term in terms), dtype=np.float64, count=len(terms)) * table.idfs(terms)
+    order = np.argsort(-scores, kind="stable")[:top_n]
+    top_score = scores[order[0]]
+    return [(terms[i], round(float(scores[i] / top_score), 4)) for i in order]
+
+
+if __name__ == "__main__":
+    # 크롤링한 기사 CSV로 DF 테이블 채우기/갱신: python -m qdd2.tfidf_keywords articles.csv [--column content]
+    import argparse
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Add articles to the TF-IDF document-frequency table")
+    parser.add_argument("csv")
+    parser.add_argument("--column", default="content")
+    parser.add_argument("--path", default=config.KEYWORD_DF_PATH, help="DF table prefix (<path>.npz / <path>.log)")
+    args = parser.parse_args()
+
+    df_table = get_df_table(args.path)
+    added = sum(df_table.add(t) for t in pd.read_csv(args.csv)[args.column].dropna().astype(str))
+    df_table.compact()
+    used = int(np.count_nonzero(df_table.df[0]))
+    print(
+        f"[INFO] DF table {args.path}: +{added} articles, {df_table.n_docs} total, "
+        f"{used}/{df_table.n_buckets} buckets used per row"
+    )
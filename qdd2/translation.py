@@ -3,14 +3,19 @@ Translation utilities.
 """
 
 import logging
+from functools import lru_cache
 
 from qdd2.models import get_translation_models
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4096)
 def translate_ko_to_en(text: str) -> str:
-    """Translate Korean text to English using the Marian model."""
+    """
+    Translate Korean text to English using the Marian model.
+    (결정적이라 같은 문장/키워드는 프로세스 안에서 한 번만 번역한다)
+    """
     tokenizer, model = get_translation_models()
     logger.debug("Translating text (len=%d): %s", len(text), text)
     tokens = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
@@ -19,4 +24,6 @@ def translate_ko_to_en(text: str) -> str:
     logger.debug("Translation result: %s", out)
     return out
 
-print(translate_ko_to_en("트럼프 베네수엘라 상공 전면폐쇄"))  # For quick test
+
+if __name__ == "__main__":
+    print(translate_ko_to_en("트럼프 베네수엘라 상공 전면폐쇄"))  # For quick test